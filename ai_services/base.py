@@ -1,8 +1,9 @@
 """
 Базовый интерфейс для AI провайдеров
 """
+import json
 from abc import ABC, abstractmethod
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, AsyncIterator
 from pydantic import BaseModel
 
 class AIGenerationRequest(BaseModel):
@@ -21,6 +22,16 @@ class AIProvider(ABC):
         """Генерирует структуру презентации"""
         pass
     
+    async def stream_presentation(self, request: AIGenerationRequest) -> AsyncIterator[str]:
+        """
+        Потоковая генерация JSON презентации
+        
+        По умолчанию отдает весь ответ одним куском; провайдеры с поддержкой
+        стриминга переопределяют метод
+        """
+        result = await self.generate_presentation(request)
+        yield json.dumps(result, ensure_ascii=False)
+    
     @abstractmethod
     def get_provider_name(self) -> str:
         """Возвращает название провайдера"""
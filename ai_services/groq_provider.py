@@ -2,18 +2,23 @@
 Groq Provider - новый высокоскоростной провайдер
 """
 import json
-from typing import Dict, Any
-from groq import Groq
+from typing import Dict, Any, AsyncIterator, List
+from groq import Groq, AsyncGroq
 from config.settings import get_settings
 from .base import AIProvider, AIGenerationRequest
+from .slide_stream import parse_presentation_json
 
 settings = get_settings()
 
 class GroqProvider(AIProvider):
     """Провайдер Groq - быстрые LLM модели"""
     
+    MODEL = "meta-llama/llama-4-scout-17b-16e-instruct"  # Самая мощная модель Groq
+    SYSTEM_PROMPT = "Ты эксперт по созданию презентаций. Отвечай ТОЛЬКО валидным JSON без дополнительных комментариев и markdown блоков."
+    
     def __init__(self):
         self.client = None
+        self.async_client = None
         self._initialized = False
     
     def _ensure_client(self):
@@ -22,19 +27,17 @@ class GroqProvider(AIProvider):
             groq_key = getattr(settings, 'GROQ_API_KEY', None)
             if groq_key and groq_key != "your_groq_key" and groq_key.startswith('gsk_'):
                 self.client = Groq(api_key=groq_key)
+                self.async_client = AsyncGroq(api_key=groq_key)
                 print(f"✓ Groq initialized with key: {groq_key[:10]}...")
             else:
                 self.client = None
+                self.async_client = None
                 print("❌ Groq API key not configured properly")
             self._initialized = True
         return self.client
     
-    async def generate_presentation(self, request: AIGenerationRequest) -> Dict[str, Any]:
-        """Генерирует презентацию через Groq Llama"""
-        client = self._ensure_client()
-        if not client:
-            raise ValueError("Groq API key not configured")
-        
+    def _build_messages(self, request: AIGenerationRequest) -> List[Dict[str, str]]:
+        """Собирает сообщения для модели"""
         # Улучшенный промпт для Groq Llama
         prompt = f"""
         Создай профессиональную презентацию на {request.language} языке.
@@ -51,6 +54,7 @@ class GroqProvider(AIProvider):
         4. Используй современный профессиональный тон
         5. ОБЯЗАТЕЛЬНО используй HTML теги для красивого форматирования
         6. Поддерживаемые HTML теги: <h1>, <h2>, <h3>, <p>, <strong>, <em>, <ul>, <li>, <br>, <div>, <span>
+        7. Для каждого слайда добавь поле image_query: 2-4 конкретных слова НА АНГЛИЙСКОМ для поиска фото на Pexels (без HTML)
         
         ФОРМАТ JSON:
         {{
@@ -58,6 +62,7 @@ class GroqProvider(AIProvider):
             "slides": [
                 {{
                     "title": "<h1>Заголовок слайда</h1>",
+                    "image_query": "modern business meeting",
                     "content": "<p>Основной текст с <strong>важными моментами</strong> и <em>акцентами</em>.</p><ul><li>Пункт списка 1</li><li>Пункт списка 2</li></ul>",
                     "type": "title|content|conclusion"
                 }}
@@ -69,40 +74,35 @@ class GroqProvider(AIProvider):
         Проанализируй контент, определи оптимальное количество слайдов и создай структурированную презентацию с HTML форматированием.
         """
         
+        return [
+            {"role": "system", "content": self.SYSTEM_PROMPT},
+            {"role": "user", "content": prompt}
+        ]
+    
+    @staticmethod
+    def _parse_content(content: str) -> Dict[str, Any]:
+        """Парсит JSON ответа модели, очищая markdown блоки"""
+        return parse_presentation_json(content)
+    
+    async def generate_presentation(self, request: AIGenerationRequest) -> Dict[str, Any]:
+        """Генерирует презентацию через Groq Llama"""
+        client = self._ensure_client()
+        if not client:
+            raise ValueError("Groq API key not configured")
+        
+        content = ""
         try:
             response = client.chat.completions.create(
-                model="meta-llama/llama-4-scout-17b-16e-instruct",  # Самая мощная модель Groq
-                messages=[
-                    {
-                        "role": "system", 
-                        "content": "Ты эксперт по созданию презентаций. Отвечай ТОЛЬКО валидным JSON без дополнительных комментариев и markdown блоков."
-                    },
-                    {"role": "user", "content": prompt}
-                ],
+                model=self.MODEL,
+                messages=self._build_messages(request),
                 temperature=0.7,
                 max_tokens=2000,
                 top_p=1,
                 stream=False
             )
             
-            content = response.choices[0].message.content.strip()
-            
-            # Очищаем от возможных markdown блоков и лишних символов
-            if content.startswith("```json"):
-                content = content[7:]
-            if content.startswith("```"):
-                content = content[3:]
-            if content.endswith("```"):
-                content = content[:-3]
-            
-            content = content.strip()
-            
-            # Парсим JSON
-            result = json.loads(content)
-            
-            # Валидируем структуру
-            if not isinstance(result, dict) or 'title' not in result or 'slides' not in result:
-                raise ValueError("Invalid response structure")
+            content = response.choices[0].message.content
+            result = self._parse_content(content)
             
             print(f"✓ Groq successfully generated presentation: {result['title']}")
             return result
@@ -115,6 +115,25 @@ class GroqProvider(AIProvider):
             print(f"❌ Groq generation error: {e}")
             return self._create_fallback_presentation(request)
     
+    async def stream_presentation(self, request: AIGenerationRequest) -> AsyncIterator[str]:
+        """Потоковая генерация: отдает куски JSON по мере их получения от Groq"""
+        self._ensure_client()
+        if not self.async_client:
+            raise ValueError("Groq API key not configured")
+        
+        stream = await self.async_client.chat.completions.create(
+            model=self.MODEL,
+            messages=self._build_messages(request),
+            temperature=0.7,
+            max_tokens=2000,
+            top_p=1,
+            stream=True
+        )
+        
+        async for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+    
     def get_provider_name(self) -> str:
         return "Groq (Llama 3.1)"
     
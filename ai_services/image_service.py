@@ -6,10 +6,15 @@
 
 import asyncio
 import logging
+import time
+from contextlib import asynccontextmanager
 from typing import List, Dict, Optional, Any
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 import aiohttp
 from config.settings import get_settings
+from .query_canonicalizer import canonicalize_query, normalize_per_page
+from .keyword_extractor import extract_keywords
+from .placeholders import placeholder_data_uri, get_palette_name
 
 settings = get_settings()
 logger = logging.getLogger(__name__)
@@ -25,6 +30,7 @@ class ImageResult:
     width: int
     height: int
     alt: str = ""
+    src: Dict[str, str] = field(default_factory=dict)  # Все размеры от Pexels (large, medium, small, ...)
     
     def to_dict(self) -> Dict[str, Any]:
         """Преобразование в словарь для JSON"""
@@ -36,7 +42,8 @@ class ImageResult:
             "photographer_url": self.photographer_url,
             "width": self.width,
             "height": self.height,
-            "alt": self.alt
+            "alt": self.alt,
+            "src": dict(self.src)
         }
 
 class PexelsImageService:
@@ -57,29 +64,116 @@ class PexelsImageService:
         self.api_key = api_key or settings.PEXELS_API_KEY
         self.session: Optional[aiohttp.ClientSession] = None
         self._cache: Dict[str, List[ImageResult]] = {}
+        self._cache_hits = 0
+        self._cache_misses = 0
+        self._session_lock: Optional[asyncio.Lock] = None
+        
+        # Метрики пула соединений
+        self._sessions_created = 0
+        self._requests_total = 0
+        self._requests_failed = 0
+        self._requests_in_flight = 0
+        self._request_time_total = 0.0
         
         if not self.api_key or self.api_key == "your_pexels_api_key":
             logger.warning("⚠️  Pexels API key не настроен. Изображения будут заменены плейсхолдерами")
     
     async def _ensure_session(self):
-        """Создание HTTP сессии если она не существует"""
-        if not self.session or self.session.closed:
+        """Создание HTTP сессии с настроенным пулом соединений, если ее нет"""
+        if self.session and not self.session.closed:
+            return
+        
+        if self._session_lock is None:
+            self._session_lock = asyncio.Lock()
+        
+        async with self._session_lock:
+            if self.session and not self.session.closed:
+                return
+            
             headers = {
                 "Authorization": self.api_key,
                 "User-Agent": "SayDeck/1.0.0"
             }
-            timeout = aiohttp.ClientTimeout(total=10)
+            connector = aiohttp.TCPConnector(
+                limit=settings.PEXELS_POOL_LIMIT,
+                limit_per_host=settings.PEXELS_POOL_LIMIT_PER_HOST,
+                ttl_dns_cache=settings.PEXELS_DNS_CACHE_TTL,
+                use_dns_cache=True,
+                keepalive_timeout=settings.PEXELS_KEEPALIVE_TIMEOUT,
+                enable_cleanup_closed=True
+            )
+            timeout = aiohttp.ClientTimeout(total=settings.PEXELS_REQUEST_TIMEOUT)
             self.session = aiohttp.ClientSession(
                 headers=headers,
-                timeout=timeout
+                timeout=timeout,
+                connector=connector
+            )
+            self._sessions_created += 1
+            logger.info(
+                f"🔌 Pexels пул соединений создан "
+                f"(limit={settings.PEXELS_POOL_LIMIT}, per_host={settings.PEXELS_POOL_LIMIT_PER_HOST})"
             )
     
+    @asynccontextmanager
+    async def _get(self, url: str, **kwargs):
+        """GET запрос через общий пул с учетом метрик"""
+        await self._ensure_session()
+        self._requests_total += 1
+        self._requests_in_flight += 1
+        started = time.perf_counter()
+        try:
+            async with self.session.get(url, **kwargs) as response:
+                yield response
+        except Exception:
+            self._requests_failed += 1
+            raise
+        finally:
+            self._requests_in_flight -= 1
+            self._request_time_total += time.perf_counter() - started
+    
+    async def startup(self):
+        """Инициализация пула соединений при старте приложения"""
+        await self._ensure_session()
+    
+    async def shutdown(self):
+        """Закрытие пула соединений при остановке приложения"""
+        await self.close_session()
+    
+    async def __aenter__(self) -> "PexelsImageService":
+        # Сессия общая для всего приложения: вход только гарантирует ее наличие,
+        # закрывается она в shutdown()
+        await self._ensure_session()
+        return self
+    
+    async def __aexit__(self, exc_type, exc, tb):
+        return False
+    
+    def get_pool_stats(self) -> Dict[str, Any]:
+        """📊 Метрики пула соединений Pexels"""
+        connector = self.session.connector if self.session and not self.session.closed else None
+        completed = self._requests_total - self._requests_in_flight
+        stats = {
+            "session_open": connector is not None,
+            "sessions_created": self._sessions_created,
+            "requests_total": self._requests_total,
+            "requests_failed": self._requests_failed,
+            "requests_in_flight": self._requests_in_flight,
+            "avg_request_ms": round(self._request_time_total / completed * 1000, 2) if completed else 0.0,
+            "limit": settings.PEXELS_POOL_LIMIT,
+            "limit_per_host": settings.PEXELS_POOL_LIMIT_PER_HOST,
+        }
+        if connector is not None:
+            stats["connections_acquired"] = len(getattr(connector, "_acquired", ()))
+            stats["connections_idle"] = sum(len(conns) for conns in getattr(connector, "_conns", {}).values())
+        return stats
+    
     async def search_images(
         self, 
         query: str, 
         per_page: int = 15,
         orientation: str = "landscape",
-        size: str = "medium"
+        size: str = "medium",
+        theme: str = "default"
     ) -> List[ImageResult]:
         """
         🔍 Поиск изображений по запросу
@@ -89,35 +183,41 @@ class PexelsImageService:
             per_page: Количество результатов (1-80)
             orientation: Ориентация (landscape, portrait, square)
             size: Размер (large, medium, small)
+            theme: Палитра плейсхолдеров (ID встроенного шаблона)
         
         Returns:
             Список найденных изображений
         """
         
+        # Канонизация запроса: одинаковые по смыслу запросы делят одну запись кэша
+        canonical = canonicalize_query(query)
+        fetch_count = normalize_per_page(min(per_page, 80))
+        search_text = canonical.search_text or query
+        
         # Проверка кэша
-        cache_key = f"{query}_{per_page}_{orientation}_{size}"
+        cache_key = f"{canonical.key}_{fetch_count}_{orientation}_{size}"
         if cache_key in self._cache:
-            logger.info(f"📦 Возвращаем из кэша: {query}")
-            return self._cache[cache_key]
+            self._cache_hits += 1
+            logger.info(f"📦 Возвращаем из кэша: {search_text} (hit rate: {self.cache_hit_rate:.0%})")
+            return self._cache[cache_key][:per_page]
+        self._cache_misses += 1
         
         # Fallback если API key не настроен
         if not self.api_key or self.api_key == "your_pexels_api_key":
-            logger.warning(f"🖼️  Генерируем плейсхолдер для: {query}")
-            return await self._generate_placeholder_images(query, per_page)
+            logger.warning(f"🖼️  Генерируем плейсхолдер для: {search_text}")
+            return await self._generate_placeholder_images(search_text, per_page, theme)
         
         try:
-            await self._ensure_session()
-            
             params = {
-                "query": query,
-                "per_page": min(per_page, 80),  # Максимум 80
+                "query": search_text,
+                "per_page": fetch_count,
                 "orientation": orientation,
                 "size": size
             }
             
-            logger.info(f"🔍 Поиск изображений: {query}")
+            logger.info(f"🔍 Поиск изображений: {search_text}")
             
-            async with self.session.get(f"{self.BASE_URL}/search", params=params) as response:
+            async with self._get(f"{self.BASE_URL}/search", params=params) as response:
                 if response.status == 200:
                     data = await response.json()
                     images = await self._parse_images(data)
@@ -125,24 +225,39 @@ class PexelsImageService:
                     # Кэшируем результат
                     self._cache[cache_key] = images
                     
-                    logger.info(f"✅ Найдено {len(images)} изображений для: {query}")
-                    return images
+                    logger.info(f"✅ Найдено {len(images)} изображений для: {search_text}")
+                    return images[:per_page]
                 
                 elif response.status == 429:
                     logger.warning("⚠️  Превышен лимит запросов Pexels API")
-                    return await self._generate_placeholder_images(query, per_page)
+                    return await self._generate_placeholder_images(search_text, per_page, theme)
                 
                 else:
                     logger.error(f"❌ Ошибка Pexels API: {response.status}")
-                    return await self._generate_placeholder_images(query, per_page)
+                    return await self._generate_placeholder_images(search_text, per_page, theme)
                     
         except asyncio.TimeoutError:
-            logger.error(f"⏰ Timeout при поиске изображений: {query}")
-            return await self._generate_placeholder_images(query, per_page)
+            logger.error(f"⏰ Timeout при поиске изображений: {search_text}")
+            return await self._generate_placeholder_images(search_text, per_page, theme)
         
         except Exception as e:
             logger.error(f"💥 Ошибка при поиске изображений: {str(e)}")
-            return await self._generate_placeholder_images(query, per_page)
+            return await self._generate_placeholder_images(search_text, per_page, theme)
+    
+    @property
+    def cache_hit_rate(self) -> float:
+        """Доля запросов, обслуженных из кэша"""
+        total = self._cache_hits + self._cache_misses
+        return self._cache_hits / total if total else 0.0
+    
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """📊 Статистика кэша изображений"""
+        return {
+            "size": len(self._cache),
+            "hits": self._cache_hits,
+            "misses": self._cache_misses,
+            "hit_rate": round(self.cache_hit_rate, 4)
+        }
     
     async def _parse_images(self, data: Dict) -> List[ImageResult]:
         """Парсинг ответа Pexels API в объекты ImageResult"""
@@ -163,7 +278,8 @@ class PexelsImageService:
                         photographer_url=photo.get("photographer_url", ""),
                         width=photo.get("width", 1920),
                         height=photo.get("height", 1080),
-                        alt=photo.get("alt", "")
+                        alt=photo.get("alt", ""),
+                        src={name: value for name, value in src.items() if value}
                     )
                     images.append(image)
                     
@@ -173,10 +289,18 @@ class PexelsImageService:
         
         return images
     
-    async def _generate_placeholder_images(self, query: str, count: int) -> List[ImageResult]:
+    async def _generate_placeholder_images(
+        self,
+        query: str,
+        count: int,
+        theme: str = "default"
+    ) -> List[ImageResult]:
         """
         🖼️  Генерация плейсхолдер изображений когда API недоступен
+        
+        Плейсхолдеры - inline SVG (data URI), поэтому не требуют сетевых запросов
         """
+        palette = get_palette_name(theme)
         placeholders = []
         
         for i in range(min(count, 15)):
@@ -186,10 +310,10 @@ class PexelsImageService:
             
             placeholder = ImageResult(
                 id=f"placeholder_{i}",
-                url=f"https://via.placeholder.com/{width}x{height}/4A90E2/FFFFFF?text={query.replace(' ', '+')}", 
-                original_url=f"https://via.placeholder.com/{width}x{height}",
-                photographer="Placeholder Service",
-                photographer_url="https://placeholder.com",
+                url=placeholder_data_uri(query, width, height, palette),
+                original_url="",
+                photographer="SayDeck",
+                photographer_url="",
                 width=width,
                 height=height,
                 alt=f"Placeholder image for {query}"
@@ -207,9 +331,7 @@ class PexelsImageService:
             return None
         
         try:
-            await self._ensure_session()
-            
-            async with self.session.get(f"{self.BASE_URL}/photos/{image_id}") as response:
+            async with self._get(f"{self.BASE_URL}/photos/{image_id}") as response:
                 if response.status == 200:
                     data = await response.json()
                     images = await self._parse_images({"photos": [data]})
@@ -223,6 +345,8 @@ class PexelsImageService:
     def clear_cache(self):
         """🧹 Очистка кэша изображений"""
         self._cache.clear()
+        self._cache_hits = 0
+        self._cache_misses = 0
         logger.info("🧹 Кэш изображений очищен")
     
     async def search_for_slide_content(self, slide_content: str) -> Optional[ImageResult]:
@@ -238,40 +362,35 @@ class PexelsImageService:
         if not keywords:
             return None
         
-        # Поиск изображений
-        images = await self.search_images(keywords, per_page=5)
+        return await self.search_for_keywords(keywords)
+    
+    async def search_for_keywords(self, keywords: str, theme: str = "default") -> Optional[ImageResult]:
+        """
+        🔑 Поиск изображения по готовым ключевым словам
+        
+        Используется, когда ключевые слова уже извлечены для всей презентации
+        """
+        if not keywords:
+            return None
+        
+        images = await self.search_images(keywords, per_page=5, theme=theme)
         
         # Возвращаем первое найденное изображение
         return images[0] if images else None
     
     async def _extract_keywords(self, text: str) -> str:
         """
-        🧠 Простое извлечение ключевых слов из текста
-        В будущем можно заменить на более продвинутый NLP
+        🧠 Извлечение ключевых слов из текста
+        Подробности в ai_services.keyword_extractor
         """
-        
-        # Удаляем HTML теги если есть
-        import re
-        clean_text = re.sub(r'<[^>]+>', '', text)
-        
-        # Простая логика извлечения ключевых слов
-        words = clean_text.lower().split()
-        
-        # Фильтруем стоп-слова (базовый набор)
-        stop_words = {
-            'the', 'a', 'an', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for', 
-            'of', 'with', 'by', 'is', 'are', 'was', 'were', 'be', 'been', 'being',
-            'это', 'в', 'на', 'с', 'и', 'или', 'но', 'для', 'от', 'до', 'по'
-        }
-        
-        keywords = [word for word in words if len(word) > 3 and word not in stop_words]
-        
-        # Берем первые 2-3 ключевых слова
-        return ' '.join(keywords[:3]) if keywords else text[:50]
+        return extract_keywords(text)
 
     async def close_session(self):
+        """Закрывает сессию вместе с пулом соединений"""
         if self.session and not self.session.closed:
             await self.session.close()
+            logger.info("🔌 Pexels пул соединений закрыт")
+        self.session = None
 
 # Глобальный экземпляр сервиса
 image_service = PexelsImageService()
@@ -0,0 +1,159 @@
+"""
+🧠 Keyword Extractor
+Извлечение ключевых слов для поиска изображений по всей презентации
+Автор: SayDeck Team
+"""
+
+import math
+import re
+from collections import Counter, defaultdict
+from dataclasses import dataclass
+from typing import Any, Dict, List, Mapping, Sequence, Union
+
+from .query_canonicalizer import is_significant, stem, tokenize
+
+# Предкомпилированные шаблоны
+STYLE_MARKUP_RE = re.compile(r"<(h[1-6])[^>]*>(.*?)</\1>", re.IGNORECASE | re.DOTALL)
+
+# Слова, характерные для слайдов, но бесполезные для поиска изображений
+SLIDE_STOPWORDS = frozenset({
+    "slide", "presentation", "introduction", "conclusion", "summary", "overview",
+    "слайд", "презентация", "презентации", "введение", "заключение", "итоги",
+    "вывод", "выводы", "спасибо", "внимание", "пункт", "тема", "теме",
+})
+
+SlideInput = Union[str, Mapping[str, Any]]
+
+
+@dataclass
+class _SlideTerms:
+    """Взвешенные термины одного слайда"""
+    scores: Dict[str, float]
+    surface: Dict[str, Counter]
+
+
+class KeywordExtractor:
+    """
+    Извлечение ключевых слов со взвешиванием по частоте и позиции
+
+    Слова из заголовка весят больше, чем слова из текста, а слова в начале
+    текста - больше, чем в конце. При пакетной обработке учитывается вся
+    презентация: термины, которые встречаются на каждом слайде, получают
+    меньший вес, поэтому каждому слайду достаются отличительные слова.
+    """
+
+    def __init__(
+        self,
+        max_keywords: int = 3,
+        title_weight: float = 3.0,
+        heading_weight: float = 2.0,
+        position_decay: float = 0.05
+    ):
+        self.max_keywords = max_keywords
+        self.title_weight = title_weight
+        self.heading_weight = heading_weight
+        self.position_decay = position_decay
+
+    def _score_text(self, text: str, weight: float, terms: _SlideTerms):
+        """Добавляет взвешенные термины текста в накопитель слайда"""
+        for position, word in enumerate(tokenize(text)):
+            if not is_significant(word) or word in SLIDE_STOPWORDS:
+                continue
+            word_stem = stem(word)
+            terms.scores[word_stem] = terms.scores.get(word_stem, 0.0) + weight / (1.0 + self.position_decay * position)
+            terms.surface[word_stem][word] += 1
+
+    def _collect(self, slide: SlideInput) -> _SlideTerms:
+        """Собирает взвешенные термины одного слайда"""
+        terms = _SlideTerms(scores={}, surface=defaultdict(Counter))
+        if isinstance(slide, str):
+            title, content = "", slide
+        else:
+            title, content = str(slide.get("title", "") or ""), str(slide.get("content", "") or "")
+
+        self._score_text(title, self.title_weight, terms)
+        for match in STYLE_MARKUP_RE.finditer(content):
+            self._score_text(match.group(2), self.heading_weight, terms)
+        self._score_text(STYLE_MARKUP_RE.sub(" ", content), 1.0, terms)
+        return terms
+
+    def _top_terms(self, terms: _SlideTerms, idf: Mapping[str, float]) -> str:
+        """Выбирает лучшие термины слайда и возвращает их исходные формы"""
+        ranked = sorted(
+            terms.scores.items(),
+            key=lambda item: (-item[1] * idf.get(item[0], 1.0), item[0])
+        )
+        words = [terms.surface[term].most_common(1)[0][0] for term, _ in ranked[:self.max_keywords]]
+        return " ".join(words)
+
+    def extract(self, text: str) -> str:
+        """Ключевые слова для одного текста"""
+        keywords = self._top_terms(self._collect(text), {})
+        return keywords or (text or "")[:50]
+
+    def extract_batch(self, slides: Sequence[SlideInput]) -> List[str]:
+        """
+        Ключевые слова для всех слайдов за один проход
+
+        Returns:
+            Список строк ключевых слов в порядке слайдов
+        """
+        collected = [self._collect(slide) for slide in slides]
+        total = len(collected)
+
+        document_frequency: Counter = Counter()
+        for terms in collected:
+            document_frequency.update(terms.scores.keys())
+
+        idf = {
+            term: math.log((total + 1) / (count + 1)) + 1.0
+            for term, count in document_frequency.items()
+        }
+
+        results = []
+        for slide, terms in zip(slides, collected):
+            keywords = self._top_terms(terms, idf)
+            if not keywords:
+                fallback = slide if isinstance(slide, str) else slide.get("title", "")
+                keywords = str(fallback or "")[:50]
+            results.append(keywords)
+        return results
+
+
+# Глобальный экземпляр
+keyword_extractor = KeywordExtractor()
+
+
+def extract_keywords(text: str) -> str:
+    """Ключевые слова для одного слайда или текста"""
+    return keyword_extractor.extract(text)
+
+
+def extract_deck_keywords(slides: Sequence[SlideInput]) -> List[str]:
+    """Ключевые слова для всех слайдов презентации за один проход"""
+    return keyword_extractor.extract_batch(slides)
+
+
+
+def resolve_slide_queries(slides: Sequence[SlideInput]) -> List[str]:
+    """
+    Поисковые запросы изображений для всех слайдов
+
+    Если модель вернула image_query для слайда, он используется напрямую.
+    Извлечение ключевых слов запускается только для слайдов без него.
+    """
+    queries: List[str] = []
+    missing: List[int] = []
+    for index, slide in enumerate(slides):
+        image_query = slide.get("image_query") if isinstance(slide, Mapping) else None
+        if isinstance(image_query, str) and image_query.strip():
+            queries.append(image_query.strip())
+        else:
+            queries.append("")
+            missing.append(index)
+
+    if missing:
+        extracted = extract_deck_keywords(slides)
+        for index in missing:
+            queries[index] = extracted[index]
+    return queries
@@ -1,10 +1,11 @@
 """
 AI Provider Manager - управляет всеми AI провайдерами
 """
-from typing import Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 from enum import Enum
 from .base import AIProvider, AIGenerationRequest
 from .groq_provider import GroqProvider
+from .prefetch import ImagePrefetchPipeline, SlideResolver
 
 class AIProviderType(Enum):
     """Типы AI провайдеров"""
@@ -68,5 +69,32 @@ class AIProviderManager:
         
         return result
 
+    async def generate_presentation_with_images(
+        self,
+        request: AIGenerationRequest,
+        resolver: SlideResolver,
+        provider_type: Optional[AIProviderType] = None
+    ) -> Tuple[Dict, List[Any]]:
+        """
+        Генерирует презентацию через стриминг, параллельно подбирая изображения
+        
+        Поиск изображения для слайда стартует, как только слайд появился в потоке
+        """
+        if provider_type:
+            provider = self.get_provider(provider_type)
+        else:
+            provider = self.get_best_available_provider()
+        
+        result, images = await ImagePrefetchPipeline(resolver).run(provider, request)
+        
+        result["_metadata"] = {
+            "provider": provider.get_provider_name(),
+            "provider_type": provider_type.value if provider_type else "auto",
+            "generated_by": "SayDeck AI Services",
+            "streamed": True
+        }
+        
+        return result, images
+
 # Глобальный экземпляр менеджера
 ai_manager = AIProviderManager()
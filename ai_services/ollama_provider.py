@@ -33,6 +33,7 @@ class OllamaProvider(AIProvider):
             - title: заголовок слайда в HTML формате
             - content: основной текст слайда в HTML формате
             - type: тип слайда (title, content, image)
+            - image_query: 2-4 конкретных слова на английском для поиска фото на Pexels (без HTML)
         
         ОБЯЗАТЕЛЬНО используй HTML теги для форматирования:
         - <h1>, <h2>, <h3> для заголовков
@@ -49,7 +50,8 @@ class OllamaProvider(AIProvider):
                 {{
                     "title": "<h1>Заголовок слайда</h1>",
                     "content": "<p>Текст с <strong>выделением</strong></p><ul><li>Пункт 1</li></ul>",
-                    "type": "title"
+                    "type": "title",
+                    "image_query": "modern business meeting"
                 }}
             ]
         }}
@@ -46,6 +46,7 @@ class OpenAIProvider(AIProvider):
             - title: заголовок слайда в HTML формате
             - content: основной текст слайда в HTML формате
             - type: тип слайда (title, content, image, etc.)
+            - image_query: 2-4 конкретных слова на английском для поиска фото на Pexels (без HTML)
         
         ОБЯЗАТЕЛЬНО используй HTML теги для форматирования:
         - <h1>, <h2>, <h3> для заголовков
@@ -63,7 +64,8 @@ class OpenAIProvider(AIProvider):
                 {{
                     "title": "<h1>Заголовок слайда</h1>",
                     "content": "<p>Основной текст с <strong>важными моментами</strong> и <em>выделениями</em>.</p><ul><li>Элемент списка 1</li><li>Элемент списка 2</li></ul>",
-                    "type": "title"
+                    "type": "title",
+                    "image_query": "modern business meeting"
                 }}
             ]
         }}
@@ -0,0 +1,65 @@
+"""
+🎨 Inline SVG Placeholders
+Легкие SVG плейсхолдеры в виде data URI: не требуют внешних запросов
+ни на сервере, ни у зрителя
+Автор: SayDeck Team
+"""
+
+from functools import lru_cache
+from typing import Dict, NamedTuple
+from urllib.parse import quote
+from xml.sax.saxutils import escape
+
+
+class Palette(NamedTuple):
+    """Цвета плейсхолдера: градиент фона и цвет текста"""
+    start: str
+    end: str
+    text: str
+
+
+# Палитры совпадают с цветами встроенных шаблонов
+PALETTES: Dict[str, Palette] = {
+    "default": Palette("#4A90E2", "#357ABD", "#FFFFFF"),
+    "minimalism": Palette("#F9F9F9", "#EEEEEE", "#222222"),
+    "nature": Palette("#A8E063", "#56AB2F", "#FFFFFF"),
+    "transport": Palette("#E0EAFC", "#CFDEF3", "#1976D2"),
+    "it": Palette("#232526", "#414345", "#00C3FF"),
+    "abstract": Palette("#F7971E", "#FFD200", "#FFFFFF"),
+}
+
+MAX_TEXT_LENGTH = 40
+
+
+def get_palette_name(theme: str = None) -> str:
+    """Возвращает существующее имя палитры (или default)"""
+    return theme if theme in PALETTES else "default"
+
+
+@lru_cache(maxsize=512)
+def placeholder_data_uri(text: str, width: int, height: int, palette: str = "default") -> str:
+    """
+    SVG плейсхолдер с текстом темы в виде data URI
+
+    Результат кэшируется по (text, size, palette)
+    """
+    colors = PALETTES[get_palette_name(palette)]
+    label = (text or "").strip()
+    if len(label) > MAX_TEXT_LENGTH:
+        label = label[:MAX_TEXT_LENGTH - 1].rstrip() + "…"
+    font_size = max(16, min(width, height) // 12)
+
+    svg = (
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" '
+        f'viewBox="0 0 {width} {height}">'
+        f'<defs><linearGradient id="g" x1="0" y1="0" x2="1" y2="1">'
+        f'<stop offset="0" stop-color="{colors.start}"/><stop offset="1" stop-color="{colors.end}"/>'
+        f'</linearGradient></defs>'
+        f'<rect width="100%" height="100%" fill="url(#g)"/>'
+        f'<text x="50%" y="50%" fill="{colors.text}" font-family="Segoe UI, Arial, sans-serif" '
+        f'font-size="{font_size}" text-anchor="middle" dominant-baseline="middle">{escape(label)}</text>'
+        f'</svg>'
+    )
+    # URL-кодирование компактнее base64 для текстового SVG; кавычки кодируются,
+    # чтобы URI можно было вставлять в любой HTML атрибут
+    return "data:image/svg+xml;charset=utf-8," + quote(svg, safe="=:/,;()")
@@ -0,0 +1,99 @@
+"""
+⚡ Image Prefetch Pipeline
+Поиск изображений, совмещенный со стримингом ответа модели: поиск для
+слайда стартует, как только в потоке появился его image_query. Слайды без
+image_query ищутся после разбора ответа по ключевым словам всей презентации
+(resolve_slide_queries), а не по одному слайду
+Автор: SayDeck Team
+"""
+
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from .base import AIProvider, AIGenerationRequest
+from .keyword_extractor import resolve_slide_queries
+from .slide_stream import SlideStreamParser, parse_presentation_json
+
+logger = logging.getLogger(__name__)
+
+# resolver(слайд, ключевые слова или None, если у слайда есть image_query)
+SlideResolver = Callable[[Dict[str, Any], Optional[str]], Awaitable[Any]]
+
+
+class ImagePrefetchPipeline:
+    """
+    Конвейер «генерация + поиск изображений»
+
+    resolver получает словарь слайда (возможно частичный - только title и
+    image_query) и возвращает найденное изображение. К моменту, когда модель
+    дописывает последний слайд, изображения для предыдущих уже найдены.
+    Для слайдов без image_query resolver получает ключевые слова, извлеченные
+    по всей презентации: частичный слайд для такого извлечения не годится.
+    """
+
+    def __init__(self, resolver: SlideResolver):
+        self.resolver = resolver
+
+    async def _resolve_safely(self, index: int, slide: Dict[str, Any], keywords: Optional[str] = None) -> Any:
+        try:
+            return await self.resolver(slide, keywords)
+        except Exception as e:
+            logger.error(f"❌ Ошибка поиска изображения для слайда {index}: {str(e)}")
+            return None
+
+    async def run(
+        self,
+        provider: AIProvider,
+        request: AIGenerationRequest
+    ) -> Tuple[Dict[str, Any], List[Any]]:
+        """
+        Генерирует презентацию и параллельно ищет изображения
+
+        Returns:
+            (структура презентации, изображения в порядке слайдов)
+        """
+        parser = SlideStreamParser()
+        tasks: Dict[int, asyncio.Task] = {}
+        started: List[asyncio.Task] = []
+
+        def start(index: int, slide: Dict[str, Any], keywords: Optional[str] = None) -> asyncio.Task:
+            task = asyncio.create_task(self._resolve_safely(index, slide, keywords))
+            started.append(task)
+            return task
+
+        try:
+            try:
+                async for chunk in provider.stream_presentation(request):
+                    for event in parser.feed(chunk):
+                        if event.index not in tasks and _has_image_query(event.slide):
+                            logger.info(f"⚡ Предзагрузка изображения для слайда {event.index}")
+                            tasks[event.index] = start(event.index, event.slide)
+                presentation = parse_presentation_json(parser.buffer)
+            except Exception as e:
+                logger.error(f"❌ Ошибка потоковой генерации: {str(e)}")
+                raise
+
+            slides = presentation.get("slides") or []
+            queries = resolve_slide_queries(slides)
+            results: List[asyncio.Task] = []
+            for index, slide in enumerate(slides):
+                task = tasks.pop(index, None)
+                if task is None:
+                    # Слайд без image_query (или не распознанный в потоке)
+                    task = start(index, slide, None if _has_image_query(slide) else queries[index])
+                results.append(task)
+
+            images = await asyncio.gather(*results) if results else []
+            return presentation, list(images)
+        finally:
+            # Ошибка, отмена запроса или слайды, отброшенные при финальном разборе:
+            # незавершенные поиски не должны продолжаться без владельца
+            for task in started:
+                if not task.done():
+                    task.cancel()
+
+
+def _has_image_query(slide: Any) -> bool:
+    image_query = slide.get("image_query") if isinstance(slide, dict) else None
+    return isinstance(image_query, str) and bool(image_query.strip())
@@ -0,0 +1,135 @@
+"""
+🔤 Query Canonicalizer
+Приведение поисковых запросов изображений к каноническому виду,
+чтобы семантически одинаковые запросы попадали в одну запись кэша
+Автор: SayDeck Team
+"""
+
+import re
+from dataclasses import dataclass
+from typing import Dict, FrozenSet, List, Tuple
+
+# Предкомпилированные шаблоны
+HTML_TAG_RE = re.compile(r"<[^>]+>")
+HTML_ENTITY_RE = re.compile(r"&[a-zA-Z#0-9]+;")
+WORD_RE = re.compile(r"[a-zа-яё0-9]+", re.IGNORECASE)
+CYRILLIC_RE = re.compile(r"[а-яё]")
+
+# Стоп-слова по языкам
+STOPWORDS: Dict[str, FrozenSet[str]] = {
+    "en": frozenset({
+        "the", "a", "an", "and", "or", "but", "in", "on", "at", "to", "for",
+        "of", "with", "by", "is", "are", "was", "were", "be", "been", "being",
+        "this", "that", "these", "those", "it", "its", "as", "from", "into",
+        "about", "over", "under", "than", "then", "so", "such", "can", "will",
+        "our", "your", "their", "we", "you", "they", "how", "what", "why",
+        "when", "where", "which", "who", "also", "more", "most", "very",
+    }),
+    "ru": frozenset({
+        "это", "в", "на", "с", "и", "или", "но", "для", "от", "до", "по",
+        "как", "что", "чтобы", "так", "также", "такие", "такой", "этот",
+        "эта", "эти", "этого", "этой", "его", "ее", "их", "они", "мы", "вы",
+        "он", "она", "оно", "который", "которые", "которая", "при", "над",
+        "под", "без", "из", "за", "же", "ли", "не", "нет", "да", "уже",
+        "еще", "очень", "более", "может", "быть", "был", "была", "были",
+        "есть", "все", "всё", "свой", "своих", "наш", "ваш", "где", "когда",
+    }),
+}
+
+ALL_STOPWORDS: FrozenSet[str] = frozenset().union(*STOPWORDS.values())
+
+# Окончания для облегченного стемминга (от длинных к коротким)
+_EN_SUFFIXES: Tuple[str, ...] = (
+    "ational", "ization", "fulness", "ousness", "iveness",
+    "ments", "ness", "ment", "ings", "able", "ible", "ally",
+    "ing", "ies", "ied", "ers", "est", "ful", "ous", "ive", "ize",
+    "ed", "es", "er", "ly", "al", "s",
+)
+_RU_SUFFIXES: Tuple[str, ...] = tuple(sorted({
+    "ившись", "ывшись", "иями", "ями", "ами", "ией", "иям", "ием",
+    "ого", "его", "ому", "ему", "ыми", "ими", "ая", "яя", "ое", "ее",
+    "ые", "ие", "ый", "ий", "ой", "ей", "ую", "юю", "ом", "ем",
+    "ах", "ях", "ов", "ев", "ия", "ию", "ии", "ие", "ть", "ся", "сь",
+    "ет", "ут", "ют", "ит", "ат", "ят", "ешь", "ишь", "ла", "ли", "ло",
+    "ость", "ости", "ение", "ения", "ений", "ениям",
+    "а", "я", "о", "е", "ы", "и", "у", "ю", "ь", "й",
+}, key=len, reverse=True))
+
+MIN_STEM_LENGTH = 3
+MIN_TERM_LENGTH = 3
+MAX_TERMS = 4
+
+# Размеры страниц, к которым округляется per_page (максимум Pexels - 80)
+PER_PAGE_BUCKETS: Tuple[int, ...] = (5, 15, 30, 80)
+
+
+@dataclass(frozen=True)
+class CanonicalQuery:
+    """Канонический запрос: ключ для кэша и текст для поиска"""
+    key: str
+    search_text: str
+    terms: Tuple[str, ...]
+
+
+def strip_html(text: str) -> str:
+    """Удаляет HTML теги и сущности"""
+    text = HTML_TAG_RE.sub(" ", text or "")
+    return HTML_ENTITY_RE.sub(" ", text)
+
+
+def tokenize(text: str) -> List[str]:
+    """Разбивает текст на слова в нижнем регистре"""
+    return [word.replace("ё", "е") for word in WORD_RE.findall(strip_html(text).lower())]
+
+
+def stem(word: str) -> str:
+    """Облегченный стемминг для русского и английского"""
+    suffixes = _RU_SUFFIXES if CYRILLIC_RE.search(word) else _EN_SUFFIXES
+    for suffix in suffixes:
+        if word.endswith(suffix) and len(word) - len(suffix) >= MIN_STEM_LENGTH:
+            return word[:-len(suffix)]
+    return word
+
+
+def is_significant(word: str) -> bool:
+    """Проверяет, что слово несет смысл для поиска"""
+    return len(word) >= MIN_TERM_LENGTH and word not in ALL_STOPWORDS and not word.isdigit()
+
+
+def canonicalize_query(query: str, max_terms: int = MAX_TERMS) -> CanonicalQuery:
+    """
+    Приводит запрос к каноническому виду
+
+    HTML удаляется, слова приводятся к нижнему регистру, стоп-слова
+    отбрасываются, оставшиеся слова стеммируются. В ключ попадают первые
+    max_terms уникальных основ в отсортированном виде, а в текст поиска -
+    исходные формы этих слов (Pexels лучше ищет по целым словам).
+    """
+    seen: Dict[str, str] = {}
+    for word in tokenize(query):
+        if not is_significant(word):
+            continue
+        word_stem = stem(word)
+        if word_stem not in seen:
+            seen[word_stem] = word
+            if len(seen) >= max_terms:
+                break
+
+    if not seen:
+        fallback = " ".join(tokenize(query))[:50].strip() or (query or "").strip()[:50]
+        return CanonicalQuery(key=fallback, search_text=fallback, terms=())
+
+    terms = tuple(sorted(seen))
+    return CanonicalQuery(
+        key=" ".join(terms),
+        search_text=" ".join(seen[term] for term in terms),
+        terms=terms
+    )
+
+
+def normalize_per_page(per_page: int) -> int:
+    """Округляет per_page вверх до ближайшего стандартного размера страницы"""
+    for bucket in PER_PAGE_BUCKETS:
+        if per_page <= bucket:
+            return bucket
+    return PER_PAGE_BUCKETS[-1]
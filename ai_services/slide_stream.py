@@ -0,0 +1,154 @@
+"""
+🌊 Slide Stream Parser
+Инкрементальный разбор потокового JSON ответа модели: слайды отдаются
+по мере появления, не дожидаясь конца ответа
+Автор: SayDeck Team
+"""
+
+import json
+import re
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+SLIDES_KEY_RE = re.compile(r'"slides"\s*:\s*\[')
+STRING_FIELD_RE = {
+    name: re.compile(r'"%s"\s*:\s*"((?:[^"\\]|\\.)*)"' % name)
+    for name in ("title", "image_query")
+}
+
+
+@dataclass
+class SlideEvent:
+    """Событие о слайде: частичные данные (image_query) или полный слайд"""
+    index: int
+    slide: Dict[str, Any]
+    complete: bool
+
+
+class SlideStreamParser:
+    """
+    Инкрементальный парсер массива slides
+
+    Отслеживает глубину вложенности и строки, поэтому фигурные скобки
+    внутри HTML контента не сбивают разбор. Для каждого слайда отдает
+    событие, как только в нем появляется image_query, и еще одно, когда
+    объект слайда закрыт.
+    """
+
+    def __init__(self):
+        self.buffer = ""
+        self._pos = 0
+        self._array_started = False
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._slide_start: Optional[int] = None
+        self._slide_index = 0
+        self._query_emitted = False
+        self._finished = False
+
+    def feed(self, chunk: str) -> List[SlideEvent]:
+        """Добавляет кусок ответа и возвращает новые события"""
+        self.buffer += chunk
+        events: List[SlideEvent] = []
+
+        if self._finished:
+            return events
+
+        if not self._array_started:
+            match = SLIDES_KEY_RE.search(self.buffer)
+            if not match:
+                return events
+            self._array_started = True
+            self._pos = match.end()
+
+        buffer = self.buffer
+        while self._pos < len(buffer):
+            char = buffer[self._pos]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char in "{[":
+                if self._depth == 0 and char == "{":
+                    self._slide_start = self._pos
+                    self._query_emitted = False
+                self._depth += 1
+            elif char in "}]":
+                if self._depth == 0:
+                    # Закрылся сам массив slides
+                    self._finished = True
+                    break
+                self._depth -= 1
+                if self._depth == 0 and self._slide_start is not None:
+                    event = self._complete_slide(buffer[self._slide_start:self._pos + 1])
+                    if event:
+                        events.append(event)
+            self._pos += 1
+
+        # Частичный слайд: image_query может прийти задолго до конца контента
+        if self._slide_start is not None and self._depth > 0 and not self._query_emitted:
+            partial = self._partial_slide(buffer[self._slide_start:self._pos])
+            if partial:
+                self._query_emitted = True
+                events.append(SlideEvent(index=self._slide_index, slide=partial, complete=False))
+
+        return events
+
+    def _partial_slide(self, text: str) -> Optional[Dict[str, Any]]:
+        """Извлекает завершенные строковые поля из незакрытого слайда"""
+        query_match = STRING_FIELD_RE["image_query"].search(text)
+        if not query_match:
+            return None
+        slide = {"image_query": _decode_json_string(query_match.group(1))}
+        title_match = STRING_FIELD_RE["title"].search(text)
+        if title_match:
+            slide["title"] = _decode_json_string(title_match.group(1))
+        return slide
+
+    def _complete_slide(self, text: str) -> Optional[SlideEvent]:
+        """Разбирает закрытый объект слайда"""
+        index = self._slide_index
+        self._slide_index += 1
+        self._slide_start = None
+        try:
+            slide = json.loads(text)
+        except json.JSONDecodeError:
+            return None
+        if not isinstance(slide, dict):
+            return None
+        return SlideEvent(index=index, slide=slide, complete=True)
+
+
+def _decode_json_string(raw: str) -> str:
+    """Декодирует содержимое JSON строки без кавычек"""
+    try:
+        return json.loads(f'"{raw}"')
+    except json.JSONDecodeError:
+        return raw
+
+
+def parse_presentation_json(content: str) -> Dict[str, Any]:
+    """Парсит полный JSON ответа модели, очищая markdown блоки"""
+    content = content.strip()
+
+    # Очищаем от возможных markdown блоков и лишних символов
+    if content.startswith("```json"):
+        content = content[7:]
+    if content.startswith("```"):
+        content = content[3:]
+    if content.endswith("```"):
+        content = content[:-3]
+
+    result = json.loads(content.strip())
+
+    # Валидируем структуру
+    if not isinstance(result, dict) or 'title' not in result or 'slides' not in result:
+        raise ValueError("Invalid response structure")
+
+    return result
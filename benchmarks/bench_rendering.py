@@ -0,0 +1,134 @@
+"""
+Микробенчмарк рендеринга HTML презентаций
+
+Сравнивает предкомпилированные шаблоны (utils.html_templates) с прежней
+сборкой страницы через f-строки и `+=` в цикле на колодах из 10, 100 и 1000
+слайдов. Прежняя сборка ничего не экранирует, шаблоны экранируют каждое
+значение, поэтому современный рендер в лучшем случае идет с ней вровень;
+выигрыш - у публичного просмотра и в потоковой отдаче.
+
+Запуск из корня репозитория:
+    python -m benchmarks.bench_rendering
+"""
+import statistics
+import timeit
+from typing import Any, Dict, List
+
+from utils.html_templates import (
+    render_modern_presentation,
+    render_public_viewer,
+    render_template_slides,
+)
+from utils.responsive_images import render_img
+from utils.static_assets import get_stylesheet
+
+MODERN_CSS = get_stylesheet("modern").content.decode("utf-8")
+
+DECK_SIZES = (10, 100, 1000)
+REPEATS = 5
+
+
+def make_deck(slides_count: int, with_images: bool = True) -> Dict[str, Any]:
+    """Синтетическая презентация с HTML контентом и изображениями"""
+    slides: List[Dict[str, Any]] = []
+    for i in range(slides_count):
+        slide: Dict[str, Any] = {
+            "title": f"Слайд {i + 1}: рост & развитие",
+            "content": "<p>" + "Содержимое слайда с текстом для рендеринга. " * 8 + "</p>\n<ul><li>Пункт</li></ul>",
+            "type": "content",
+        }
+        if with_images and i % 2 == 0:
+            slide["image"] = {
+                "url": f"https://images.pexels.com/photos/{1000 + i}/photo.jpeg?w=940",
+                "width": 4000,
+                "height": 3000,
+                "photographer": "Pexels Author",
+                "src": {
+                    "large2x": f"https://images.pexels.com/photos/{1000 + i}/photo.jpeg?w=1880",
+                    "large": f"https://images.pexels.com/photos/{1000 + i}/photo.jpeg?w=940",
+                    "medium": f"https://images.pexels.com/photos/{1000 + i}/photo.jpeg?h=350",
+                },
+            }
+        slides.append(slide)
+    return {"title": "Бенчмарк рендеринга", "slides": slides}
+
+
+def legacy_modern_html(presentation_data: Dict[str, Any]) -> str:
+    """Прежняя реализация: f-строки и конкатенация в цикле"""
+    slides_html = ""
+    for i, slide in enumerate(presentation_data.get("slides", [])):
+        slide_class = f"slide slide-{slide.get('type', 'content')}"
+        if i == 0:
+            slide_class += " active"
+        image = slide.get("image")
+        if image:
+            slides_html += f"""
+            <div class="{slide_class}" data-slide="{i}">
+                <div class="slide-content">
+                    <div class="text-column">
+                        <h2>{slide.get("title", "")}</h2>
+                        <div class="content">{slide.get("content", "")}</div>
+                    </div>
+                    <div class="image-column">
+                        {render_img(image, layout="column", alt="Slide image")}
+                    </div>
+                </div>
+            </div>
+            """
+        else:
+            slides_html += f"""
+            <div class="{slide_class}" data-slide="{i}">
+                <div class="slide-content">
+                    <div class="text-column full-width">
+                        <h2>{slide.get("title", "")}</h2>
+                        <div class="content">{slide.get("content", "")}</div>
+                    </div>
+                </div>
+            </div>
+            """
+    css = f"""{MODERN_CSS}"""
+    return f"""
+    <!DOCTYPE html>
+    <html lang="ru">
+    <head>
+        <title>{presentation_data.get("title", "")}</title>
+        <style>{css}</style>
+    </head>
+    <body>
+        {slides_html}
+    </body>
+    </html>
+    """
+
+
+def _measure(func, *args) -> float:
+    """Медиана времени одного вызова в миллисекундах"""
+    number = 1
+    while timeit.timeit(lambda: func(*args), number=number) < 0.2 and number < 10_000:
+        number *= 2
+    timings = timeit.repeat(lambda: func(*args), number=number, repeat=REPEATS)
+    return statistics.median(timings) / number * 1000
+
+
+def main():
+    cases = [
+        ("legacy f-string", lambda deck: legacy_modern_html(deck)),
+        ("modern", lambda deck: render_modern_presentation(deck)),
+        ("public viewer", lambda deck: render_public_viewer(deck["title"], deck["slides"], "bench")),
+        ("template slides", lambda deck: render_template_slides(deck["slides"])),
+    ]
+
+    header = f"{'renderer':<18}" + "".join(f"{f'{size} slides':>16}" for size in DECK_SIZES)
+    print(header)
+    print("-" * len(header))
+
+    decks = {size: make_deck(size) for size in DECK_SIZES}
+    for name, render in cases:
+        row = f"{name:<18}"
+        for size in DECK_SIZES:
+            row += f"{_measure(render, decks[size]):>13.3f} ms"
+        print(row)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,6 @@
 from pydantic_settings import BaseSettings
 from functools import lru_cache
-from typing import List
+from typing import List, Optional
 
 class Settings(BaseSettings):
     # Основные настройки
@@ -34,14 +34,96 @@ class Settings(BaseSettings):
 
     # Pexels
     PEXELS_API_KEY: str
+    PEXELS_REQUEST_TIMEOUT: int = 10
+    PEXELS_POOL_LIMIT: int = 100
+    PEXELS_POOL_LIMIT_PER_HOST: int = 20
+    PEXELS_DNS_CACHE_TTL: int = 300
+    PEXELS_KEEPALIVE_TIMEOUT: int = 30
+
+    # Стили презентаций: link (версионированные файлы) | inline (<style> в странице)
+    CSS_DELIVERY: str = "link"
+    # Абсолютный адрес API (https://api.example.com): сохраненные и возвращаемые
+    # документы открываются и с других origin и ссылаются на стили через него
+    STATIC_URL_BASE: str = ""
+
+    # Сжатие ответов и сохраненных HTML
+    COMPRESSION_MIN_SIZE: int = 1024
+    COMPRESSION_GZIP_LEVEL: int = 6
+    COMPRESSION_BROTLI_QUALITY: int = 5
+    PRECOMPRESS_GZIP_LEVEL: int = 9
+    PRECOMPRESS_BROTLI_QUALITY: int = 11
+
+    # Хранилище файлов презентаций: local | s3 (S3-совместимое, например MinIO)
+    STORAGE_BACKEND: str = "local"
+    STORAGE_LOCAL_PATH: str = "presentations"
+    STORAGE_CACHE_DIR: str = "storage_cache"
+    STORAGE_CACHE_MAX_BYTES: int = 512 * 1024 * 1024
+    S3_BUCKET: str = ""
+    S3_PREFIX: str = "presentations"
+    S3_ENDPOINT_URL: Optional[str] = None
+    S3_REGION: str = "us-east-1"
+    S3_ACCESS_KEY_ID: str = ""
+    S3_SECRET_ACCESS_KEY: str = ""
+    S3_MULTIPART_THRESHOLD: int = 8 * 1024 * 1024
+    S3_PART_SIZE: int = 8 * 1024 * 1024
+    S3_MAX_CONNECTIONS: int = 20
+
+    # Очистка хранилища презентаций
+    STORAGE_SWEEP_ENABLED: bool = True
+    STORAGE_SWEEP_INTERVAL: int = 60
+    STORAGE_SWEEP_SHARDS_PER_RUN: int = 256
+    STORAGE_SWEEP_MAX_OPS_PER_SECOND: float = 50.0
+    GUEST_PRESENTATION_TTL_DAYS: int = 7
+    USER_STORAGE_QUOTA_BYTES: int = 200 * 1024 * 1024
+
+    # Экспорт презентаций (PPTX, PDF) в пуле процессов
+    EXPORT_MAX_WORKERS: int = 2
+    EXPORT_MAX_PENDING: int = 16
+    EXPORT_TIMEOUT: int = 60
+    EXPORT_CACHE_MAX_BYTES: int = 1024 * 1024 * 1024
+    # Как часто задача отмечает использование файла экспорта в общем хранилище (секунды)
+    EXPORT_CACHE_TOUCH_INTERVAL: int = 3600
+    EXPORT_PDF_IMAGE_DPI: int = 150
+    EXPORT_PDF_FONT_PATH: str = "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf"
+    EXPORT_IMAGE_FETCH_CONCURRENCY: int = 8
+    EXPORT_IMAGE_FETCH_TIMEOUT: int = 10
+
+    # HTML превью расширенных презентаций (в хранилище презентаций)
+    PREVIEW_TTL_DAYS: int = 7
+
+    # Кэш разобранных шаблонов
+    TEMPLATE_CACHE_TTL: int = 600
+    TEMPLATE_CACHE_MAX_ENTRIES: int = 256
+
+    # Кэш страниц публичного просмотра
+    VIEWER_CACHE_TTL: int = 3600
+    VIEWER_CACHE_MAX_BYTES: int = 64 * 1024 * 1024
+    VIEWER_CACHE_MAX_PAGE_BYTES: int = 2 * 1024 * 1024
+    VIEWER_CACHE_CONTROL: str = "public, max-age=0, must-revalidate"
+    VIEWS_FLUSH_INTERVAL: int = 10
 
     # Ollama
     OLLAMA_BASE_URL: str
     OLLAMA_MODEL: str
 
+    # Прокси изображений с локальным кэшем
+    IMAGE_PROXY_ENABLED: bool = True
+    IMAGE_CACHE_DIR: str = "image_cache"
+    IMAGE_PROXY_ALLOWED_HOSTS: List[str] = ["images.pexels.com"]
+    IMAGE_PROXY_MAX_BYTES: int = 10 * 1024 * 1024
+    IMAGE_CACHE_MAX_BYTES: int = 1024 * 1024 * 1024
+
+    # Подстановка картинок в HTML: microservice | inprocess (для одного узла без микросервиса)
+    IMAGE_RESOLVER_MODE: str = "microservice"
+
     # Микросервис изображений
     IMAGE_MICROSERVICE_URL: str
     IMAGE_MICROSERVICE_TIMEOUT: int
+    IMAGE_MICROSERVICE_MAX_CONNECTIONS: int = 20
+    IMAGE_MICROSERVICE_GZIP: bool = True
+    IMAGE_MICROSERVICE_GZIP_MIN_SIZE: int = 1024
+    IMAGE_MICROSERVICE_FAILURE_THRESHOLD: int = 3
+    IMAGE_MICROSERVICE_RECOVERY_TIMEOUT: int = 30
 
     # Google OAuth
     GOOGLE_CLIENT_ID: str
@@ -14,10 +14,22 @@ from routers import (
     public,
     enhanced_generator,
     main_generation,
+    images,
+    assets,
     gpt_test
 )
 from services.template_service import TemplateService
 from ai_services.image_service import image_service
+from services.export_cache import export_cache
+from services.export_service import export_service
+from services.image_microservice import image_microservice_client
+from services.image_proxy import image_proxy_service
+from services.invalidation_bus import invalidation_bus
+from services.presentation_files import presentation_files_service
+from services.storage_sweeper import storage_sweeper
+from services.template_cache import template_cache
+from services.viewer_cache import view_counter, viewer_cache
+from utils.compression import CompressionMiddleware
 import os
 
 settings = get_settings()
@@ -37,6 +49,14 @@ app.add_middleware(
     expose_headers=["*"],
 )
 
+# Сжатие динамических HTML/JSON ответов (предварительно сжатые файлы не трогает)
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=settings.COMPRESSION_MIN_SIZE,
+    gzip_level=settings.COMPRESSION_GZIP_LEVEL,
+    brotli_quality=settings.COMPRESSION_BROTLI_QUALITY
+)
+
 # Подключаем роутеры
 app.include_router(auth.router, prefix=settings.API_V1_STR, tags=["auth"])
 app.include_router(html_generator.router, prefix=settings.API_V1_STR, tags=["html-generation"])
@@ -47,11 +67,15 @@ app.include_router(preferences.router, prefix=settings.API_V1_STR, tags=["prefer
 app.include_router(public.router, prefix=settings.API_V1_STR, tags=["public"])
 app.include_router(enhanced_generator.router, tags=["enhanced-generation"])
 app.include_router(main_generation.router, prefix=settings.API_V1_STR, tags=["main-generation"])
+app.include_router(images.router, prefix=settings.API_V1_STR, tags=["images"])
+app.include_router(assets.router, tags=["assets"])  # Версионированные стили презентаций
 app.include_router(gpt_test.router, prefix=settings.API_V1_STR, tags=["gpt-testing"])
 
 
 @app.on_event("startup")
 async def startup():
+    if settings.CSS_DELIVERY == "link" and not settings.STATIC_URL_BASE:
+        print("⚠️ STATIC_URL_BASE не задан: сохраненные документы ссылаются на стили относительным путем")
     try:
         # Инициализируем базу данных
         await init_db()
@@ -89,8 +113,16 @@ async def startup():
             print(f"⚠️ Предупреждение: Не удалось создать встроенные шаблоны: {e}")
             print("Это не критично для работы приложения")
 
-        await image_service._ensure_session()
+        await image_service.startup()
         print("✅ Image service инициализирован!")
+
+        # Подписка на инвалидацию in-process кэшей (шаблоны и т.д.)
+        await invalidation_bus.start()
+        await view_counter.start()
+
+        # Фоновая очистка хранилища презентаций (TTL гостей, квоты, осиротевшие файлы)
+        if settings.STORAGE_SWEEP_ENABLED:
+            await storage_sweeper.start()
         
     except Exception as e:
         print(f"❌ Ошибка при запуске приложения: {e}")
@@ -100,10 +132,37 @@ async def startup():
 @app.on_event("shutdown")
 async def shutdown_event():
     try:
-        await image_service.close_session()
+        # Записываем накопленные просмотры до закрытия
+        await view_counter.stop()
+        await viewer_cache.close()
+    except Exception as e:
+        print(f"❌ Ошибка при остановке кэша просмотра: {e}")
+    try:
+        await invalidation_bus.stop()
+    except Exception as e:
+        print(f"❌ Ошибка при остановке шины инвалидации: {e}")
+    try:
+        await image_service.shutdown()
         print("✅ Image service закрыт!")
     except Exception as e:
         print(f"❌ Ошибка при закрытии image service: {e}")
+    try:
+        await image_proxy_service.close()
+    except Exception as e:
+        print(f"❌ Ошибка при закрытии прокси изображений: {e}")
+    try:
+        await image_microservice_client.close()
+    except Exception as e:
+        print(f"❌ Ошибка при закрытии клиента микросервиса картинок: {e}")
+    try:
+        export_service.shutdown()
+    except Exception as e:
+        print(f"❌ Ошибка при остановке пула экспорта: {e}")
+    try:
+        await storage_sweeper.stop()
+        await presentation_files_service.close()
+    except Exception as e:
+        print(f"❌ Ошибка при закрытии хранилища презентаций: {e}")
 
 @app.get("/")
 async def root():
@@ -147,6 +206,19 @@ async def api_health():
             "template_viewer": "/api/v1/templates/{template_id}/viewer (GET)",
             "list_templates": "/api/v1/templates (GET)"
         },
+        "metrics": {
+            "image_microservice": image_microservice_client.get_stats(),
+            "pexels_pool": image_service.get_pool_stats(),
+            "template_cache": template_cache.get_stats(),
+            "viewer_cache": viewer_cache.get_stats(),
+            "view_counter": view_counter.get_stats(),
+            "presentation_storage": presentation_files_service.get_stats(),
+            "storage_sweeper": storage_sweeper.get_stats(),
+            "export": export_service.get_stats(),
+            "export_cache": export_cache.get_stats(),
+            "image_cache": image_proxy_service.get_stats(),
+            "invalidation_bus": invalidation_bus.get_stats()
+        },
         "new_services": [
             "Enhanced Generator - расширенная генерация с изображениями",
             "Image Service - поиск изображений через Pexels API",
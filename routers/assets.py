@@ -0,0 +1,27 @@
+"""
+Assets Router - отдача версионированных таблиц стилей презентаций
+"""
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import Response
+
+from utils.static_assets import CSS_PATH, IMMUTABLE_CACHE_CONTROL, get_stylesheet
+
+router = APIRouter(prefix=CSS_PATH, tags=["assets"])
+
+@router.get("/{filename}")
+async def get_stylesheet_file(filename: str, request: Request):
+    """Таблица стилей по имени вида <name>.<hash>.css"""
+    name, _, rest = filename.partition(".")
+    digest = rest[:-len(".css")] if rest.endswith(".css") else None
+    asset = get_stylesheet(name)
+    if asset is None or digest is None:
+        raise HTTPException(status_code=404, detail="Stylesheet not found")
+    
+    # Устаревший хэш (страница сохранена до изменения CSS) получает актуальный
+    # файл, но без вечного кэширования под старым URL
+    cache_control = IMMUTABLE_CACHE_CONTROL if digest == asset.digest else "no-cache"
+    headers = {"ETag": asset.etag, "Cache-Control": cache_control}
+    if request.headers.get("if-none-match") == asset.etag:
+        return Response(status_code=304, headers=headers)
+    
+    return Response(asset.content, media_type="text/css; charset=utf-8", headers=headers)
@@ -9,11 +9,15 @@ import asyncio
 import json
 import re
 from typing import List, Dict, Any, Optional
-from fastapi import APIRouter, HTTPException, Depends, BackgroundTasks
+from fastapi import APIRouter, HTTPException, Depends, BackgroundTasks, Request
 from fastapi.responses import HTMLResponse
 from pydantic import BaseModel
 
 from ai_services.image_service import image_service, get_image_for_slide
+from ai_services.keyword_extractor import resolve_slide_queries
+from utils.html_templates import render_enhanced_preview
+from utils.file_responses import conditional_file_response
+from services.preview_store import preview_key, preview_store
 from ai_services.manager import ai_manager
 from ai_services import AIGenerationRequest, AIProviderType
 from config.settings import get_settings
@@ -51,6 +55,7 @@ class SlideWithImage(BaseModel):
     content: str
     image: Optional[Dict[str, Any]] = None
     image_alt: str = ""
+    image_query: Optional[str] = None
     layout: str = "title-content-image"
 
 class EnhancedPresentationResponse(BaseModel):
@@ -61,6 +66,8 @@ class EnhancedPresentationResponse(BaseModel):
     generation_time: float
     images_found: int
     html_preview: Optional[str] = None
+    preview_id: Optional[str] = None
+    preview_url: Optional[str] = None
 
 @router.post("/generate", response_model=EnhancedPresentationResponse)
 async def generate_enhanced_presentation(
@@ -91,8 +98,16 @@ async def generate_enhanced_presentation(
             language=request.language
         )
         
+        prefetched_images = None
         try:
-            base_response = await ai_manager.generate_presentation(ai_request)
+            if request.include_images:
+                # Стриминг ответа модели: поиск изображений стартует по мере появления слайдов
+                base_response, prefetched_images = await ai_manager.generate_presentation_with_images(
+                    ai_request,
+                    lambda slide, keywords: _find_image_for_slide(slide, request.image_style, keywords)
+                )
+            else:
+                base_response = await ai_manager.generate_presentation(ai_request)
             logger.info(f"✓ AI генерация завершена: {type(base_response)}")
         except Exception as ai_error:
             logger.error(f"❌ Ошибка AI генерации: {str(ai_error)}")
@@ -112,14 +127,19 @@ async def generate_enhanced_presentation(
         if request.include_images:
             logger.info(f"🖼️  Поиск изображений для {len(slides_data)} слайдов")
             
-            # Параллельный поиск изображений для всех слайдов
-            image_tasks = []
-            for slide_data in slides_data:
-                task = _find_image_for_slide(slide_data, request.image_style)
-                image_tasks.append(task)
-            
-            # Ждем завершения всех задач поиска
-            slide_images = await asyncio.gather(*image_tasks, return_exceptions=True)
+            if prefetched_images is not None and len(prefetched_images) == len(slides_data):
+                # Изображения уже найдены во время стриминга
+                slide_images = prefetched_images
+            else:
+                # Параллельный поиск изображений для всех слайдов
+                slide_queries = resolve_slide_queries(slides_data)
+                image_tasks = []
+                for slide_data, keywords in zip(slides_data, slide_queries):
+                    task = _find_image_for_slide(slide_data, request.image_style, keywords)
+                    image_tasks.append(task)
+                
+                # Ждем завершения всех задач поиска
+                slide_images = await asyncio.gather(*image_tasks, return_exceptions=True)
             
             # Собираем результаты
             for i, slide_data in enumerate(slides_data):
@@ -138,6 +158,7 @@ async def generate_enhanced_presentation(
                     content=slide_data.get("content", ""),
                     image=image_result,
                     image_alt=image_result.get("alt", "") if image_result else "",
+                    image_query=slide_data.get("image_query"),
                     layout="title-content-image" if image_result else "title-content"
                 )
                 enhanced_slides.append(enhanced_slide)
@@ -151,14 +172,20 @@ async def generate_enhanced_presentation(
                 )
                 enhanced_slides.append(enhanced_slide)
         
-        # 4. Генерируем HTML превью в фоне
+        # 4. Генерируем HTML превью в фоне и сохраняем под детерминированным ключом
         html_preview = None
+        preview_id = None
         if request.auto_enhance:
-            background_tasks.add_task(
-                _generate_html_preview, 
-                enhanced_slides, 
-                base_content.get("title", request.topic)
-            )
+            preview_title = base_content.get("title", request.topic)
+            preview_id = preview_key(preview_title, enhanced_slides)
+            # Превью с тем же содержимым уже сохранено - повторно не рендерим
+            if not await preview_store.exists(preview_id):
+                background_tasks.add_task(
+                    _generate_html_preview, 
+                    enhanced_slides, 
+                    preview_title,
+                    preview_id
+                )
         
         generation_time = time.time() - start_time
         
@@ -170,7 +197,9 @@ async def generate_enhanced_presentation(
             total_slides=len(enhanced_slides),
             generation_time=generation_time,
             images_found=images_found,
-            html_preview=html_preview
+            html_preview=html_preview,
+            preview_id=preview_id,
+            preview_url=_preview_url(preview_id)
         )
         
     except Exception as e:
@@ -229,18 +258,30 @@ async def _parse_generated_content(content: Dict[str, Any]) -> List[Dict[str, st
     
     return slides
 
-async def _find_image_for_slide(slide_data: Dict[str, str], style: str) -> Optional[Dict[str, Any]]:
+async def _find_image_for_slide(
+    slide_data: Dict[str, str],
+    style: str,
+    keywords: Optional[str] = None
+) -> Optional[Dict[str, Any]]:
     """
     🔍 Поиск изображения для конкретного слайда
+    
+    keywords - ключевые слова, заранее извлеченные для всей презентации
     """
     try:
-        title = slide_data.get("title", "")
-        content = slide_data.get("content", "")
+        # image_query от модели уже на английском - используем как есть
+        image_query = slide_data.get("image_query")
+        if isinstance(image_query, str) and image_query.strip():
+            image_result = await image_service.search_for_keywords(image_query.strip())
+            return image_result.to_dict() if image_result else None
         
-        # Создаем поисковый запрос из заголовка и контента
-        search_query = f"{title} {content}"
+        if keywords is None:
+            title = slide_data.get("title", "")
+            content = slide_data.get("content", "")
+            keywords = await image_service._extract_keywords(f"{title} {content}")
         
         # Добавляем стилевые модификаторы
+        search_query = keywords
         if style == "professional":
             search_query += " business professional"
         elif style == "creative":
@@ -249,81 +290,30 @@ async def _find_image_for_slide(slide_data: Dict[str, str], style: str) -> Optio
             search_query += " minimal clean simple"
         
         # Ищем изображение
-        image_result = await image_service.search_for_slide_content(search_query)
+        image_result = await image_service.search_for_keywords(search_query)
         return image_result.to_dict() if image_result else None
             
     except Exception as e:
         logger.error(f"💥 Ошибка поиска изображения: {str(e)}")
         return None
 
-async def _generate_html_preview(slides: List[SlideWithImage], title: str):
+def _preview_url(preview_id: Optional[str]) -> Optional[str]:
+    """URL для получения сохраненного превью"""
+    return f"{router.prefix}/preview/{preview_id}" if preview_id else None
+
+async def _generate_html_preview(slides: List[SlideWithImage], title: str, preview_id: Optional[str] = None):
     """
     🎨 Генерация HTML превью презентации (выполняется в фоне)
     """
     try:
         logger.info(f"🎨 Генерация HTML превью для: {title}")
         
-        html_template = """
-        <!DOCTYPE html>
-        <html lang="ru">
-        <head>
-            <meta charset="UTF-8">
-            <meta name="viewport" content="width=device-width, initial-scale=1.0">
-            <title>{title}</title>
-            <style>
-                body {{ font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif; margin: 0; padding: 20px; background: #f5f5f5; }}
-                .presentation {{ max-width: 1200px; margin: 0 auto; }}
-                .slide {{ background: white; margin: 20px 0; padding: 30px; border-radius: 10px; box-shadow: 0 4px 6px rgba(0,0,0,0.1); }}
-                .slide-title {{ font-size: 24px; font-weight: bold; color: #333; margin-bottom: 15px; border-bottom: 2px solid #4A90E2; padding-bottom: 10px; }}
-                .slide-content {{ font-size: 16px; line-height: 1.6; color: #666; margin-bottom: 20px; }}
-                .slide-image {{ text-align: center; margin: 20px 0; }}
-                .slide-image img {{ max-width: 100%; height: auto; border-radius: 8px; box-shadow: 0 2px 4px rgba(0,0,0,0.1); }}
-                .image-credit {{ font-size: 12px; color: #999; margin-top: 5px; }}
-                .header {{ text-align: center; margin-bottom: 40px; }}
-                .header h1 {{ color: #333; font-size: 36px; margin-bottom: 10px; }}
-                .header p {{ color: #666; font-size: 18px; }}
-            </style>
-        </head>
-        <body>
-            <div class="presentation">
-                <div class="header">
-                    <h1>{title}</h1>
-                    <p>Сгенерировано с помощью SayDeck AI</p>
-                </div>
-                {slides_html}
-            </div>
-        </body>
-        </html>
-        """
-        
-        slides_html = ""
-        for i, slide in enumerate(slides, 1):
-            slide_html = f"""
-            <div class="slide">
-                <div class="slide-title">{i}. {slide.title}</div>
-                <div class="slide-content">{slide.content.replace(chr(10), '<br>')}</div>
-            """
-            
-            if slide.image:
-                slide_html += f"""
-                <div class="slide-image">
-                    <img src="{slide.image['url']}" alt="{slide.image_alt}" />
-                    <div class="image-credit">
-                        Фото: {slide.image['photographer']} | Источник: Pexels
-                    </div>
-                </div>
-                """
-            
-            slide_html += "</div>"
-            slides_html += slide_html
-        
-        final_html = html_template.format(
-            title=title,
-            slides_html=slides_html
-        )
+        final_html = render_enhanced_preview(title, slides)
         
-        # Сохраняем в файл или кэш (опционально)
-        logger.info(f"✅ HTML превью готов")
+        # Сохраняем в хранилище, чтобы клиент забрал превью без повторного рендера
+        if preview_id:
+            await preview_store.save(preview_id, final_html)
+        logger.info(f"✅ HTML превью готов: {preview_id or 'без сохранения'}")
         
         return final_html
         
@@ -331,6 +321,30 @@ async def _generate_html_preview(slides: List[SlideWithImage], title: str):
         logger.error(f"💥 Ошибка генерации HTML превью: {str(e)}")
         return None
 
+@router.get("/preview/{preview_id}", response_class=HTMLResponse)
+async def get_html_preview(preview_id: str, req: Request):
+    """
+    🖼️ Сохраненное HTML превью презентации
+    
+    Превью рендерится в фоне после генерации; пока оно не готово, возвращается 404
+    """
+    try:
+        preview_file = await preview_store.get_file(preview_id, req.headers.get("Accept-Encoding"))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Некорректный ID превью")
+    
+    if not preview_file:
+        raise HTTPException(status_code=404, detail="Превью не найдено или еще не готово")
+    
+    return conditional_file_response(
+        req,
+        preview_file.path,
+        preview_file.stat,
+        preview_file.etag,
+        encoding=preview_file.encoding,
+        headers={"Cache-Control": "private, max-age=3600"}
+    )
+
 @router.get("/search-images")
 async def search_images_endpoint(
     query: str, 
@@ -418,6 +432,8 @@ async def health_check() -> Dict[str, Any]:
                 "Автоматическая генерация HTML превью"
             ],
             "cache_size": len(image_service._cache) if hasattr(image_service, '_cache') else 0,
+            "image_cache": image_service.get_cache_stats(),
+            "pexels_pool": image_service.get_pool_stats(),
             "version": settings.VERSION
         }
         
@@ -525,9 +541,10 @@ async def update_enhanced_presentation(
         if current_request.include_images:
             logger.info(f"🖼️  Обновление изображений для {len(slides_data)} слайдов")
             
+            slide_queries = resolve_slide_queries(slides_data)
             image_tasks = []
-            for slide_data in slides_data:
-                task = _find_image_for_slide(slide_data, current_request.image_style)
+            for slide_data, keywords in zip(slides_data, slide_queries):
+                task = _find_image_for_slide(slide_data, current_request.image_style, keywords)
                 image_tasks.append(task)
             
             slide_images = await asyncio.gather(*image_tasks, return_exceptions=True)
@@ -547,6 +564,7 @@ async def update_enhanced_presentation(
                     content=slide_data.get("content", ""),
                     image=image_result,
                     image_alt=image_result.get("alt", "") if image_result else "",
+                    image_query=slide_data.get("image_query"),
                     layout="title-content-image" if image_result else "title-content"
                 )
                 enhanced_slides.append(enhanced_slide)
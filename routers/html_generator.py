@@ -2,7 +2,7 @@
 HTML Generator Router - создание презентаций с полным HTML выводом
 """
 from fastapi import APIRouter, Depends, HTTPException, status, Body
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, StreamingResponse
 from fastapi_limiter.depends import RateLimiter
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Dict, Any
@@ -11,141 +11,13 @@ from models import User
 from models.presentation import Presentation
 from utils.auth import get_current_user
 from ai_services import ai_manager, AIGenerationRequest
+from utils.html_templates import render_modern_presentation, stream_modern_presentation
 
 router = APIRouter(prefix="/generate", tags=["html-generation"])
 
 def create_modern_html_presentation(presentation_data: Dict[str, Any]) -> str:
     """Создает полную HTML страницу с современными стилями и двухколоночным layout"""
-
-    title = presentation_data.get("title", "Презентация")
-    slides = presentation_data.get("slides", [])
-
-    # Генерируем HTML для слайдов
-    slides_html = ""
-    for i, slide in enumerate(slides):
-        slide_title = slide.get("title", "")
-        slide_content = slide.get("content", "")
-        slide_image = slide.get("image", None)  # Проверяем наличие изображения
-        slide_type = slide.get("type", "content")
-        
-        # Добавляем класс для типа слайда
-        slide_class = f"slide slide-{slide_type}"
-        if i == 0:
-            slide_class += " active"
-        
-        # Генерация HTML для слайда
-        if slide_image:
-            slides_html += f"""
-            <div class="{slide_class}" data-slide="{i}">
-                <div class="slide-content">
-                    <div class="text-column">
-                        <h2>{slide_title}</h2>
-                        <div class="content">{slide_content}</div>
-                    </div>
-                    <div class="image-column">
-                        <img src="{slide_image}" alt="Slide image" />
-                    </div>
-                </div>
-            </div>
-            """
-        else:
-            slides_html += f"""
-            <div class="{slide_class}" data-slide="{i}">
-                <div class="slide-content">
-                    <div class="text-column full-width">
-                        <h2>{slide_title}</h2>
-                        <div class="content">{slide_content}</div>
-                    </div>
-                </div>
-            </div>
-            """
-
-    # Создаем полную HTML страницу с современными стилями
-    html_content = f"""
-    <!DOCTYPE html>
-    <html lang="ru">
-    <head>
-        <meta charset="UTF-8">
-        <meta name="viewport" content="width=device-width, initial-scale=1.0">
-        <title>{title}</title>
-        <style>
-            body {{
-                font-family: Arial, sans-serif;
-                margin: 0;
-                padding: 0;
-                background-color: #f8f9fa;
-                color: #333;
-            }}
-            .slide {{
-                display: flex;
-                flex-direction: column;
-                align-items: center;
-                justify-content: center;
-                padding: 20px;
-                min-height: 100vh;
-                box-sizing: border-box;
-            }}
-            .slide-content {{
-                display: flex;
-                flex-wrap: wrap;
-                max-width: 1200px;
-                width: 100%;
-                margin: auto;
-                background: #fff;
-                border-radius: 8px;
-                box-shadow: 0 4px 6px rgba(0, 0, 0, 0.1);
-                overflow: hidden;
-            }}
-            .text-column {{
-                flex: 0 0 60%;
-                padding: 20px;
-                box-sizing: border-box;
-            }}
-            .image-column {{
-                flex: 0 0 40%;
-                display: flex;
-                align-items: center;
-                justify-content: center;
-                padding: 20px;
-                box-sizing: border-box;
-            }}
-            .image-column img {{
-                max-width: 100%;
-                height: auto;
-                border-radius: 8px;
-            }}
-            .text-column.full-width {{
-                flex: 0 0 100%;
-                text-align: center;
-            }}
-            h2 {{
-                font-size: 24px;
-                margin-bottom: 16px;
-            }}
-            .content {{
-                font-size: 16px;
-                line-height: 1.5;
-            }}
-            @media (max-width: 768px) {{
-                .slide-content {{
-                    flex-direction: column;
-                }}
-                .text-column, .image-column {{
-                    flex: 0 0 100%;
-                }}
-                .text-column.full-width {{
-                    text-align: center;
-                }}
-            }}
-        </style>
-    </head>
-    <body>
-        {slides_html}
-    </body>
-    </html>
-    """
-
-    return html_content
+    return render_modern_presentation(presentation_data)
 
 
 @router.post("/", response_class=HTMLResponse, dependencies=[Depends(RateLimiter(times=10, seconds=60))])
@@ -171,8 +43,6 @@ async def generate_html_presentation(
         )
         # Генерируем презентацию через Groq
         presentation_data = await ai_manager.generate_presentation(ai_request)
-        # Создаем HTML страницу
-        html_content = create_modern_html_presentation(presentation_data)
         # Сохраняем в базу данных
         new_presentation = Presentation(
             title=presentation_data.get("title", "Сгенерированная презентация"),
@@ -183,12 +53,12 @@ async def generate_html_presentation(
         await session.commit()
         await session.refresh(new_presentation)
         print(f"✅ Презентация создана: ID={new_presentation.id}, User={current_user.id}")
-        # Возвращаем HTML
-        return HTMLResponse(
-            content=html_content,
+        # Возвращаем HTML потоком: <head> с CSS сразу, затем слайды по одному
+        return StreamingResponse(
+            stream_modern_presentation(presentation_data),
             status_code=200,
+            media_type="text/html; charset=utf-8",
             headers={
-                "Content-Type": "text/html; charset=utf-8",
                 "X-Presentation-ID": str(new_presentation.id)
             }
         )
@@ -0,0 +1,32 @@
+"""
+Images Router - отдача изображений через локальный прокси с кэшем
+"""
+from typing import Optional
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import FileResponse, Response
+
+from services.image_proxy import image_proxy_service, ImageProxyError
+
+router = APIRouter(prefix="/images", tags=["images"])
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+@router.get("/proxy")
+async def proxy_image(
+    request: Request,
+    url: str = Query(..., description="Исходный URL изображения"),
+    w: Optional[int] = Query(None, ge=1, le=4096, description="Желаемая ширина")
+):
+    """Изображение из локального кэша (скачивается один раз, уменьшается под слайд)"""
+    try:
+        image = await image_proxy_service.get_image(url, w)
+    except ImageProxyError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=502, detail=f"Failed to fetch image: {str(e)}")
+    
+    headers = {"ETag": image.etag, "Cache-Control": IMMUTABLE_CACHE_CONTROL}
+    if request.headers.get("if-none-match") == image.etag:
+        return Response(status_code=304, headers=headers)
+    
+    return FileResponse(image.path, media_type=image.media_type, headers=headers)
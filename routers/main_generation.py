@@ -2,8 +2,8 @@
 Main Generation Router - основной эндпоинт для генерации презентаций по ТЗ
 """
 import uuid
-from fastapi import APIRouter, Depends, HTTPException, Request, Header, Body
-from fastapi.responses import JSONResponse, HTMLResponse
+from fastapi import APIRouter, Depends, HTTPException, Request, Header, Body, Query
+from fastapi.responses import JSONResponse, HTMLResponse, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Optional
 import asyncio
@@ -18,11 +18,18 @@ from schemas.generation import (
     GuestCreditsInfo
 )
 from services.guest_credits import guest_credits_service
-from services.presentation_files import presentation_files_service
-from services.image_microservice import image_microservice_client
+from services import async_fs
+from services.presentation_files import FINAL, presentation_files_service
+from services.html_image_resolver import get_html_image_processor
+from utils.compression import precompressed_file_response
+from utils.file_responses import conditional_file_response
+from utils.html_templates import render_fallback_presentation, render_with_template
+from utils.static_assets import inline_stylesheets
 from ai_services.manager import ai_manager
+from services.template_cache import template_cache
 from services.template_service import TemplateService
-from ai_services.image_service import image_service, get_image_for_slide
+from ai_services.image_service import image_service
+from ai_services.keyword_extractor import resolve_slide_queries
 
 router = APIRouter(tags=["Main Generation"])
 
@@ -50,7 +57,7 @@ async def generate_presentation(
     2. Для гостя - проверить и списать кредит
     3. Сгенерировать HTML-презентацию (без фото)
     4. Сохранить черновой HTML
-    5. Отправить в микросервис картинок
+    5. Подставить картинки (внутри процесса или через микросервис)
     6. Получить финальный HTML с рабочими URL картинок
     7. Сохранить финальный вариант
     8. Вернуть результат
@@ -116,10 +123,14 @@ async def generate_presentation(
         
         # --- Новый блок: подбор изображений для слайдов ---
         if slides:
-            image_tasks = []
-            for slide in slides:
-                search_query = f"{slide.get('title','')} {slide.get('content','')}"
-                image_tasks.append(get_image_for_slide(search_query))
+            # image_query от модели используется напрямую, для остальных слайдов
+            # ключевые слова извлекаются за один проход
+            slide_queries = resolve_slide_queries(slides)
+            # Плейсхолдеры (если Pexels недоступен) окрашиваются в цвета шаблона
+            image_tasks = [
+                image_service.search_for_keywords(query, theme=template_id or "default")
+                for query in slide_queries
+            ]
             images = await asyncio.gather(*image_tasks)
             for i, slide in enumerate(slides):
                 image = images[i] if i < len(images) else None
@@ -129,25 +140,14 @@ async def generate_presentation(
         
         # Если выбран шаблон, подставляем контент в шаблон
         if template_id:
-            # Сначала ищем встроенный шаблон
-            builtin = TemplateService.get_builtin_template(template_id)
-            template_html = None
-            if builtin:
-                template_html = builtin['html_content']
-            else:
-                template_html = await TemplateService.get_template_html(template_id, session)
-            if template_html:
-                slides_html = ""
-                if slides:
-                    for i, slide in enumerate(slides):
-                        # Вставка изображения, если есть
-                        img_html = ""
-                        if slide.get('image') and slide['image'].get('url'):
-                            img_html = f"<div class='slide-image'><img src='{slide['image']['url']}' alt='{slide['image'].get('alt','')}' /><div class='image-credit'>Фото: {slide['image'].get('photographer','')} | Pexels</div></div>"
-                        slides_html += f"<div class='slide'><h2>{slide.get('title','')}</h2><div class='content'>{slide.get('content','')}</div>{img_html}</div>"
-                else:
-                    slides_html = "<div class='slide'><h2>Нет слайдов</h2></div>"
-                raw_html = template_html.replace("{{slides}}", slides_html).replace("{{title}}", title)
+            # Встроенные и пользовательские шаблоны берутся из кэша в разобранном виде
+            template = await template_cache.get(template_id, session)
+            if template:
+                builtin = TemplateService.get_builtin_template(template_id)
+                raw_html = render_with_template(
+                    template, title or request.topic, slides,
+                    stylesheet_name=builtin.get("stylesheet") if builtin else None
+                )
             else:
                 raw_html = await _create_fallback_html(request)
         else:
@@ -161,8 +161,8 @@ async def generate_presentation(
             user_or_guest_id, presentation_id, raw_html
         )
         
-        # 3. Отправляем в микросервис картинок
-        final_html = await image_microservice_client.process_html_with_images(
+        # 3. Подставляем картинки (внутри процесса или через микросервис)
+        final_html = await get_html_image_processor().process_html_with_images(
             raw_html, request.topic
         )
         
@@ -171,12 +171,23 @@ async def generate_presentation(
             user_or_guest_id, presentation_id, final_html
         )
         
-        # 5. Возвращаем только HTML
+        # 5. Возвращаем только HTML (сжатый вариант, сохраненный вместе с файлом)
+        # ID презентации (и гостевой сессии) - для повторного открытия через GET
+        response_headers = {"X-Presentation-Id": presentation_id}
+        if guest_session_id:
+            response_headers["X-Guest-Session"] = guest_session_id
+        final_file = await presentation_files_service.get_final_html_file(
+            user_or_guest_id, presentation_id, req.headers.get("Accept-Encoding")
+        )
+        if final_file:
+            file_path, encoding = final_file
+            return precompressed_file_response(file_path, encoding, headers=response_headers)
         return HTMLResponse(
             content=final_html,
             status_code=200,
             headers={
-                "Content-Type": "text/html; charset=utf-8"
+                "Content-Type": "text/html; charset=utf-8",
+                **response_headers
             }
         )
         
@@ -190,6 +201,63 @@ async def generate_presentation(
             content={"error": f"Generation failed: {str(e)}"}
         )
 
+@router.api_route("/generate-presentation/{presentation_id}", methods=["GET", "HEAD"])
+async def get_generated_presentation(
+    presentation_id: str,
+    req: Request,
+    kind: str = Query(FINAL, pattern="^(raw|final)$", description="raw - черновой, final - с картинками"),
+    standalone: bool = Query(False, description="Автономный HTML для скачивания: стили внутри документа"),
+    current_user: Optional[User] = Depends(get_current_user_optional),
+    x_guest_session: Optional[str] = Header(None, alias="X-Guest-Session")
+):
+    """
+    Повторное открытие сохраненной презентации
+
+    Файл отдается сервером без чтения в Python (сжатый вариант, если клиент
+    его принимает), с ETag/Last-Modified, ответом 304 и поддержкой Range.
+    Документ ссылается на версионированные стили; standalone=true отдает
+    файл для скачивания со встроенными стилями.
+    """
+    if current_user:
+        user_or_guest_id = f"user_{current_user.id}"
+    elif x_guest_session:
+        user_or_guest_id = f"guest_{x_guest_session}"
+    else:
+        raise HTTPException(status_code=401, detail="Authorization or X-Guest-Session header required")
+
+    # Части файла и автономная версия строятся от несжатого представления
+    accept_encoding = None if standalone or req.headers.get("range") else req.headers.get("accept-encoding")
+    try:
+        stored = await presentation_files_service.get_document_file(
+            user_or_guest_id, presentation_id, kind, accept_encoding
+        )
+    except ValueError:
+        stored = None
+    if stored is None:
+        raise HTTPException(status_code=404, detail="Presentation not found")
+
+    if standalone:
+        document = await async_fs.read_bytes(stored.path)
+        if document is None:
+            raise HTTPException(status_code=404, detail="Presentation not found")
+        return Response(
+            content=inline_stylesheets(document.decode("utf-8")),
+            media_type="text/html; charset=utf-8",
+            headers={
+                "Content-Disposition": f'attachment; filename="presentation_{presentation_id}.html"',
+                "Cache-Control": "private, no-cache"
+            }
+        )
+
+    return conditional_file_response(
+        req,
+        stored.path,
+        stored.stat,
+        stored.etag,
+        encoding=stored.encoding,
+        headers={"Cache-Control": "private, no-cache"}
+    )
+
 @router.get("/guest-credits", response_model=GuestCreditsInfo)
 async def get_guest_credits(
     req: Request,
@@ -214,40 +282,6 @@ async def get_guest_credits(
 
 async def _create_fallback_html(request: PresentationGenerateRequest) -> str:
     """Создать простой HTML в случае отказа AI сервиса"""
-    slides_html = ""
-    
-    for i in range(request.slides_count):
-        slide_title = f"Слайд {i + 1}"
-        if i == 0:
-            slide_title = request.topic
-        
-        slides_html += f"""
-        <div class="slide">
-            <h2>{slide_title}</h2>
-            <div class="content">
-                <p>Содержимое слайда {i + 1}</p>
-                {f'<p>{request.content}</p>' if request.content and i == 1 else ''}
-            </div>
-        </div>
-        """
-    
-    return f"""
-    <!DOCTYPE html>
-    <html lang="{request.language}">
-    <head>
-        <meta charset="UTF-8">
-        <meta name="viewport" content="width=device-width, initial-scale=1.0">
-        <title>{request.topic}</title>
-        <style>
-            body {{ font-family: Arial, sans-serif; margin: 0; padding: 20px; }}
-            .slide {{ background: white; margin: 20px 0; padding: 30px; border-radius: 10px; box-shadow: 0 2px 10px rgba(0,0,0,0.1); }}
-            h2 {{ color: #333; border-bottom: 2px solid #007bff; padding-bottom: 10px; }}
-            .content {{ margin-top: 20px; line-height: 1.6; }}
-        </style>
-    </head>
-    <body>
-        <h1>{request.topic}</h1>
-        {slides_html}
-    </body>
-    </html>
-    """
+    return render_fallback_presentation(
+        request.topic, request.language, request.slides_count, request.content
+    )
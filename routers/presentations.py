@@ -1,5 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from fastapi.responses import FileResponse
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
 from models.base import get_session
@@ -7,12 +6,15 @@ from models.user import User
 from models.presentation import Presentation
 from schemas.presentation import PresentationResponse, PresentationCreate
 from utils.auth import get_current_user
+from services.viewer_cache import viewer_cache
 
 import os
 from sqlalchemy import select
 
-# Import PPTX generator
-from utils.pptx_generator import generate_presentation_pptx
+# Экспорт в PPTX/PDF выполняется в пуле процессов, готовые файлы кэшируются
+from services.export_cache import export_cache
+from services.export_service import EXPORT_FORMATS, ExportQueueFull
+from utils.file_responses import conditional_file_response
 
 router = APIRouter(prefix="/presentations", tags=["presentations"])
 
@@ -82,6 +84,8 @@ async def update_presentation(
     db_presentation.board_id = presentation.board_id
     await session.commit()
     await session.refresh(db_presentation)
+    # Опубликованная страница просмотра должна показать новую версию
+    await viewer_cache.invalidate(db_presentation.public_id)
     return db_presentation
 
 @router.delete("/{presentation_id}")
@@ -94,13 +98,17 @@ async def delete_presentation(
     db_presentation = result.scalars().first()
     if not db_presentation:
         raise HTTPException(status_code=404, detail="Presentation not found")
+    public_id = db_presentation.public_id
     await session.delete(db_presentation)
     await session.commit()
+    await viewer_cache.invalidate(public_id)
     return {"ok": True}
 
 @router.get("/download/{presentation_id}")
 async def download_presentation(
     presentation_id: int,
+    request: Request,
+    format: str = Query("pptx", pattern="^(pptx|pdf)$", description="Формат файла: pptx или pdf"),
     current_user: User = Depends(get_current_user),
     session: AsyncSession = Depends(get_session)
 ):
@@ -109,17 +117,39 @@ async def download_presentation(
     if not db_presentation:
         raise HTTPException(status_code=404, detail="Presentation not found")
     
+    export_format = EXPORT_FORMATS[format]
     try:
-        # Генерируем PPTX файл
-        pptx_path = await generate_presentation_pptx(db_presentation.content)
-        return FileResponse(
-            pptx_path, 
-            filename=f"presentation_{presentation_id}.pptx",
-            media_type="application/vnd.openxmlformats-officedocument.presentationml.presentation"
+        # Неизменившаяся презентация отдается из кэша экспорта как статический файл,
+        # иначе файл собирается в отдельном процессе и сохраняется в кэш
+        artifact = await export_cache.get_or_build(export_format.name, db_presentation.content)
+        disposition = f'attachment; filename="presentation_{presentation_id}.{export_format.extension}"'
+        if artifact.data is not None:
+            # Неполная сборка (часть изображений недоступна) - не кэшируется и браузером
+            return Response(
+                content=artifact.data,
+                media_type=export_format.media_type,
+                headers={"Content-Disposition": disposition, "Cache-Control": "no-store"}
+            )
+        return conditional_file_response(
+            request,
+            artifact.path,
+            artifact.stat,
+            artifact.etag,
+            media_type=export_format.media_type,
+            headers={
+                "Content-Disposition": disposition,
+                "Cache-Control": "private, no-cache"
+            }
+        )
+    except ExportQueueFull:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many exports in progress, try again later",
+            headers={"Retry-After": "5"}
         )
     except Exception as e:
         # В случае ошибки возвращаем JSON с данными презентации
         raise HTTPException(
             status_code=500,
-            detail=f"Failed to generate PPTX: {str(e)}"
+            detail=f"Failed to generate {export_format.name.upper()}: {str(e)}"
         ) 
\ No newline at end of file
@@ -2,7 +2,7 @@
 Роутер для публичных презентаций с шарингом
 """
 from fastapi import APIRouter, Depends, HTTPException, status, Request
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, Response, StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, update
 from models.base import get_session
@@ -10,10 +10,15 @@ from models.user import User
 from models.presentation import Presentation
 from schemas.presentation import PresentationResponse
 from utils.auth import get_current_user
+from utils.compression import choose_encoding
+from utils.html_templates import PUBLIC_NOT_FOUND_HTML, stream_public_viewer
+from services.viewer_cache import content_version, etag_matches, make_etag, view_counter, viewer_cache
+from config.settings import get_settings
 from typing import Optional
 import uuid
 from datetime import datetime
 
+settings = get_settings()
 router = APIRouter(prefix="/public", tags=["public"])
 
 @router.post("/presentations/{presentation_id}/share")
@@ -40,6 +45,7 @@ async def make_presentation_public(
         )
     
     # Генерируем уникальный публичный ID
+    previous_public_id = presentation.public_id
     public_id = str(uuid.uuid4())
     
     # Обновляем презентацию
@@ -54,6 +60,9 @@ async def make_presentation_public(
     )
     await session.commit()
     
+    # Прежняя публичная ссылка перестает работать
+    await viewer_cache.invalidate(previous_public_id)
+    
     return {
         "message": "Презентация стала публичной",
         "public_id": public_id,
@@ -83,6 +92,7 @@ async def make_presentation_private(
             detail="Презентация не найдена"
         )
     
+    previous_public_id = presentation.public_id
     await session.execute(
         update(Presentation)
         .where(Presentation.id == presentation_id)
@@ -93,6 +103,9 @@ async def make_presentation_private(
     )
     await session.commit()
     
+    # Старая ссылка больше не должна отдаваться из кэша
+    await viewer_cache.invalidate(previous_public_id)
+    
     return {"message": "Презентация стала приватной"}
 
 @router.get("/presentations/{public_id}", response_model=PresentationResponse)
@@ -116,23 +129,37 @@ async def get_public_presentation(
             detail="Публичная презентация не найдена"
         )
     
-    # Увеличиваем счетчик просмотров
-    await session.execute(
-        update(Presentation)
-        .where(Presentation.id == presentation.id)
-        .values(views_count=(Presentation.views_count or 0) + 1)
-    )
-    await session.commit()
+    # Увеличиваем счетчик просмотров (запись в БД пакетами)
+    view_counter.record(presentation.id)
     
     return presentation
 
 @router.get("/presentations/{public_id}/viewer", response_class=HTMLResponse)
 async def view_public_presentation(
     public_id: str,
+    request: Request,
     session: AsyncSession = Depends(get_session)
 ):
     """HTML страница для просмотра публичной презентации"""
     
+    if_none_match = request.headers.get("If-None-Match")
+    
+    # Готовая страница из кэша - без запроса к БД и рендера
+    page = await viewer_cache.get(public_id)
+    if page is not None:
+        view_counter.record(page.presentation_id)
+        headers = _viewer_headers(page.etag)
+        if etag_matches(if_none_match, page.etag):
+            return Response(status_code=304, headers=headers)
+        # Сжатый при сохранении в кэш вариант - middleware его повторно не сжимает
+        encoding = choose_encoding(request.headers.get("accept-encoding"), list(page.variants))
+        if encoding:
+            headers["Content-Encoding"] = encoding
+        body = page.variants[encoding] if encoding else page.body
+        return Response(body, media_type="text/html; charset=utf-8", headers=headers)
+    
+    # Версия записи до чтения из БД: сброс во время рендера не даст сохранить устаревшую страницу
+    token = await viewer_cache.render_token(public_id)
     result = await session.execute(
         select(Presentation).where(
             Presentation.public_id == public_id,
@@ -142,194 +169,35 @@ async def view_public_presentation(
     presentation = result.scalars().first()
     
     if not presentation:
-        return HTMLResponse("""
-        <html>
-            <head><title>Презентация не найдена</title></head>
-            <body>
-                <h1>❌ Презентация не найдена</h1>
-                <p>Публичная презентация не существует или была удалена.</p>
-            </body>
-        </html>
-        """, status_code=404)
-    
-    # Генерируем HTML для просмотра
-    slides_html = ""
-    for i, slide in enumerate(presentation.content.get("slides", [])):
-        slides_html += f"""
-        <div class="slide" id="slide-{i}" style="display: {'block' if i == 0 else 'none'}">
-            <h2>{slide.get('title', '')}</h2>
-            <div class="content">{slide.get('content', '').replace(chr(10), '<br>')}</div>
-        </div>
-        """
-    
-    html_content = f"""
-    <!DOCTYPE html>
-    <html lang="ru">
-    <head>
-        <meta charset="UTF-8">
-        <meta name="viewport" content="width=device-width, initial-scale=1.0">
-        <title>{presentation.title} - SayDeck</title>
-        <style>
-            body {{
-                font-family: 'Arial', sans-serif;
-                margin: 0;
-                padding: 20px;
-                background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-                min-height: 100vh;
-                color: white;
-            }}
-            .presentation-container {{
-                max-width: 800px;
-                margin: 0 auto;
-                background: rgba(255, 255, 255, 0.1);
-                backdrop-filter: blur(10px);
-                border-radius: 20px;
-                padding: 30px;
-                box-shadow: 0 8px 32px rgba(31, 38, 135, 0.37);
-            }}
-            .header {{
-                text-align: center;
-                margin-bottom: 30px;
-                border-bottom: 2px solid rgba(255, 255, 255, 0.2);
-                padding-bottom: 20px;
-            }}
-            .slide {{
-                background: rgba(255, 255, 255, 0.05);
-                padding: 30px;
-                border-radius: 15px;
-                margin: 20px 0;
-                min-height: 400px;
-            }}
-            .slide h2 {{
-                color: #fff;
-                margin-top: 0;
-                font-size: 2em;
-                margin-bottom: 20px;
-            }}
-            .content {{
-                font-size: 1.2em;
-                line-height: 1.6;
-                color: rgba(255, 255, 255, 0.9);
-            }}
-            .controls {{
-                text-align: center;
-                margin-top: 30px;
-            }}
-            button {{
-                background: #28a745;
-                color: white;
-                border: none;
-                padding: 12px 24px;
-                margin: 0 10px;
-                border-radius: 8px;
-                cursor: pointer;
-                font-size: 16px;
-                transition: background 0.3s;
-            }}
-            button:hover {{
-                background: #218838;
-            }}
-            button:disabled {{
-                background: #6c757d;
-                cursor: not-allowed;
-            }}
-            .slide-counter {{
-                background: rgba(0, 0, 0, 0.3);
-                padding: 8px 15px;
-                border-radius: 20px;
-                margin: 20px 0;
-                text-align: center;
-            }}
-            .share-info {{
-                background: rgba(255, 255, 255, 0.1);
-                padding: 15px;
-                border-radius: 10px;
-                margin-top: 20px;
-                text-align: center;
-                font-size: 0.9em;
-            }}
-        </style>
-    </head>
-    <body>
-        <div class="presentation-container">
-            <div class="header">
-                <h1>🎤 {presentation.title}</h1>
-                <p>Публичная презентация из SayDeck</p>
-                <div class="slide-counter">
-                    <span id="current-slide">1</span> / <span id="total-slides">{len(presentation.content.get('slides', []))}</span>
-                </div>
-            </div>
-            
-            <div class="slides-container">
-                {slides_html}
-            </div>
-            
-            <div class="controls">
-                <button id="prev-btn" onclick="prevSlide()">← Предыдущий</button>
-                <button id="next-btn" onclick="nextSlide()">Следующий →</button>
-            </div>
-            
-            <div class="share-info">
-                <p>💡 Создано в <strong>SayDeck</strong> - генерация презентаций с помощью AI</p>
-                <p>🔗 Поделиться: <code>{public_id}</code></p>
-            </div>
-        </div>
-
-        <script>
-            let currentSlide = 0;
-            const totalSlides = {len(presentation.content.get('slides', []))};
-            
-            function showSlide(n) {{
-                const slides = document.querySelectorAll('.slide');
-                slides.forEach(slide => slide.style.display = 'none');
-                
-                if (n >= totalSlides) currentSlide = 0;
-                if (n < 0) currentSlide = totalSlides - 1;
-                
-                slides[currentSlide].style.display = 'block';
-                document.getElementById('current-slide').textContent = currentSlide + 1;
-                
-                // Обновляем кнопки
-                document.getElementById('prev-btn').disabled = currentSlide === 0;
-                document.getElementById('next-btn').disabled = currentSlide === totalSlides - 1;
-            }}
-            
-            function nextSlide() {{
-                if (currentSlide < totalSlides - 1) {{
-                    currentSlide++;
-                    showSlide(currentSlide);
-                }}
-            }}
-            
-            function prevSlide() {{
-                if (currentSlide > 0) {{
-                    currentSlide--;
-                    showSlide(currentSlide);
-                }}
-            }}
-            
-            // Управление клавиатурой
-            document.addEventListener('keydown', function(e) {{
-                if (e.key === 'ArrowRight' || e.key === ' ') nextSlide();
-                if (e.key === 'ArrowLeft') prevSlide();
-            }});
-            
-            // Инициализация
-            showSlide(0);
-        </script>
-    </body>
-    </html>
-    """
-    
-    # Увеличиваем счетчик просмотров
-    await session.execute(
-        update(Presentation)
-        .where(Presentation.id == presentation.id)
-        .values(views_count=(Presentation.views_count or 0) + 1)
+        return HTMLResponse(PUBLIC_NOT_FOUND_HTML, status_code=404)
+    
+    title = presentation.title
+    slides = presentation.content.get("slides", [])
+    etag = make_etag(content_version(title, presentation.content))
+    view_counter.record(presentation.id)
+    
+    headers = _viewer_headers(etag)
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    
+    # Отдаем страницу потоком: <head> с CSS уходит сразу, слайды - по мере рендера;
+    # после отдачи страница попадает в кэш
+    return StreamingResponse(
+        viewer_cache.cache_stream(
+            token, presentation.id, etag,
+            stream_public_viewer(title, slides, public_id)
+        ),
+        media_type="text/html; charset=utf-8",
+        headers=headers
     )
-    await session.commit()
-    
-    return HTMLResponse(html_content)
+
+def _viewer_headers(etag: str) -> dict:
+    """Заголовки кэширования страницы просмотра"""
+    return {
+        "ETag": etag,
+        "Cache-Control": settings.VIEWER_CACHE_CONTROL,
+        "Vary": "Accept-Encoding"
+    }
 
 @router.get("/presentations")
 async def list_public_presentations(
@@ -9,6 +9,8 @@ from models.base import get_session
 from models.user import User
 from utils.auth import get_current_user
 from services.template_service import TemplateService
+from utils.html_renderer import compile_template
+from utils.static_assets import stylesheet
 from schemas.template import (
     TemplateResponse, 
     TemplateDetail, 
@@ -125,6 +127,11 @@ async def get_template_viewer(
             detail="Template not found"
         )
     
+    # Встроенные шаблоны подключают стили через слот {{styles}}
+    builtin = TemplateService.get_builtin_template(template_id)
+    if builtin:
+        html_content = compile_template(html_content).render(styles=stylesheet(builtin["stylesheet"]))
+    
     return HTMLResponse(
         content=html_content,
         status_code=200,
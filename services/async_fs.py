@@ -0,0 +1,107 @@
+"""
+Async FS - неблокирующие файловые операции и шардирование каталогов хранилища
+"""
+import asyncio
+import hashlib
+import os
+import re
+import shutil
+import uuid
+from pathlib import Path
+from typing import List, Optional
+
+import aiofiles
+
+# Допустимые имена сегментов пути (ID пользователя/гостя, ID презентации)
+SAFE_COMPONENT_RE = re.compile(r"^[A-Za-z0-9_.-]{1,128}$")
+
+# Два уровня по 256 каталогов: 65536 шардов
+SHARD_LEVELS = 2
+SHARD_COUNT = 256 ** SHARD_LEVELS
+
+
+def safe_component(value: str) -> str:
+    """Проверяет, что значение можно использовать как один сегмент пути"""
+    if not SAFE_COMPONENT_RE.match(value or "") or value in (".", ".."):
+        raise ValueError(f"Invalid path component: {value!r}")
+    return value
+
+
+def shard_prefix(key: str, levels: int = SHARD_LEVELS) -> Path:
+    """
+    Префикс шарда по хэшу ключа: 'guest_abc' -> '3f/a2'
+
+    Каталоги верхнего уровня остаются небольшими при любом числе владельцев,
+    поэтому поиск записи в каталоге не деградирует.
+    """
+    digest = hashlib.sha256(key.encode("utf-8")).hexdigest()
+    return Path(*(digest[i * 2:i * 2 + 2] for i in range(levels)))
+
+
+def shard_by_index(index: int, levels: int = SHARD_LEVELS) -> str:
+    """Шард по порядковому номеру (0..SHARD_COUNT-1): 0x3fa2 -> '3f/a2'"""
+    return "/".join(f"{(index >> (8 * (levels - 1 - level))) & 0xff:02x}" for level in range(levels))
+
+
+async def stat(path: Path) -> Optional[os.stat_result]:
+    """stat() вне event loop; None, если файла нет"""
+    try:
+        return await asyncio.to_thread(os.stat, path)
+    except FileNotFoundError:
+        return None
+
+
+async def exists(path: Path) -> bool:
+    return await stat(path) is not None
+
+
+async def makedirs(path: Path):
+    await asyncio.to_thread(os.makedirs, path, exist_ok=True)
+
+
+async def remove(path: Path) -> bool:
+    try:
+        await asyncio.to_thread(os.remove, path)
+        return True
+    except FileNotFoundError:
+        return False
+
+
+async def rmtree(path: Path) -> bool:
+    try:
+        await asyncio.to_thread(shutil.rmtree, path)
+        return True
+    except FileNotFoundError:
+        return False
+
+
+async def listdir(path: Path) -> List[str]:
+    try:
+        return await asyncio.to_thread(os.listdir, path)
+    except FileNotFoundError:
+        return []
+
+
+async def read_bytes(path: Path) -> Optional[bytes]:
+    try:
+        async with aiofiles.open(path, "rb") as f:
+            return await f.read()
+    except FileNotFoundError:
+        return None
+
+
+async def write_bytes_atomic(path: Path, data: bytes):
+    """
+    Записать файл атомарно (через временный файл и rename)
+
+    Каталог создается только здесь - при записи, а не при чтении.
+    """
+    await makedirs(path.parent)
+    tmp_path = path.with_name(f".{path.name}.{uuid.uuid4().hex}.tmp")
+    try:
+        async with aiofiles.open(tmp_path, "wb") as f:
+            await f.write(data)
+        await asyncio.to_thread(os.replace, tmp_path, path)
+    except BaseException:
+        await remove(tmp_path)
+        raise
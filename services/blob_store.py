@@ -0,0 +1,188 @@
+"""
+Blob Store - контентно-адресуемое хранение HTML с подсчетом ссылок
+
+Документ хранится один раз под ключом по SHA-256 содержимого:
+    blobs/<aa>/<bb>/<sha256>.html (+ .gz/.br)
+Каждая ссылающаяся на него презентация оставляет маркер
+    refs/<aa>/<sha256>/<owner>.<presentation_id>
+Число маркеров - счетчик ссылок. Маркеры идемпотентны и не требуют
+атомарного инкремента.
+
+asyncio.Lock защищает блоб только внутри процесса. Между задачами, которые
+делят одно хранилище (S3), удаление объявляется маркером
+    refs/<aa>/<sha256>.deleting
+Удаляющий пишет маркер и перечитывает ссылки, сохраняющий пишет ссылку и
+проверяет маркер. Хранилище с согласованным чтением после записи (S3,
+локальный диск) гарантирует, что хотя бы одна сторона увидит другую: либо
+удаление отменяется, либо сохраняющий дожидается его и пишет блоб заново.
+"""
+import asyncio
+import hashlib
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from config.settings import get_settings
+from services import async_fs
+from services.storage_backends import StorageBackend
+from utils.compression import ENCODING_SUFFIXES, compress_variants
+
+settings = get_settings()
+
+BLOBS_PREFIX = "blobs"
+REFS_PREFIX = "refs"
+BLOB_SUFFIX = ".html"
+
+# Маркер удаления старше этого считается брошенным (задача упала посреди удаления)
+DELETE_MARKER_TIMEOUT = 60.0
+DELETE_MARKER_POLL = 0.2
+
+
+def content_digest(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+class BlobStore:
+    """Хранилище блобов поверх StorageBackend"""
+
+    def __init__(self, backend: StorageBackend):
+        self.backend = backend
+        self._locks: Dict[str, asyncio.Lock] = {}
+
+        # Метрики
+        self.blobs_written = 0
+        self.duplicate_writes_skipped = 0
+        self.bytes_deduplicated = 0
+        self.blobs_deleted = 0
+
+    @staticmethod
+    def blob_key(digest: str, encoding: Optional[str] = None) -> str:
+        key = f"{BLOBS_PREFIX}/{digest[:2]}/{digest[2:4]}/{digest}{BLOB_SUFFIX}"
+        return key + ENCODING_SUFFIXES[encoding] if encoding else key
+
+    @staticmethod
+    def _refs_prefix(digest: str) -> str:
+        return f"{REFS_PREFIX}/{digest[:2]}/{digest}"
+
+    def _ref_key(self, digest: str, ref: str) -> str:
+        return f"{self._refs_prefix(digest)}/{async_fs.safe_component(ref)}"
+
+    def _delete_marker_key(self, digest: str) -> str:
+        # Рядом с каталогом ссылок, а не внутри: маркер не считается ссылкой
+        return f"{self._refs_prefix(digest)}.deleting"
+
+    async def _wait_for_delete(self, digest: str):
+        """Дождаться удаления блоба, которое начала другая задача"""
+        key = self._delete_marker_key(digest)
+        while True:
+            marker = await self.backend.stat(key)
+            if marker is None or time.time() - marker.modified > DELETE_MARKER_TIMEOUT:
+                return
+            await asyncio.sleep(DELETE_MARKER_POLL)
+
+    def _lock(self, digest: str) -> asyncio.Lock:
+        lock = self._locks.get(digest)
+        if lock is None:
+            lock = self._locks[digest] = asyncio.Lock()
+        return lock
+
+    def _drop_lock(self, digest: str):
+        lock = self._locks.get(digest)
+        if lock is not None and not lock.locked():
+            del self._locks[digest]
+
+    async def put(self, data: bytes, ref: str, compress: bool = False) -> str:
+        """
+        Сохранить документ и добавить ссылку ref на него
+
+        Если такой блоб уже есть, он не перезаписывается; сжатие выполняется,
+        только если compress и сжатых вариантов еще нет.
+        Returns:
+            SHA-256 содержимого
+        """
+        digest = content_digest(data)
+        async with self._lock(digest):
+            # Ссылка пишется до блоба: удаление не освободит блоб, который сейчас сохраняется
+            await self.backend.put(self._ref_key(digest, ref), b"")
+            # Удаление, начатое до нашей ссылки, не отменится - ждем его и пишем блоб заново
+            await self._wait_for_delete(digest)
+
+            blob_exists = await self.backend.exists(self.blob_key(digest))
+            # gzip-вариант создается всегда (brotli - только если установлен)
+            variants_missing = compress and not (
+                blob_exists and await self.backend.exists(self.blob_key(digest, "gzip"))
+            )
+
+            if variants_missing:
+                # Сжатие на максимальном уровне выполняется один раз, вне event loop
+                variants = await asyncio.to_thread(
+                    compress_variants, data, settings.PRECOMPRESS_GZIP_LEVEL, settings.PRECOMPRESS_BROTLI_QUALITY
+                )
+                for encoding, compressed in variants.items():
+                    await self.backend.put(self.blob_key(digest, encoding), compressed)
+
+            if blob_exists:
+                self.duplicate_writes_skipped += 1
+                self.bytes_deduplicated += len(data)
+            else:
+                # Сам блоб пишется после вариантов: его наличие означает готовность
+                await self.backend.put(self.blob_key(digest), data)
+                self.blobs_written += 1
+        self._drop_lock(digest)
+        return digest
+
+    async def release(self, digest: str, ref: str) -> int:
+        """
+        Убрать ссылку ref; блоб без ссылок удаляется вместе со сжатыми вариантами
+        Returns:
+            Число освобожденных байт (0, если на блоб еще есть ссылки)
+        """
+        freed = 0
+        async with self._lock(digest):
+            await self.backend.delete(self._ref_key(digest, ref))
+            if not await self.backend.list(self._refs_prefix(digest)):
+                marker_key = self._delete_marker_key(digest)
+                await self.backend.put(marker_key, b"")
+                try:
+                    # Ссылка, записанная до маркера, видна здесь - удаление отменяется;
+                    # записанная после увидит маркер и дождется удаления в put()
+                    if not await self.backend.list(self._refs_prefix(digest)):
+                        for encoding in (*ENCODING_SUFFIXES, None):
+                            key = self.blob_key(digest, encoding)
+                            stored = await self.backend.stat(key)
+                            if stored is not None:
+                                freed += stored.size
+                                await self.backend.delete(key)
+                        self.blobs_deleted += 1
+                finally:
+                    await self.backend.delete(marker_key)
+        self._drop_lock(digest)
+        return freed
+
+    async def usage(self, digest: str) -> int:
+        """Размер блоба вместе со сжатыми вариантами"""
+        total = 0
+        for encoding in (*ENCODING_SUFFIXES, None):
+            total += await self.size(digest, encoding) or 0
+        return total
+
+    async def ref_count(self, digest: str) -> int:
+        return len(await self.backend.list(self._refs_prefix(digest)))
+
+    async def get(self, digest: str) -> Optional[bytes]:
+        return await self.backend.get(self.blob_key(digest))
+
+    async def local_path(self, digest: str, encoding: Optional[str] = None) -> Optional[Path]:
+        return await self.backend.local_path(self.blob_key(digest, encoding))
+
+    async def size(self, digest: str, encoding: Optional[str] = None) -> Optional[int]:
+        stored = await self.backend.stat(self.blob_key(digest, encoding))
+        return stored.size if stored else None
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "blobs_written": self.blobs_written,
+            "duplicate_writes_skipped": self.duplicate_writes_skipped,
+            "bytes_deduplicated": self.bytes_deduplicated,
+            "blobs_deleted": self.blobs_deleted,
+        }
@@ -0,0 +1,73 @@
+"""
+Circuit Breaker - защита от ожидания заведомо недоступных сервисов
+"""
+import time
+from typing import Optional
+
+
+class CircuitBreaker:
+    """
+    Простой circuit breaker
+
+    closed    - запросы идут как обычно, ошибки подсчитываются
+    open      - после failure_threshold ошибок подряд запросы сразу отклоняются
+    half_open - по истечении recovery_timeout пропускается один пробный запрос
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 3, recovery_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.consecutive_failures = 0
+        self.opened_at: Optional[float] = None
+        self._probe_in_flight = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return self.CLOSED
+        if time.monotonic() - self.opened_at >= self.recovery_timeout:
+            return self.HALF_OPEN
+        return self.OPEN
+
+    def allow_request(self) -> bool:
+        """Можно ли сейчас обращаться к сервису"""
+        state = self.state
+        if state == self.CLOSED:
+            return True
+        if state == self.HALF_OPEN and not self._probe_in_flight:
+            self._probe_in_flight = True
+            return True
+        return False
+
+    def record_success(self):
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self._probe_in_flight = False
+
+    def record_failure(self):
+        self.consecutive_failures += 1
+        self._probe_in_flight = False
+        if self.opened_at is not None or self.consecutive_failures >= self.failure_threshold:
+            # Пробный запрос не удался или превышен порог - (пере)открываем цепь
+            self.opened_at = time.monotonic()
+
+    def release_probe(self):
+        """
+        Освободить пробный запрос, не меняя состояние цепи
+
+        Вызывается в finally: если пробный запрос отменен, ни record_success,
+        ни record_failure не выполняются, и без этого цепь не закрылась бы никогда.
+        """
+        self._probe_in_flight = False
+
+    def to_dict(self) -> dict:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "failure_threshold": self.failure_threshold,
+            "recovery_timeout": self.recovery_timeout,
+        }
@@ -0,0 +1,199 @@
+"""
+Export Cache - кэш собранных файлов экспорта (PPTX и др.) в хранилище
+
+Ключ - хэш содержимого презентации, формата и версии сборщика:
+    exports/<format>/<aa>/<hash>.<ext>
+Неизменившаяся презентация повторно не собирается, файл отдается как
+статический. Неполная сборка (не скачались изображения) не кэшируется:
+иначе временный сбой отдавался бы до следующего изменения презентации.
+
+Хранилище общее для всех задач ECS, поэтому и состояние LRU хранится в нем:
+время изменения файла - время последнего использования (обновляется при
+попадании не чаще EXPORT_CACHE_TOUCH_INTERVAL). Общий размер кэша ограничен
+EXPORT_CACHE_MAX_BYTES: после записи задача перечисляет файлы в хранилище и
+удаляет давно не запрашивавшиеся.
+"""
+import asyncio
+import hashlib
+import json
+import os
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from config.settings import get_settings
+from services import async_fs
+from services.export_service import EXPORT_FORMATS, ExportFormat, export_service
+from services.presentation_files import presentation_files_service
+from services.storage_backends import StorageBackend
+from utils.single_flight import SingleFlight
+
+settings = get_settings()
+
+EXPORTS_PREFIX = "exports"
+
+
+@dataclass
+class ExportArtifact:
+    """
+    Собранный файл экспорта в локальном кэше хранилища
+
+    Для неполной сборки файла в хранилище нет: path и stat - None,
+    содержимое в data.
+    """
+    path: Optional[Path]
+    stat: Optional[os.stat_result]
+    etag: Optional[str]
+    export_format: ExportFormat
+    data: Optional[bytes] = None
+
+
+def export_digest(export_format: ExportFormat, content: Any) -> str:
+    """Хэш содержимого презентации вместе с форматом и версией сборщика"""
+    payload = json.dumps(
+        {"format": export_format.name, "version": export_format.version, "content": content},
+        sort_keys=True,
+        ensure_ascii=False,
+        default=str,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ExportCache:
+    """LRU-кэш файлов экспорта поверх общего StorageBackend"""
+
+    def __init__(self, backend: StorageBackend = None, max_bytes: int = None, touch_interval: int = None):
+        self.backend = backend or presentation_files_service.backend
+        self.max_bytes = max_bytes or settings.EXPORT_CACHE_MAX_BYTES
+        self.touch_interval = touch_interval if touch_interval is not None else settings.EXPORT_CACHE_TOUCH_INTERVAL
+        # Когда эта задача последний раз отмечала использование файла
+        self._touched: Dict[str, float] = {}
+        self._trim_lock = asyncio.Lock()
+        self._builds = SingleFlight()
+
+        # Размер общего кэша по последнему перечислению хранилища
+        self.files = 0
+        self.bytes = 0
+
+        # Метрики
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.incomplete = 0
+
+    @staticmethod
+    def _key(export_format: ExportFormat, digest: str) -> str:
+        return f"{EXPORTS_PREFIX}/{export_format.name}/{digest[:2]}/{digest}.{export_format.extension}"
+
+    async def _mark_used(self, key: str):
+        """Обновить время изменения файла в хранилище - его видят все задачи"""
+        now = time.time()
+        if now - self._touched.get(key, 0.0) < self.touch_interval:
+            return
+        self._touched[key] = now
+        try:
+            await self.backend.touch(key)
+        except Exception as e:
+            print(f"⚠️ Не удалось отметить использование файла экспорта {key}: {e}")
+
+    async def _trim(self, keep: str):
+        """
+        Удалить давно не использовавшиеся файлы, пока кэш больше max_bytes
+
+        Размеры и порядок берутся из хранилища, а не из памяти задачи: в кэш
+        пишут все задачи. Только что записанный файл keep не удаляется.
+        """
+        async with self._trim_lock:
+            try:
+                objects = await self.backend.list(EXPORTS_PREFIX)
+            except Exception as e:
+                print(f"⚠️ Не удалось прочитать кэш экспорта: {e}")
+                return
+            total = sum(stored.size for stored in objects)
+            files = len(objects)
+            for stored in sorted(objects, key=lambda item: item.modified):
+                if total <= self.max_bytes:
+                    break
+                if stored.key == keep:
+                    continue
+                try:
+                    await self.backend.delete(stored.key)
+                except Exception as e:
+                    print(f"⚠️ Не удалось удалить файл экспорта {stored.key}: {e}")
+                    continue
+                total -= stored.size
+                files -= 1
+                self.evictions += 1
+
+            listed = {stored.key for stored in objects}
+            self._touched = {key: used for key, used in self._touched.items() if key in listed}
+            self.files, self.bytes = files, total
+
+    async def _artifact(self, export_format: ExportFormat, digest: str) -> Optional[ExportArtifact]:
+        path = await self.backend.local_path(self._key(export_format, digest))
+        stat_result = await async_fs.stat(path) if path is not None else None
+        if stat_result is None:
+            return None
+        return ExportArtifact(path, stat_result, f'"{digest[:32]}"', export_format)
+
+    async def get(self, format_name: str, content: Any) -> Optional[ExportArtifact]:
+        """Готовый файл экспорта или None"""
+        export_format = EXPORT_FORMATS[format_name]
+        digest = export_digest(export_format, content)
+        artifact = await self._artifact(export_format, digest)
+        if artifact is not None:
+            await self._mark_used(self._key(export_format, digest))
+        return artifact
+
+    async def put(self, format_name: str, content: Any, data: bytes) -> Optional[ExportArtifact]:
+        """Сохранить собранный файл в кэш"""
+        export_format = EXPORT_FORMATS[format_name]
+        digest = export_digest(export_format, content)
+        key = self._key(export_format, digest)
+        await self.backend.put(key, data)
+        self._touched[key] = time.time()
+        await self._trim(keep=key)
+        return await self._artifact(export_format, digest)
+
+    async def get_or_build(self, format_name: str, content: Any) -> ExportArtifact:
+        """
+        Файл экспорта из кэша; при промахе собирается в пуле экспорта
+
+        Одновременные запросы одной и той же презентации ждут одну сборку.
+        """
+        artifact = await self.get(format_name, content)
+        if artifact is not None:
+            self.hits += 1
+            return artifact
+        self.misses += 1
+
+        digest = export_digest(EXPORT_FORMATS[format_name], content)
+        return await self._builds.run(digest, lambda: self._build(format_name, content))
+
+    async def _build(self, format_name: str, content: Any) -> ExportArtifact:
+        result = await export_service.export(format_name, content)
+        if not result.complete:
+            self.incomplete += 1
+            return ExportArtifact(None, None, None, EXPORT_FORMATS[format_name], data=result.data)
+        artifact = await self.put(format_name, content, result.data)
+        if artifact is None:
+            raise RuntimeError("Export artifact was not stored")
+        return artifact
+
+    def get_stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "files": self.files,
+            "bytes": self.bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0,
+            "evictions": self.evictions,
+            "incomplete": self.incomplete,
+        }
+
+
+# Глобальный экземпляр кэша
+export_cache = ExportCache()
@@ -0,0 +1,85 @@
+"""
+Export Images - загрузка изображений слайдов перед сборкой экспорта
+
+Изображения скачиваются параллельно в основном процессе (через прокси
+изображений с его дисковым кэшем), а в пул экспорта передаются готовыми
+байтами: рабочие процессы не ходят в сеть и не держат слот, ожидая ее.
+"""
+import asyncio
+import base64
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from config.settings import get_settings
+from services import async_fs
+from services.image_proxy import image_proxy_service, is_proxyable
+from utils.pdf_generator import image_pixel_width, slide_image_url
+
+settings = get_settings()
+
+
+def _decode_data_uri(url: str) -> Optional[bytes]:
+    header, _, data = url.partition(",")
+    if not header.endswith(";base64"):
+        return None
+    return base64.b64decode(data)
+
+
+async def _fetch_image(url: str, width: Optional[int]) -> Optional[bytes]:
+    if url.startswith("data:"):
+        return _decode_data_uri(url)
+    if not is_proxyable(url):
+        # Произвольные хосты сервер не скачивает (как и прокси изображений)
+        return None
+    image = await image_proxy_service.get_image(url, width)
+    return await async_fs.read_bytes(image.path)
+
+
+async def fetch_images(urls: Iterable[str], width: Optional[int] = None) -> Tuple[Dict[str, bytes], List[str]]:
+    """
+    Параллельно скачивает изображения
+
+    Args:
+        urls: URL изображений (повторы скачиваются один раз)
+        width: Нужная ширина в пикселях; прокси отдает ближайший вариант не меньше нее
+
+    Returns:
+        Словарь url -> байты и список URL, которые не удалось скачать (ошибка
+        или таймаут). Неразрешенные хосты пропускаются и в список не попадают.
+    """
+    unique = [url for url in dict.fromkeys(urls) if url]
+    semaphore = asyncio.Semaphore(settings.EXPORT_IMAGE_FETCH_CONCURRENCY)
+
+    failed: List[str] = []
+
+    async def fetch(url: str) -> Optional[bytes]:
+        async with semaphore:
+            try:
+                return await asyncio.wait_for(_fetch_image(url, width), timeout=settings.EXPORT_IMAGE_FETCH_TIMEOUT)
+            except Exception as e:
+                print(f"⚠️ Изображение для экспорта недоступно {url[:100]}: {str(e) or type(e).__name__}")
+                failed.append(url)
+                return None
+
+    results = await asyncio.gather(*(fetch(url) for url in unique))
+    return {url: data for url, data in zip(unique, results) if data}, failed
+
+
+async def prepare_pdf_payload(content: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Данные для build_presentation_pdf: презентация и скачанные изображения слайдов
+
+    missing_images - изображения, которые временно не удалось скачать:
+    такой файл собирается, но в кэш экспорта не попадает.
+    """
+    dpi = settings.EXPORT_PDF_IMAGE_DPI
+    images, missing = await fetch_images(
+        (slide_image_url(slide) for slide in content.get("slides", [])),
+        width=image_pixel_width(dpi)
+    )
+    return {
+        "content": content,
+        "images": images,
+        "missing_images": missing,
+        "image_dpi": dpi,
+        "font_path": settings.EXPORT_PDF_FONT_PATH,
+    }
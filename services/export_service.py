@@ -0,0 +1,210 @@
+"""
+Export Service - экспорт презентаций (PPTX, PDF) в ограниченном пуле процессов
+
+Сборка файла - CPU-работа (python-pptx, reportlab), поэтому она выполняется в
+отдельных процессах, а не в event loop. Одновременно выполняется не больше
+EXPORT_MAX_WORKERS сборок, в очереди ждут не больше EXPORT_MAX_PENDING;
+при переполнении запрос сразу получает отказ (503), а не висит.
+Каждый слот - отдельный однопроцессный пул: сборку, превысившую
+EXPORT_TIMEOUT (или отмененную), можно остановить, не трогая остальные,
+и слот освобождается только вместе с процессом.
+Подготовка с сетевым вводом-выводом (скачивание изображений для PDF)
+выполняется в event loop до того, как экспорт займет слот пула.
+"""
+import asyncio
+import multiprocessing
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from config.settings import get_settings
+from services.export_images import prepare_pdf_payload
+from utils.pdf_generator import PDF_MEDIA_TYPE, build_presentation_pdf
+from utils.pptx_generator import PPTX_MEDIA_TYPE, build_presentation_pptx
+
+settings = get_settings()
+
+# Сколько последних замеров хранить для перцентилей
+LATENCY_WINDOW = 200
+
+
+@dataclass(frozen=True)
+class ExportFormat:
+    """
+    Формат экспорта: функция сборки (выполняется в пуле) и параметры ответа
+
+    version меняется при изменении результата сборки, чтобы не отдавать
+    файлы, собранные старой версией, из кэша экспорта. prepare (если задан)
+    выполняется в основном процессе и превращает презентацию в аргумент builder;
+    непустой missing_images в его результате означает неполную сборку.
+    """
+    name: str
+    builder: Callable[[Dict[str, Any]], bytes]
+    media_type: str
+    extension: str
+    version: str = "1"
+    prepare: Optional[Callable[[Dict[str, Any]], Awaitable[Dict[str, Any]]]] = None
+
+
+EXPORT_FORMATS: Dict[str, ExportFormat] = {
+    "pptx": ExportFormat("pptx", build_presentation_pptx, PPTX_MEDIA_TYPE, "pptx", version="1"),
+    "pdf": ExportFormat("pdf", build_presentation_pdf, PDF_MEDIA_TYPE, "pdf", version="1",
+                        prepare=prepare_pdf_payload),
+}
+
+
+@dataclass
+class ExportResult:
+    """Собранный файл; complete=False - часть данных (изображения) была недоступна"""
+    data: bytes
+    complete: bool = True
+
+
+class ExportQueueFull(Exception):
+    """Очередь экспорта переполнена"""
+    pass
+
+
+def _percentile(values, percent: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * percent))]
+
+
+def _stop_executor(executor: ProcessPoolExecutor):
+    """Остановить пул вместе с процессом, который еще собирает файл"""
+    # В Python 3.11 нет публичного способа завершить занятый рабочий процесс
+    processes = list((getattr(executor, "_processes", None) or {}).values())
+    executor.shutdown(wait=False, cancel_futures=True)
+    for process in processes:
+        process.terminate()
+
+
+class ExportService:
+    """Сборка файлов экспорта в пуле процессов с метриками очереди и задержек"""
+
+    def __init__(self, max_workers: int = None, max_pending: int = None, timeout: float = None):
+        self.max_workers = max_workers or settings.EXPORT_MAX_WORKERS
+        self.max_pending = max_pending or settings.EXPORT_MAX_PENDING
+        self.timeout = timeout or settings.EXPORT_TIMEOUT
+        self._executors: List[Optional[ProcessPoolExecutor]] = [None] * self.max_workers
+        self._idle: Optional[asyncio.Queue] = None
+
+        # Метрики
+        self.pending = 0
+        self.running = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.timeouts = 0
+        self.workers_recycled = 0
+        self._queue_waits = deque(maxlen=LATENCY_WINDOW)
+        self._build_times = deque(maxlen=LATENCY_WINDOW)
+
+    def _get_executor(self, slot: int) -> ProcessPoolExecutor:
+        if self._executors[slot] is None:
+            # spawn: рабочие процессы не наследуют event loop и открытые соединения
+            self._executors[slot] = ProcessPoolExecutor(
+                max_workers=1,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._executors[slot]
+
+    def _get_idle(self) -> asyncio.Queue:
+        """Очередь свободных слотов (номера однопроцессных пулов)"""
+        if self._idle is None:
+            self._idle = asyncio.Queue()
+            for slot in range(self.max_workers):
+                self._idle.put_nowait(slot)
+        return self._idle
+
+    def _recycle(self, slot: int):
+        """Остановить процесс слота; следующий экспорт в слоте запустит новый"""
+        executor, self._executors[slot] = self._executors[slot], None
+        if executor is not None:
+            _stop_executor(executor)
+            self.workers_recycled += 1
+
+    async def export(self, format_name: str, content: Dict[str, Any]) -> ExportResult:
+        """
+        Собрать файл экспорта
+
+        Raises:
+            ValueError: неизвестный формат
+            ExportQueueFull: слишком много ожидающих экспортов
+            asyncio.TimeoutError: сборка не уместилась в EXPORT_TIMEOUT
+        """
+        export_format = EXPORT_FORMATS.get(format_name)
+        if export_format is None:
+            raise ValueError(f"Unknown export format: {format_name}")
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            raise ExportQueueFull("Export queue is full")
+
+        self.pending += 1
+        try:
+            payload = await export_format.prepare(content) if export_format.prepare else content
+            complete = not (export_format.prepare and payload.get("missing_images"))
+            queued_at = time.monotonic()
+            idle = self._get_idle()
+            slot = await idle.get()
+            started_at = time.monotonic()
+            self._queue_waits.append(started_at - queued_at)
+            self.running += 1
+            try:
+                future = self._get_executor(slot).submit(export_format.builder, payload)
+                data = await asyncio.wait_for(asyncio.wrap_future(future), timeout=self.timeout)
+            except asyncio.TimeoutError:
+                # Процесс продолжил бы сборку в "свободном" слоте - останавливаем его
+                self.timeouts += 1
+                self._recycle(slot)
+                raise
+            except asyncio.CancelledError:
+                self._recycle(slot)
+                raise
+            except BrokenProcessPool:
+                # Рабочий процесс упал (например, по памяти) - пул слота пересоздается
+                self._executors[slot] = None
+                raise
+            finally:
+                self.running -= 1
+                idle.put_nowait(slot)
+            self._build_times.append(time.monotonic() - started_at)
+            self.completed += 1
+            return ExportResult(data, complete)
+        except Exception:
+            self.failed += 1
+            raise
+        finally:
+            self.pending -= 1
+
+    def shutdown(self):
+        for slot, executor in enumerate(self._executors):
+            if executor is not None:
+                executor.shutdown(wait=False, cancel_futures=True)
+                self._executors[slot] = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "workers": self.max_workers,
+            "pending": self.pending,
+            "running": self.running,
+            "queued": self.pending - self.running,
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "timeouts": self.timeouts,
+            "workers_recycled": self.workers_recycled,
+            "queue_wait_p50": round(_percentile(self._queue_waits, 0.5), 3),
+            "queue_wait_p95": round(_percentile(self._queue_waits, 0.95), 3),
+            "build_time_p50": round(_percentile(self._build_times, 0.5), 3),
+            "build_time_p95": round(_percentile(self._build_times, 0.95), 3),
+        }
+
+
+# Глобальный экземпляр сервиса
+export_service = ExportService()
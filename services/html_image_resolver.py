@@ -0,0 +1,147 @@
+"""
+HTML Image Resolver - подстановка картинок в HTML внутри процесса
+
+Альтернатива микросервису картинок: HTML разбирается потоковым парсером,
+ключевые слова из data-search-keywords собираются и дедуплицируются,
+ищутся параллельно через Pexels и подставляются в документ за один проход
+"""
+import asyncio
+import html
+import logging
+from html.parser import HTMLParser
+from typing import Dict, List, Optional, Tuple
+
+from ai_services.image_service import image_service
+from config.settings import get_settings
+from utils.responsive_images import image_attrs
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+KEYWORDS_ATTR = "data-search-keywords"
+
+
+class _ImageTagCollector(HTMLParser):
+    """Собирает позиции тегов <img> с атрибутом data-search-keywords"""
+
+    def __init__(self, source: str):
+        super().__init__(convert_charrefs=True)
+        self._line_offsets = [0]
+        for index, char in enumerate(source):
+            if char == "\n":
+                self._line_offsets.append(index + 1)
+        # (начало тега, конец тега, атрибуты, самозакрывающийся)
+        self.tags: List[Tuple[int, int, List[Tuple[str, Optional[str]]], bool]] = []
+
+    def _record(self, tag: str, attrs: List[Tuple[str, Optional[str]]]):
+        if tag != "img" or not any(name == KEYWORDS_ATTR for name, _ in attrs):
+            return
+        line, column = self.getpos()
+        start = self._line_offsets[line - 1] + column
+        text = self.get_starttag_text() or ""
+        self.tags.append((start, start + len(text), attrs, text.rstrip().endswith("/>")))
+
+    def handle_starttag(self, tag, attrs):
+        self._record(tag, attrs)
+
+    def handle_startendtag(self, tag, attrs):
+        self._record(tag, attrs)
+
+
+def _render_img_tag(attrs: List[Tuple[str, Optional[str]]], self_closing: bool) -> str:
+    """Собирает тег <img> из атрибутов"""
+    parts = ["<img"]
+    for name, value in attrs:
+        if value is None:
+            parts.append(f" {name}")
+        else:
+            parts.append(f' {name}="{html.escape(value, quote=True)}"')
+    parts.append(" />" if self_closing else ">")
+    return "".join(parts)
+
+
+class HtmlImageResolver:
+    """Подстановка изображений в HTML без сетевого вызова микросервиса"""
+
+    async def _resolve_keywords(self, keywords: List[str]) -> Dict[str, Optional[dict]]:
+        """Параллельный поиск изображений для уникальных ключевых слов"""
+        results = await asyncio.gather(
+            *(image_service.search_for_keywords(keyword) for keyword in keywords),
+            return_exceptions=True
+        )
+        resolved: Dict[str, Optional[dict]] = {}
+        for keyword, result in zip(keywords, results):
+            if isinstance(result, Exception):
+                logger.error(f"❌ Ошибка поиска изображения для '{keyword}': {result}")
+                result = None
+            resolved[keyword] = result.to_dict() if result else None
+        return resolved
+
+    async def process_html_with_images(self, html_content: str, topic: str = "") -> str:
+        """
+        Подставляет src для всех <img data-search-keywords="...">
+
+        Args:
+            html_content: Исходный HTML без картинок
+            topic: Тема презентации (используется, если ключевые слова пустые)
+
+        Returns:
+            HTML с валидными URL изображений
+        """
+        try:
+            collector = _ImageTagCollector(html_content)
+            collector.feed(html_content)
+            collector.close()
+        except Exception as e:
+            logger.error(f"💥 Ошибка разбора HTML: {e}")
+            return html_content
+
+        if not collector.tags:
+            return html_content
+
+        def keywords_of(attrs) -> str:
+            value = next((v for name, v in attrs if name == KEYWORDS_ATTR), None)
+            return " ".join((value or topic or "").split()).lower()
+
+        unique_keywords = list(dict.fromkeys(
+            keywords_of(attrs) for _, _, attrs, _ in collector.tags if keywords_of(attrs)
+        ))
+        resolved = await self._resolve_keywords(unique_keywords)
+
+        # Переписываем документ за один проход
+        pieces: List[str] = []
+        cursor = 0
+        replaced = 0
+        for start, end, attrs, self_closing in collector.tags:
+            image = resolved.get(keywords_of(attrs))
+            if not image:
+                continue
+            # src/srcset/sizes/размеры/lazy loading из ответа Pexels; атрибуты модели сохраняем
+            existing = {name for name, _ in attrs}
+            responsive = image_attrs(image, layout="slide", alt=image.get("alt") or keywords_of(attrs))
+            new_attrs = [(name, value) for name, value in responsive.items()
+                         if name in ("src", "srcset", "sizes") or name not in existing]
+            new_attrs += [(name, value) for name, value in attrs if name not in ("src", "srcset", "sizes")]
+            pieces.append(html_content[cursor:start])
+            pieces.append(_render_img_tag(new_attrs, self_closing))
+            cursor = end
+            replaced += 1
+        pieces.append(html_content[cursor:])
+
+        logger.info(f"🖼️  Подставлено изображений: {replaced} из {len(collector.tags)} (уникальных запросов: {len(unique_keywords)})")
+        return "".join(pieces)
+
+
+# Синглтон резолвера
+html_image_resolver = HtmlImageResolver()
+
+
+def get_html_image_processor():
+    """
+    Возвращает обработчик HTML картинок согласно IMAGE_RESOLVER_MODE:
+    microservice (по умолчанию) - внешний микросервис, inprocess - внутри процесса
+    """
+    if settings.IMAGE_RESOLVER_MODE == "inprocess":
+        return html_image_resolver
+    from services.image_microservice import image_microservice_client
+    return image_microservice_client
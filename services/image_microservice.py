@@ -1,9 +1,13 @@
 """
 Image Microservice Integration - интеграция с микросервисом картинок
 """
+import gzip
+import json
+import time
 import httpx
 from typing import Optional
 from config.settings import get_settings
+from services.circuit_breaker import CircuitBreaker
 
 settings = get_settings()
 
@@ -13,11 +17,66 @@ class ImageMicroserviceClient:
     def __init__(self, microservice_url: str = None):
         self.microservice_url = microservice_url or settings.IMAGE_MICROSERVICE_URL
         self.timeout = settings.IMAGE_MICROSERVICE_TIMEOUT
+        self.gzip_enabled = settings.IMAGE_MICROSERVICE_GZIP
+        self.gzip_min_size = settings.IMAGE_MICROSERVICE_GZIP_MIN_SIZE
+        self.breaker = CircuitBreaker(
+            failure_threshold=settings.IMAGE_MICROSERVICE_FAILURE_THRESHOLD,
+            recovery_timeout=settings.IMAGE_MICROSERVICE_RECOVERY_TIMEOUT
+        )
+        self._client: Optional[httpx.AsyncClient] = None
+        
+        # Метрики
+        self.requests_total = 0
+        self.requests_failed = 0
+        self.requests_short_circuited = 0
+        self.bytes_sent = 0
+        self.bytes_uncompressed = 0
+        self._latency_total = 0.0
+        self._latency_max = 0.0
+    
+    def _get_client(self) -> httpx.AsyncClient:
+        """Долгоживущий клиент с пулом соединений"""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                base_url=self.microservice_url,
+                timeout=self.timeout,
+                limits=httpx.Limits(
+                    max_connections=settings.IMAGE_MICROSERVICE_MAX_CONNECTIONS,
+                    max_keepalive_connections=settings.IMAGE_MICROSERVICE_MAX_CONNECTIONS,
+                    keepalive_expiry=30.0
+                )
+            )
+        return self._client
+    
+    async def close(self):
+        """Закрыть пул соединений"""
+        if self._client is not None and not self._client.is_closed:
+            await self._client.aclose()
+        self._client = None
+    
+    def _encode_payload(self, body: bytes) -> tuple[bytes, dict]:
+        """Сжимает тело запроса gzip, если оно достаточно большое"""
+        headers = {"Content-Type": "application/json"}
+        
+        if self.gzip_enabled and len(body) >= self.gzip_min_size:
+            body = gzip.compress(body, compresslevel=5)
+            headers["Content-Encoding"] = "gzip"
+        
+        self.bytes_sent += len(body)
+        return body, headers
+    
+    def _record_latency(self, started: float):
+        elapsed = time.perf_counter() - started
+        self._latency_total += elapsed
+        self._latency_max = max(self._latency_max, elapsed)
     
     async def process_html_with_images(self, html_content: str, topic: str = "") -> str:
         """
         Отправить HTML в микросервис и получить HTML с валидными URL картинок
         
+        Если микросервис недавно падал (цепь разомкнута), вызов пропускается
+        сразу, без ожидания таймаута
+        
         Args:
             html_content: Исходный HTML без картинок
             topic: Тема презентации для контекста
@@ -25,40 +84,84 @@ class ImageMicroserviceClient:
         Returns:
             HTML с валидными URL изображений
         """
+        is_probe = self.breaker.state == CircuitBreaker.HALF_OPEN
+        if not self.breaker.allow_request():
+            self.requests_short_circuited += 1
+            return html_content
+        
+        payload = {
+            "html": html_content,
+            "topic": topic,
+            "language": "ru"
+        }
+        
+        self.requests_total += 1
+        started = time.perf_counter()
         try:
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
-                payload = {
-                    "html": html_content,
-                    "topic": topic,
-                    "language": "ru"
-                }
-                
-                response = await client.post(
-                    f"{self.microservice_url}/process-html",
-                    json=payload,
-                    headers={"Content-Type": "application/json"}
-                )
-                
-                if response.status_code == 200:
-                    result = response.json()
-                    return result.get("html", html_content)
-                else:
-                    print(f"Image microservice error: {response.status_code} - {response.text}")
-                    return html_content
+            client = self._get_client()
+            raw_body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+            # Несжатый размер учитывается один раз, даже если запрос повторяется
+            self.bytes_uncompressed += len(raw_body)
+            body, headers = self._encode_payload(raw_body)
+            response = await client.post("/process-html", content=body, headers=headers)
+            
+            if response.status_code == 415 and "Content-Encoding" in headers:
+                # Микросервис не принимает сжатые тела - отключаем gzip и повторяем
+                print("Image microservice does not accept gzip bodies, disabling compression")
+                self.gzip_enabled = False
+                body, headers = self._encode_payload(raw_body)
+                response = await client.post("/process-html", content=body, headers=headers)
+            
+            self._record_latency(started)
+            
+            if response.status_code == 200:
+                self.breaker.record_success()
+                result = response.json()
+                return result.get("html", html_content)
+            
+            self.requests_failed += 1
+            if response.status_code >= 500:
+                self.breaker.record_failure()
+            else:
+                self.breaker.record_success()
+            print(f"Image microservice error: {response.status_code} - {response.text}")
+            return html_content
                     
         except Exception as e:
+            self._record_latency(started)
+            self.requests_failed += 1
+            self.breaker.record_failure()
             print(f"Error calling image microservice: {e}")
             # Fallback: возвращаем исходный HTML если микросервис недоступен
             return html_content
+        finally:
+            if is_probe:
+                # Отмененный запрос (клиент отключился) не должен навсегда занять пробу
+                self.breaker.release_probe()
     
     async def health_check(self) -> bool:
         """Проверка доступности микросервиса"""
         try:
-            async with httpx.AsyncClient(timeout=5.0) as client:
-                response = await client.get(f"{self.microservice_url}/health")
-                return response.status_code == 200
+            response = await self._get_client().get("/health", timeout=5.0)
+            return response.status_code == 200
         except Exception:
             return False
+    
+    def get_stats(self) -> dict:
+        """Метрики задержек и ошибок"""
+        completed = self.requests_total
+        return {
+            "requests_total": self.requests_total,
+            "requests_failed": self.requests_failed,
+            "requests_short_circuited": self.requests_short_circuited,
+            "error_rate": round(self.requests_failed / completed, 4) if completed else 0.0,
+            "avg_latency_ms": round(self._latency_total / completed * 1000, 2) if completed else 0.0,
+            "max_latency_ms": round(self._latency_max * 1000, 2),
+            "bytes_sent": self.bytes_sent,
+            "bytes_uncompressed": self.bytes_uncompressed,
+            "gzip_enabled": self.gzip_enabled,
+            "circuit": self.breaker.to_dict()
+        }
 
 # Синглтон клиента
 image_microservice_client = ImageMicroserviceClient()
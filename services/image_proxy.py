@@ -0,0 +1,399 @@
+"""
+Image Proxy Service - локальный прокси изображений с дисковым кэшем
+
+Изображение скачивается один раз и хранится по хэшу содержимого;
+для слайдов готовятся уменьшенные варианты под ширину колонок макета.
+Размер кэша ограничен IMAGE_CACHE_MAX_BYTES: при превышении удаляются
+давно не запрашивавшиеся изображения (вместе с вариантами) и записи индекса.
+Кэш лежит на диске контейнера, поэтому каждый процесс ограничивает его сам.
+"""
+import asyncio
+import hashlib
+import io
+import os
+import tempfile
+from collections import OrderedDict
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlencode, urljoin, urlparse
+
+import aiofiles
+import httpx
+
+from config.settings import get_settings
+from utils.single_flight import SingleFlight
+
+try:
+    from PIL import Image
+except ImportError:  # Pillow ставится вместе с python-pptx, но может отсутствовать
+    Image = None
+
+settings = get_settings()
+
+# Варианты ширины под макеты слайдов
+VARIANT_WIDTHS: Dict[str, int] = {
+    "thumb": 320,    # превью в списках
+    "column": 640,   # колонка изображения (40% слайда)
+    "slide": 1280,   # изображение на всю ширину слайда
+}
+
+PROXY_PATH = "/images/proxy"
+
+# URL изображений повторяются при каждом рендере слайдов - разбор кэшируется
+URL_CACHE_SIZE = 4096
+
+# Редиректы проходятся вручную, чтобы каждый адрес проверялся по списку хостов
+MAX_REDIRECTS = 3
+
+
+@dataclass
+class ProxiedImage:
+    """Файл изображения в кэше"""
+    path: Path
+    content_hash: str
+    width: Optional[int]
+    media_type: str
+
+    @property
+    def etag(self) -> str:
+        return f'"{self.content_hash[:32]}-{self.width or "orig"}"'
+
+
+class ImageProxyError(Exception):
+    """Ошибка получения изображения через прокси"""
+
+    def __init__(self, message: str, status_code: int = 502):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def snap_width(width: Optional[int]) -> Optional[int]:
+    """Приводит запрошенную ширину к ближайшему варианту не меньше нее"""
+    if not width:
+        return None
+    for variant_width in sorted(VARIANT_WIDTHS.values()):
+        if width <= variant_width:
+            return variant_width
+    return None  # шире самого большого варианта - отдаем оригинал
+
+
+def is_proxyable(url: str) -> bool:
+    """Можно ли проксировать URL (только разрешенные хосты по http/https)"""
+    # data URI плейсхолдеров большие - в кэш разбора они не попадают
+    if not url or not url.startswith(("http://", "https://")):
+        return False
+    return _is_allowed_host(url)
+
+
+@lru_cache(maxsize=URL_CACHE_SIZE)
+def _is_allowed_host(url: str) -> bool:
+    parsed = urlparse(url)
+    return parsed.scheme in ("http", "https") and parsed.hostname in settings.IMAGE_PROXY_ALLOWED_HOSTS
+
+
+def build_proxy_url(url: str, width: Optional[int] = None) -> str:
+    """
+    URL изображения через локальный прокси
+
+    Если прокси выключен или хост не разрешен (например, data URI
+    плейсхолдера), возвращается исходный URL
+    """
+    if not settings.IMAGE_PROXY_ENABLED or not is_proxyable(url):
+        return url
+    return _proxy_url(url, width)
+
+
+@lru_cache(maxsize=URL_CACHE_SIZE)
+def _proxy_url(url: str, width: Optional[int]) -> str:
+    params = {"url": url}
+    if width:
+        params["w"] = str(width)
+    return f"{settings.API_V1_STR}{PROXY_PATH}?{urlencode(params)}"
+
+
+def _resize(source: Path, target: Path, width: int) -> Path:
+    """
+    Уменьшает изображение до ширины width (выполняется в потоке)
+
+    Если оригинал не шире width, вместо варианта пишется пустой файл-метка:
+    следующие запросы этой ширины сразу отдают оригинал, не открывая его.
+    """
+    with Image.open(source) as image:
+        if image.width <= width:
+            _atomic_write(target, b"")
+            return source
+        height = max(1, round(image.height * width / image.width))
+        resized = image.resize((width, height), Image.LANCZOS)
+        buffer = io.BytesIO()
+        if resized.mode in ("RGBA", "LA", "P"):
+            resized.save(buffer, format="PNG", optimize=True)
+        else:
+            resized.convert("RGB").save(buffer, format="JPEG", quality=82, optimize=True, progressive=True)
+    _atomic_write(target, buffer.getvalue())
+    return target
+
+
+def _atomic_write(path: Path, data: bytes):
+    """Запись через временный файл, чтобы читатели не видели частичный файл"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "wb") as tmp:
+            tmp.write(data)
+        os.replace(tmp_name, path)
+    except Exception:
+        if os.path.exists(tmp_name):
+            os.unlink(tmp_name)
+        raise
+
+
+def _touch(path: Path) -> Optional[int]:
+    """Отметить использование файла (mtime - порядок LRU после рестарта); размер или None"""
+    try:
+        os.utime(path)
+        return os.stat(path).st_size
+    except FileNotFoundError:
+        return None
+
+
+def _scan_cache(cache_dir: Path) -> List[Tuple[float, str, int]]:
+    """(время использования, единица кэша, размер) для всех файлов кэша"""
+    units: Dict[str, Tuple[float, int]] = {}
+    for kind in ("objects", "index"):
+        root = cache_dir / kind
+        if not root.is_dir():
+            continue
+        for shard in os.scandir(root):
+            if not shard.is_dir():
+                continue
+            for entry in os.scandir(shard.path):
+                if entry.name.startswith(".tmp-"):
+                    continue
+                try:
+                    stat_result = entry.stat()
+                except FileNotFoundError:
+                    continue
+                # Оригинал и его варианты удаляются вместе
+                unit = f"{kind}/{entry.name.partition('_')[0]}"
+                used, size = units.get(unit, (0.0, 0))
+                units[unit] = (max(used, stat_result.st_mtime), size + stat_result.st_size)
+    return [(used, unit, size) for unit, (used, size) in units.items()]
+
+
+def _sniff_media_type(data: bytes) -> str:
+    if data.startswith(b"\x89PNG"):
+        return "image/png"
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "image/webp"
+    if data[:6] in (b"GIF87a", b"GIF89a"):
+        return "image/gif"
+    return "image/jpeg"
+
+
+class ImageProxyService:
+    """Прокси изображений с контентно-адресуемым кэшем на диске"""
+
+    def __init__(self, cache_dir: str = None):
+        self.cache_dir = Path(cache_dir or settings.IMAGE_CACHE_DIR)
+        self.max_bytes = settings.IMAGE_CACHE_MAX_BYTES
+        self._client: Optional[httpx.AsyncClient] = None
+        self._downloads = SingleFlight()
+
+        # LRU: единица кэша ("objects/<хэш>" или "index/<хэш url>") -> байты
+        self._entries: "OrderedDict[str, int]" = OrderedDict()
+        self._bytes = 0
+        self._loaded = False
+        self._load_lock = asyncio.Lock()
+
+        # Метрики
+        self.evictions = 0
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                timeout=15.0,
+                follow_redirects=False,
+                headers={"User-Agent": "SayDeck/1.0.0"},
+                limits=httpx.Limits(max_connections=20, max_keepalive_connections=20)
+            )
+        return self._client
+
+    async def close(self):
+        if self._client is not None and not self._client.is_closed:
+            await self._client.aclose()
+        self._client = None
+
+    def _index_path(self, url: str) -> Path:
+        url_hash = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        return self.cache_dir / "index" / url_hash[:2] / url_hash
+
+    async def _load_index(self):
+        """Индекс LRU по файлам, оставшимся на диске (порядок - по времени использования)"""
+        if self._loaded:
+            return
+        async with self._load_lock:
+            if self._loaded:
+                return
+            try:
+                units = await asyncio.to_thread(_scan_cache, self.cache_dir)
+            except Exception as e:
+                print(f"⚠️ Не удалось прочитать кэш изображений: {e}")
+                units = []
+            for _, unit, size in sorted(units):
+                self._entries[unit] = size
+                self._bytes += size
+            self._loaded = True
+
+    def _used(self, unit: str, added: int = 0):
+        """Отметить использование единицы кэша (и добавленные в нее байты)"""
+        self._entries[unit] = self._entries.pop(unit, 0) + added
+        self._bytes += added
+
+    def _unit_paths(self, unit: str) -> List[Path]:
+        kind, _, name = unit.partition("/")
+        shard = self.cache_dir / kind / name[:2]
+        if not shard.is_dir():
+            return []
+        return [shard / entry.name for entry in os.scandir(shard)
+                if entry.name == name or entry.name.startswith(f"{name}_")]
+
+    def _remove_unit(self, unit: str):
+        for path in self._unit_paths(unit):
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+
+    async def _trim(self, *keep: str):
+        """Удалить давно не использованные единицы сверх лимита (кроме нужных текущему запросу)"""
+        while self._bytes > self.max_bytes and self._entries:
+            unit = next(iter(self._entries))
+            if unit in keep:
+                break
+            size = self._entries.pop(unit)
+            self._bytes -= size
+            self.evictions += 1
+            try:
+                await asyncio.to_thread(self._remove_unit, unit)
+            except Exception as e:
+                print(f"⚠️ Не удалось удалить изображение из кэша {unit}: {e}")
+
+    def _object_path(self, content_hash: str, width: Optional[int] = None) -> Path:
+        name = content_hash if not width else f"{content_hash}_{width}"
+        return self.cache_dir / "objects" / content_hash[:2] / name
+
+    async def _lookup(self, url: str) -> Optional[Tuple[str, str]]:
+        """Хэш содержимого и MIME тип по URL из индекса"""
+        index_path = self._index_path(url)
+        try:
+            async with aiofiles.open(index_path, "r") as f:
+                content_hash, media_type = (await f.read()).split()
+        except (FileNotFoundError, ValueError):
+            return None
+        object_path = self._object_path(content_hash)
+        if not await asyncio.to_thread(lambda: _touch(object_path) is not None and _touch(index_path) is not None):
+            return None
+        self._used(f"index/{index_path.name}")
+        self._used(f"objects/{content_hash}")
+        return content_hash, media_type
+
+    async def _read_upstream(self, url: str) -> bytes:
+        """Тело ответа источника; редиректы только на разрешенные хосты"""
+        for _ in range(MAX_REDIRECTS + 1):
+            async with self._get_client().stream("GET", url) as response:
+                if response.is_redirect:
+                    url = urljoin(str(response.url), response.headers.get("location", ""))
+                    if not is_proxyable(url):
+                        raise ImageProxyError("Redirect to a host that is not allowed", status_code=502)
+                    continue
+                if response.status_code != 200:
+                    raise ImageProxyError(f"Upstream returned {response.status_code}", status_code=502)
+                chunks = []
+                size = 0
+                async for chunk in response.aiter_bytes():
+                    size += len(chunk)
+                    if size > settings.IMAGE_PROXY_MAX_BYTES:
+                        raise ImageProxyError("Image is too large", status_code=413)
+                    chunks.append(chunk)
+                return b"".join(chunks)
+        raise ImageProxyError("Too many redirects", status_code=502)
+
+    async def _download(self, url: str) -> Tuple[str, str]:
+        """Скачивает изображение и сохраняет его по хэшу содержимого"""
+        data = await self._read_upstream(url)
+        content_hash = hashlib.sha256(data).hexdigest()
+        media_type = _sniff_media_type(data)
+
+        object_path = self._object_path(content_hash)
+        if await asyncio.to_thread(_touch, object_path) is None:
+            await asyncio.to_thread(_atomic_write, object_path, data)
+            self._used(f"objects/{content_hash}", len(data))
+        else:
+            self._used(f"objects/{content_hash}")
+        index_path = self._index_path(url)
+        index_data = f"{content_hash} {media_type}".encode()
+        existed = await asyncio.to_thread(index_path.exists)
+        await asyncio.to_thread(_atomic_write, index_path, index_data)
+        self._used(f"index/{index_path.name}", 0 if existed else len(index_data))
+        await self._trim(f"objects/{content_hash}", f"index/{index_path.name}")
+        return content_hash, media_type
+
+    async def _fetch_once(self, url: str) -> Tuple[str, str]:
+        """Скачивание с объединением одновременных запросов одного URL"""
+        cached = await self._lookup(url)
+        if cached:
+            return cached
+
+        return await self._downloads.run(url, lambda: self._download(url))
+
+    async def get_image(self, url: str, width: Optional[int] = None) -> ProxiedImage:
+        """
+        Возвращает изображение из кэша (скачивая при первом обращении)
+
+        Args:
+            url: Исходный URL изображения
+            width: Желаемая ширина, приводится к одному из VARIANT_WIDTHS
+        """
+        if not is_proxyable(url):
+            raise ImageProxyError("Host is not allowed", status_code=400)
+
+        await self._load_index()
+        content_hash, media_type = await self._fetch_once(url)
+        original = self._object_path(content_hash)
+        width = snap_width(width)
+
+        if not width or Image is None:
+            return ProxiedImage(original, content_hash, None, media_type)
+
+        variant = self._object_path(content_hash, width)
+        variant_size = await asyncio.to_thread(_touch, variant)
+        if variant_size is None:
+            try:
+                await asyncio.to_thread(_resize, original, variant, width)
+                variant_size = await asyncio.to_thread(lambda: variant.stat().st_size)
+            except Exception as e:
+                print(f"Image resize error: {e}")
+                return ProxiedImage(original, content_hash, None, media_type)
+            self._used(f"objects/{content_hash}", variant_size)
+            await self._trim(f"objects/{content_hash}")
+        if variant_size == 0:
+            # Метка: оригинал не шире варианта
+            return ProxiedImage(original, content_hash, None, media_type)
+
+        async with aiofiles.open(variant, "rb") as f:
+            head = await f.read(16)
+        return ProxiedImage(variant, content_hash, width, _sniff_media_type(head))
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "images": sum(1 for unit in self._entries if unit.startswith("objects/")),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "evictions": self.evictions,
+        }
+
+
+# Синглтон сервиса
+image_proxy_service = ImageProxyService()
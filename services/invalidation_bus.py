@@ -0,0 +1,141 @@
+"""
+Invalidation Bus - рассылка сброса in-process кэшей между воркерами через Redis pub/sub
+"""
+import asyncio
+import json
+import uuid
+from typing import Any, Callable, Dict, List, Optional
+
+import redis.asyncio as redis
+
+from config.settings import get_settings
+
+settings = get_settings()
+
+RECONNECT_DELAY = 5.0
+
+Handler = Callable[[Dict[str, Any]], None]
+
+
+class InvalidationBus:
+    """
+    Шина инвалидации кэшей
+
+    Каждый воркер держит собственные in-process кэши. Когда данные меняются,
+    воркер сбрасывает свой кэш и публикует сообщение в канал Redis, а
+    остальные воркеры получают его и сбрасывают свои копии. Если Redis
+    недоступен, публикация пропускается, а при обрыве подписки все
+    подписчики получают полный сброс (сообщения могли потеряться).
+    """
+
+    def __init__(self, redis_url: str = None):
+        self.redis_url = redis_url or settings.REDIS_URL
+        self.worker_id = uuid.uuid4().hex
+        self._handlers: Dict[str, List[Handler]] = {}
+        self._client: Optional[redis.Redis] = None
+        self._task: Optional[asyncio.Task] = None
+
+        # Метрики
+        self.published = 0
+        self.received = 0
+        self.errors = 0
+
+    def _get_client(self) -> redis.Redis:
+        if self._client is None:
+            self._client = redis.from_url(self.redis_url, decode_responses=True)
+        return self._client
+
+    def subscribe(self, channel: str, handler: Handler):
+        """
+        Регистрирует обработчик сообщений канала
+
+        Обработчик получает словарь сообщения; {"reset": True} означает,
+        что нужно сбросить кэш полностью.
+        """
+        self._handlers.setdefault(channel, []).append(handler)
+
+    async def publish(self, channel: str, **payload: Any):
+        """Публикует сообщение инвалидации (ошибки Redis не пробрасываются)"""
+        message = json.dumps({"origin": self.worker_id, **payload}, default=str)
+        try:
+            await self._get_client().publish(channel, message)
+            self.published += 1
+        except Exception as e:
+            self.errors += 1
+            print(f"⚠️ Не удалось опубликовать инвалидацию в {channel}: {e}")
+
+    def _dispatch(self, channel: str, payload: Dict[str, Any]):
+        for handler in self._handlers.get(channel, []):
+            try:
+                handler(payload)
+            except Exception as e:
+                self.errors += 1
+                print(f"❌ Ошибка обработчика инвалидации {channel}: {e}")
+
+    def _reset_all(self):
+        for channel in self._handlers:
+            self._dispatch(channel, {"reset": True})
+
+    async def _listen(self):
+        """Читает сообщения подписанных каналов, переподключаясь при обрыве"""
+        while True:
+            pubsub = None
+            try:
+                pubsub = self._get_client().pubsub()
+                await pubsub.subscribe(*self._handlers.keys())
+                async for message in pubsub.listen():
+                    if message.get("type") != "message":
+                        continue
+                    try:
+                        payload = json.loads(message["data"])
+                    except (TypeError, ValueError):
+                        continue
+                    # Свой кэш воркер уже сбросил при публикации
+                    if payload.get("origin") == self.worker_id:
+                        continue
+                    self.received += 1
+                    self._dispatch(message["channel"], payload)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.errors += 1
+                print(f"⚠️ Подписка на инвалидацию кэшей прервана: {e}")
+                self._reset_all()
+                await asyncio.sleep(RECONNECT_DELAY)
+            finally:
+                if pubsub is not None:
+                    try:
+                        await pubsub.close()
+                    except Exception:
+                        pass
+
+    async def start(self):
+        """Запускает фоновую подписку (вызывается при старте приложения)"""
+        if self._handlers and (self._task is None or self._task.done()):
+            self._task = asyncio.create_task(self._listen())
+
+    async def stop(self):
+        """Останавливает подписку и закрывает соединение с Redis"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._task = None
+        if self._client is not None:
+            await self._client.close()
+            self._client = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "channels": sorted(self._handlers),
+            "listening": self._task is not None and not self._task.done(),
+            "published": self.published,
+            "received": self.received,
+            "errors": self.errors,
+        }
+
+
+# Глобальный экземпляр шины
+invalidation_bus = InvalidationBus()
@@ -1,97 +1,369 @@
 """
 Presentation Files Service - хранение raw.html и final.html
+
+Файлы лежат в хранилище (локальный каталог или S3, см. storage_backends).
+Сами документы хранятся контентно-адресуемо (см. blob_store): одинаковый
+HTML - например, final без картинок, совпадающий с raw, или повторная
+резервная генерация - записывается один раз. У презентации есть только
+манифест со ссылками на блобы, под ключом, шардированным по хэшу владельца:
+    <aa>/<bb>/<user_or_guest_id>/<presentation_id>/manifest.json
 """
+import asyncio
+import json
 import os
-import uuid
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Optional
-import aiofiles
+from typing import Dict, List, Optional, Tuple
+
+from config.settings import get_settings
+from services import async_fs
+from services.blob_store import BlobStore
+from services.storage_backends import StorageBackend, create_storage_backend
+from utils.compression import ENCODING_SUFFIXES, choose_encoding, available_encodings, compress_variants
+from utils.single_flight import SingleFlight
+
+settings = get_settings()
+
+RAW_FILENAME = "raw.html"
+FINAL_FILENAME = "final.html"
+MANIFEST_FILENAME = "manifest.json"
+
+# Документы презентации в манифесте
+RAW = "raw"
+FINAL = "final"
+LEGACY_FILENAMES = {RAW: RAW_FILENAME, FINAL: FINAL_FILENAME}
+DOCUMENT_KINDS = (RAW, FINAL)
+
+# Каталоги владельцев в корне старой плоской структуры (в порядке ключей)
+LEGACY_OWNER_PREFIXES = ("guest_", "user_")
+
+
+@dataclass
+class PresentationFile:
+    """Локальный файл документа презентации для отдачи клиенту"""
+    path: Path
+    encoding: Optional[str]
+    stat: os.stat_result
+    etag: str
+
+
+@dataclass
+class StoredPresentation:
+    """Презентация в хранилище (для обхода при очистке)"""
+    user_or_guest_id: str
+    presentation_id: str
+    modified: float
+    direct_bytes: int
+
 
 class PresentationFilesService:
     """Сервис для работы с файлами презентаций"""
-    
-    def __init__(self, base_path: str = "presentations"):
-        self.base_path = Path(base_path)
-        self.base_path.mkdir(exist_ok=True)
-    
-    def _get_presentation_dir(self, user_or_guest_id: str, presentation_id: str) -> Path:
-        """Получить директорию для презентации"""
-        presentation_dir = self.base_path / user_or_guest_id / presentation_id
-        presentation_dir.mkdir(parents=True, exist_ok=True)
-        return presentation_dir
-    
+
+    def __init__(self, backend: Optional[StorageBackend] = None):
+        self.backend = backend or create_storage_backend()
+        self.blobs = BlobStore(self.backend)
+        self._precompressions = SingleFlight()
+
+        # Метрики
+        self.documents_precompressed = 0
+
+    def _get_presentation_prefix(self, user_or_guest_id: str, presentation_id: str) -> str:
+        """Префикс ключей презентации в шардированной структуре"""
+        owner = async_fs.safe_component(user_or_guest_id)
+        return "/".join((
+            async_fs.shard_prefix(owner).as_posix(),
+            owner,
+            async_fs.safe_component(presentation_id),
+        ))
+
+    def _get_legacy_prefix(self, user_or_guest_id: str, presentation_id: str) -> str:
+        """Префикс в старой плоской структуре (файлы, сохраненные до шардирования)"""
+        return "/".join((
+            async_fs.safe_component(user_or_guest_id),
+            async_fs.safe_component(presentation_id),
+        ))
+
+    @staticmethod
+    def _blob_ref(user_or_guest_id: str, presentation_id: str) -> str:
+        """Имя ссылки презентации на блоб"""
+        return f"{user_or_guest_id}.{presentation_id}"
+
+    def _manifest_key(self, user_or_guest_id: str, presentation_id: str) -> str:
+        return f"{self._get_presentation_prefix(user_or_guest_id, presentation_id)}/{MANIFEST_FILENAME}"
+
+    async def _read_manifest(self, user_or_guest_id: str, presentation_id: str) -> Dict[str, str]:
+        data = await self.backend.get(self._manifest_key(user_or_guest_id, presentation_id))
+        return json.loads(data) if data else {}
+
+    async def _find_legacy_key(self, user_or_guest_id: str, presentation_id: str, kind: str) -> Optional[str]:
+        """Файл, сохраненный до перехода на блобы: в шардированной, затем в плоской структуре"""
+        for prefix in (
+            self._get_presentation_prefix(user_or_guest_id, presentation_id),
+            self._get_legacy_prefix(user_or_guest_id, presentation_id),
+        ):
+            key = f"{prefix}/{LEGACY_FILENAMES[kind]}"
+            if await self.backend.exists(key):
+                return key
+        return None
+
+    async def _save_document(self, user_or_guest_id: str, presentation_id: str, kind: str, html_content: str) -> str:
+        """
+        Сохранить документ в блоб вместе со сжатыми вариантами (.gz, .br),
+        чтобы отдавать его без сжатия на каждый запрос. Если такой документ
+        уже сохранен (например, final совпадает с raw), запись и сжатие пропускаются.
+        """
+        ref = self._blob_ref(user_or_guest_id, presentation_id)
+        digest = await self.blobs.put(html_content.encode("utf-8"), ref, compress=True)
+
+        manifest = await self._read_manifest(user_or_guest_id, presentation_id)
+        previous = manifest.get(kind)
+        manifest[kind] = digest
+        await self.backend.put(
+            self._manifest_key(user_or_guest_id, presentation_id),
+            json.dumps(manifest, sort_keys=True).encode("utf-8")
+        )
+
+        # Замененный документ больше не нужен, если на него не ссылается другой документ презентации
+        if previous and previous not in manifest.values():
+            await self.blobs.release(previous, ref)
+        return self.blobs.blob_key(digest)
+
     async def save_raw_html(self, user_or_guest_id: str, presentation_id: str, html_content: str) -> str:
         """
         Сохранить черновой HTML
-        Возвращает путь к файлу
-        """
-        presentation_dir = self._get_presentation_dir(user_or_guest_id, presentation_id)
-        raw_file_path = presentation_dir / "raw.html"
-        
-        async with aiofiles.open(raw_file_path, 'w', encoding='utf-8') as f:
-            await f.write(html_content)
-        
-        return str(raw_file_path)
-    
+        Возвращает ключ файла в хранилище
+        """
+        return await self._save_document(user_or_guest_id, presentation_id, RAW, html_content)
+
     async def save_final_html(self, user_or_guest_id: str, presentation_id: str, html_content: str) -> str:
         """
         Сохранить финальный HTML с картинками
-        Возвращает путь к файлу
-        """
-        presentation_dir = self._get_presentation_dir(user_or_guest_id, presentation_id)
-        final_file_path = presentation_dir / "final.html"
-        
-        async with aiofiles.open(final_file_path, 'w', encoding='utf-8') as f:
-            await f.write(html_content)
-        
-        return str(final_file_path)
-    
+        Возвращает ключ файла в хранилище
+        """
+        return await self._save_document(user_or_guest_id, presentation_id, FINAL, html_content)
+
+    async def _precompress(self, user_or_guest_id: str, presentation_id: str, digest: Optional[str], key: str):
+        """
+        Сжатые варианты документа, сохраненного без них (raw до этой версии, старые файлы)
+
+        Блоб дожимается через BlobStore (под его блокировкой и маркером удаления),
+        старый файл - вариантами рядом с ним: он больше не перезаписывается.
+        """
+        data = await self.backend.get(key)
+        if data is None:
+            return
+        if digest:
+            await self.blobs.put(data, self._blob_ref(user_or_guest_id, presentation_id), compress=True)
+        else:
+            variants = await asyncio.to_thread(
+                compress_variants, data, settings.PRECOMPRESS_GZIP_LEVEL, settings.PRECOMPRESS_BROTLI_QUALITY
+            )
+            for encoding, compressed in variants.items():
+                await self.backend.put(key + ENCODING_SUFFIXES[encoding], compressed)
+        self.documents_precompressed += 1
+
+    async def _stat_local(self, key: str) -> Optional[Tuple[Path, os.stat_result]]:
+        path = await self.backend.local_path(key)
+        stat_result = await async_fs.stat(path) if path is not None else None
+        return (path, stat_result) if stat_result is not None else None
+
+    async def get_document_file(
+        self,
+        user_or_guest_id: str,
+        presentation_id: str,
+        kind: str = FINAL,
+        accept_encoding: Optional[str] = None
+    ) -> Optional[PresentationFile]:
+        """
+        Локальный файл документа (raw/final) с учетом Accept-Encoding
+
+        Сжатый вариант выбирается, если клиент его принимает; если варианта
+        нет, он создается один раз, а не сжимается на каждый запрос.
+        ETag блоба строится по хэшу содержимого, поэтому он одинаков во
+        всех задачах; для старых файлов - по размеру и времени изменения.
+        """
+        encoding = choose_encoding(accept_encoding, available_encodings())
+
+        digest = (await self._read_manifest(user_or_guest_id, presentation_id)).get(kind)
+        if digest:
+            key = self.blobs.blob_key(digest)
+        else:
+            key = await self._find_legacy_key(user_or_guest_id, presentation_id, kind)
+            if key is None:
+                return None
+
+        candidates = [(key + ENCODING_SUFFIXES[encoding], encoding)] if encoding else []
+        candidates.append((key, None))
+        for candidate_key, candidate_encoding in candidates:
+            stored = await self._stat_local(candidate_key)
+            if stored is None and candidate_encoding:
+                await self._precompressions.run(
+                    key, lambda: self._precompress(user_or_guest_id, presentation_id, digest, key)
+                )
+                stored = await self._stat_local(candidate_key)
+            if stored is None:
+                continue
+            path, stat_result = stored
+            version = digest[:32] if digest else f"{stat_result.st_size:x}-{stat_result.st_mtime_ns:x}"
+            return PresentationFile(
+                path=path,
+                encoding=candidate_encoding,
+                stat=stat_result,
+                etag=f'"{version}-{candidate_encoding or "identity"}"'
+            )
+        return None
+
+    async def get_final_html_file(
+        self,
+        user_or_guest_id: str,
+        presentation_id: str,
+        accept_encoding: Optional[str] = None
+    ) -> Optional[Tuple[Path, Optional[str]]]:
+        """
+        Локальный файл финального HTML с учетом Accept-Encoding
+        Возвращает (путь, кодировка) - кодировка None для несжатого файла
+        """
+        stored = await self.get_document_file(user_or_guest_id, presentation_id, FINAL, accept_encoding)
+        return (stored.path, stored.encoding) if stored else None
+
+    async def _read_text(self, user_or_guest_id: str, presentation_id: str, kind: str) -> Optional[str]:
+        digest = (await self._read_manifest(user_or_guest_id, presentation_id)).get(kind)
+        if digest:
+            data = await self.blobs.get(digest)
+        else:
+            key = await self._find_legacy_key(user_or_guest_id, presentation_id, kind)
+            data = await self.backend.get(key) if key else None
+        return data.decode("utf-8") if data is not None else None
+
     async def get_raw_html(self, user_or_guest_id: str, presentation_id: str) -> Optional[str]:
         """Получить черновой HTML"""
-        presentation_dir = self._get_presentation_dir(user_or_guest_id, presentation_id)
-        raw_file_path = presentation_dir / "raw.html"
-        
-        if not raw_file_path.exists():
-            return None
-        
-        async with aiofiles.open(raw_file_path, 'r', encoding='utf-8') as f:
-            return await f.read()
-    
+        return await self._read_text(user_or_guest_id, presentation_id, RAW)
+
     async def get_final_html(self, user_or_guest_id: str, presentation_id: str) -> Optional[str]:
         """Получить финальный HTML"""
-        presentation_dir = self._get_presentation_dir(user_or_guest_id, presentation_id)
-        final_file_path = presentation_dir / "final.html"
-        
-        if not final_file_path.exists():
-            return None
-        
-        async with aiofiles.open(final_file_path, 'r', encoding='utf-8') as f:
-            return await f.read()
-    
-    def delete_presentation_files(self, user_or_guest_id: str, presentation_id: str) -> bool:
+        return await self._read_text(user_or_guest_id, presentation_id, FINAL)
+
+    async def purge_presentation(self, user_or_guest_id: str, presentation_id: str) -> int:
+        """
+        Удалить все файлы презентации (блобы - только если на них больше никто не ссылается)
+        Возвращает число освобожденных байт
+        """
+        manifest = await self._read_manifest(user_or_guest_id, presentation_id)
+        ref = self._blob_ref(user_or_guest_id, presentation_id)
+        freed = 0
+        for digest in set(manifest.values()):
+            freed += await self.blobs.release(digest, ref)
+        for prefix in (
+            self._get_presentation_prefix(user_or_guest_id, presentation_id),
+            self._get_legacy_prefix(user_or_guest_id, presentation_id),
+        ):
+            objects = await self.backend.list(prefix)
+            freed += sum(stored.size for stored in objects)
+            await self.backend.delete_prefix(prefix)
+        return freed
+
+    async def delete_presentation_files(self, user_or_guest_id: str, presentation_id: str) -> bool:
         """Удалить все файлы презентации"""
         try:
-            presentation_dir = self._get_presentation_dir(user_or_guest_id, presentation_id)
-            if presentation_dir.exists():
-                import shutil
-                shutil.rmtree(presentation_dir)
+            await self.purge_presentation(user_or_guest_id, presentation_id)
             return True
         except Exception as e:
             print(f"Error deleting presentation files: {e}")
             return False
-    
-    def get_presentation_info(self, user_or_guest_id: str, presentation_id: str) -> dict:
+
+    @staticmethod
+    def _group_presentations(objects, owner_index: int) -> List[StoredPresentation]:
+        """Группировка объектов по (владелец, презентация); owner_index - номер сегмента владельца в ключе"""
+        presentations: Dict[Tuple[str, str], StoredPresentation] = {}
+        for stored in objects:
+            parts = stored.key.split("/")
+            if len(parts) < owner_index + 3:
+                continue
+            owner, presentation_id = parts[owner_index], parts[owner_index + 1]
+            entry = presentations.get((owner, presentation_id))
+            if entry is None:
+                entry = presentations[(owner, presentation_id)] = StoredPresentation(owner, presentation_id, 0.0, 0)
+            entry.modified = max(entry.modified, stored.modified)
+            entry.direct_bytes += stored.size
+        return list(presentations.values())
+
+    async def list_shard(self, shard: str) -> List[StoredPresentation]:
+        """Презентации одного шарда ("aa/bb")"""
+        return self._group_presentations(await self.backend.list(shard), owner_index=2)
+
+    async def list_legacy_owners(self, after: str = "", limit: Optional[int] = None) -> List[str]:
+        """
+        Владельцы, у которых остались каталоги в старой плоской структуре
+
+        Не больше limit владельцев после after (в порядке ключей хранилища).
+        """
+        owners: List[str] = []
+        for name_prefix in LEGACY_OWNER_PREFIXES:
+            remaining = None if limit is None else limit - len(owners)
+            if remaining == 0:
+                break
+            owners += await self.backend.list_dirs(name_prefix=name_prefix, start_after=after, limit=remaining)
+        return owners
+
+    async def list_legacy_owner(self, user_or_guest_id: str) -> List[StoredPresentation]:
+        """Презентации владельца в старой плоской структуре"""
+        objects = await self.backend.list(async_fs.safe_component(user_or_guest_id))
+        return self._group_presentations(objects, owner_index=0)
+
+    async def get_presentation_usage(self, presentation: StoredPresentation) -> int:
+        """Занятое презентацией место: собственные файлы и блобы, на которые она ссылается"""
+        manifest = await self._read_manifest(presentation.user_or_guest_id, presentation.presentation_id)
+        usage = presentation.direct_bytes
+        for digest in set(manifest.values()):
+            usage += await self.blobs.usage(digest)
+        return usage
+
+    async def _document_info(self, user_or_guest_id: str, presentation_id: str,
+                             manifest: Dict[str, str], kind: str) -> Tuple[Optional[int], Dict[str, int]]:
+        """Размер документа и его сжатых вариантов"""
+        digest = manifest.get(kind)
+        if digest:
+            size = await self.blobs.size(digest)
+            variant_sizes = {encoding: await self.blobs.size(digest, encoding) for encoding in ENCODING_SUFFIXES}
+        else:
+            key = await self._find_legacy_key(user_or_guest_id, presentation_id, kind)
+            if key is None:
+                return None, {}
+            stored = await self.backend.stat(key)
+            size = stored.size if stored else None
+            variant_sizes = {}
+            for encoding, suffix in ENCODING_SUFFIXES.items():
+                variant = await self.backend.stat(key + suffix)
+                variant_sizes[encoding] = variant.size if variant else None
+        return size, {encoding: size for encoding, size in variant_sizes.items() if size is not None}
+
+    async def get_presentation_info(self, user_or_guest_id: str, presentation_id: str) -> dict:
         """Получить информацию о файлах презентации"""
-        presentation_dir = self._get_presentation_dir(user_or_guest_id, presentation_id)
-        raw_file = presentation_dir / "raw.html"
-        final_file = presentation_dir / "final.html"
-        
+        manifest = await self._read_manifest(user_or_guest_id, presentation_id)
+        raw_size, _ = await self._document_info(user_or_guest_id, presentation_id, manifest, RAW)
+        final_size, compressed_sizes = await self._document_info(user_or_guest_id, presentation_id, manifest, FINAL)
+
+        return {
+            "storage": self.backend.name,
+            "presentation_dir": self._get_presentation_prefix(user_or_guest_id, presentation_id),
+            "raw_exists": raw_size is not None,
+            "final_exists": final_size is not None,
+            "raw_size": raw_size or 0,
+            "final_size": final_size or 0,
+            "final_compressed_sizes": compressed_sizes,
+            "raw_digest": manifest.get(RAW),
+            "final_digest": manifest.get(FINAL),
+            "deduplicated": bool(manifest.get(RAW)) and manifest.get(RAW) == manifest.get(FINAL),
+        }
+
+    async def close(self):
+        await self.backend.close()
+
+    def get_stats(self) -> dict:
         return {
-            "presentation_dir": str(presentation_dir),
-            "raw_exists": raw_file.exists(),
-            "final_exists": final_file.exists(),
-            "raw_size": raw_file.stat().st_size if raw_file.exists() else 0,
-            "final_size": final_file.stat().st_size if final_file.exists() else 0,
+            **self.backend.get_stats(),
+            "blobs": self.blobs.get_stats(),
+            "documents_precompressed": self.documents_precompressed,
         }
 
 # Синглтон сервиса
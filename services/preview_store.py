@@ -0,0 +1,128 @@
+"""
+Preview Store - хранение HTML превью расширенных презентаций
+"""
+import asyncio
+import hashlib
+import json
+import os
+import re
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Optional, Sequence
+
+from config.settings import get_settings
+from services import async_fs
+from services.presentation_files import presentation_files_service
+from services.storage_backends import StorageBackend
+from utils.compression import ENCODING_SUFFIXES, available_encodings, choose_encoding, compress_variants
+from utils.static_assets import ASSETS_VERSION
+
+settings = get_settings()
+
+# Меняется при изменении шаблона превью, чтобы ключи не совпали со старыми файлами
+PREVIEW_RENDER_VERSION = "v1"
+
+PREVIEW_ID_RE = re.compile(r"^[0-9a-f]{32}$")
+
+PREVIEWS_PREFIX = "previews"
+
+
+def preview_key(title: str, slides: Sequence[Any]) -> str:
+    """
+    Детерминированный ключ превью
+
+    Одинаковые слайды (и версия шаблона/стилей) дают один ключ, поэтому
+    повторная генерация того же содержимого не рендерит превью заново.
+    """
+    payload = json.dumps(
+        {
+            "render": PREVIEW_RENDER_VERSION,
+            "assets": ASSETS_VERSION,
+            "title": title,
+            "slides": [slide.model_dump() if hasattr(slide, "model_dump") else slide for slide in slides],
+        },
+        sort_keys=True,
+        ensure_ascii=False,
+        default=str,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:32]
+
+
+@dataclass
+class PreviewFile:
+    """Локальный файл превью для отдачи клиенту"""
+    path: Path
+    encoding: Optional[str]
+    stat: os.stat_result
+    etag: str
+
+
+class PreviewStore:
+    """
+    Превью в хранилище презентаций (локальный диск или S3, см. storage_backends)
+
+    Ключи: previews/<aa>/<preview_id>.html, сжатые варианты рядом. Превью
+    доступно из любой задачи ECS; устаревшие удаляет StorageSweeper.
+    """
+
+    def __init__(self, backend: StorageBackend = None):
+        self.backend = backend or presentation_files_service.backend
+
+    @staticmethod
+    def _key(preview_id: str, encoding: Optional[str] = None) -> str:
+        if not PREVIEW_ID_RE.match(preview_id):
+            raise ValueError("Invalid preview id")
+        key = f"{PREVIEWS_PREFIX}/{preview_id[:2]}/{preview_id}.html"
+        return key + ENCODING_SUFFIXES[encoding] if encoding else key
+
+    async def exists(self, preview_id: str) -> bool:
+        return await self.backend.exists(self._key(preview_id))
+
+    async def save(self, preview_id: str, html_content: str) -> str:
+        """Сохранить превью, возвращает ключ в хранилище"""
+        key = self._key(preview_id)
+        data = html_content.encode("utf-8")
+        variants = await asyncio.to_thread(
+            compress_variants, data, settings.PRECOMPRESS_GZIP_LEVEL, settings.PRECOMPRESS_BROTLI_QUALITY
+        )
+
+        # Сначала сжатые варианты, последним - сам HTML: его наличие означает готовность
+        for encoding, compressed in variants.items():
+            await self.backend.put(self._key(preview_id, encoding), compressed)
+        await self.backend.put(key, data)
+        return key
+
+    async def get_file(self, preview_id: str, accept_encoding: Optional[str] = None) -> Optional[PreviewFile]:
+        """Файл превью с учетом Accept-Encoding или None, если превью еще не готово"""
+        if not await self.exists(preview_id):
+            return None
+        encoding = choose_encoding(accept_encoding, available_encodings())
+        candidates = [(self._key(preview_id, encoding), encoding)] if encoding else []
+        candidates.append((self._key(preview_id), None))
+        for key, candidate_encoding in candidates:
+            path = await self.backend.local_path(key)
+            stat_result = await async_fs.stat(path) if path is not None else None
+            if stat_result is None:
+                continue
+            return PreviewFile(
+                path=path,
+                encoding=candidate_encoding,
+                stat=stat_result,
+                etag=f'"{preview_id}-{candidate_encoding or "identity"}"'
+            )
+        return None
+
+    async def purge_expired(self, shard: str, max_age: float) -> int:
+        """Удалить превью шарда ("aa") старше max_age секунд, возвращает освобожденные байты"""
+        now = time.time()
+        freed = 0
+        for stored in await self.backend.list(f"{PREVIEWS_PREFIX}/{shard}"):
+            if now - stored.modified > max_age:
+                await self.backend.delete(stored.key)
+                freed += stored.size
+        return freed
+
+
+# Глобальный экземпляр хранилища
+preview_store = PreviewStore()
@@ -0,0 +1,639 @@
+"""
+Storage Backends - хранилища файлов презентаций
+
+local - каталог на диске контейнера, s3 - S3-совместимое объектное хранилище
+(AWS S3, MinIO), общее для всех задач ECS. Ключи - POSIX-пути вида
+"<aa>/<bb>/<owner>/<presentation_id>/final.html".
+"""
+import asyncio
+import heapq
+import os
+import uuid
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+import aiofiles
+
+from config.settings import get_settings
+from services import async_fs
+from utils.single_flight import SingleFlight
+
+try:
+    from aiobotocore.config import AioConfig
+    from aiobotocore.session import get_session as get_aiobotocore_session
+    from botocore.exceptions import ClientError
+except ImportError:  # aiobotocore - необязательная зависимость (только для s3)
+    AioConfig = None
+    get_aiobotocore_session = None
+    ClientError = None
+
+settings = get_settings()
+
+STREAM_CHUNK_SIZE = 256 * 1024
+
+# Минимальный размер части multipart-загрузки в S3 (кроме последней)
+S3_MIN_PART_SIZE = 5 * 1024 * 1024
+
+
+@dataclass
+class StoredObject:
+    """Метаданные объекта в хранилище"""
+    key: str
+    size: int
+    modified: float
+    etag: Optional[str] = None
+
+
+class StorageError(Exception):
+    """Ошибка хранилища файлов"""
+    pass
+
+
+def _split_key(key: str) -> List[str]:
+    """Разбор ключа с проверкой каждого сегмента (без '..' и абсолютных путей)"""
+    return [async_fs.safe_component(part) for part in key.strip("/").split("/")]
+
+
+async def _iter_bytes(data: bytes, chunk_size: int = STREAM_CHUNK_SIZE) -> AsyncIterator[bytes]:
+    for offset in range(0, len(data), chunk_size):
+        yield data[offset:offset + chunk_size]
+
+
+def _dir_key(name: str) -> str:
+    """Порядок каталогов как у ключей S3 (имя + "/"): "a-b" идет раньше "a"."""
+    return name + "/"
+
+
+class StorageBackend(ABC):
+    """Интерфейс хранилища файлов презентаций"""
+
+    name = "base"
+
+    @abstractmethod
+    async def put(self, key: str, data: bytes):
+        """Записать объект целиком"""
+
+    @abstractmethod
+    async def put_stream(self, key: str, chunks: AsyncIterator[bytes]) -> int:
+        """Записать объект из потока порций, возвращает размер"""
+
+    @abstractmethod
+    async def get(self, key: str) -> Optional[bytes]:
+        """Прочитать объект целиком (None, если его нет)"""
+
+    @abstractmethod
+    def iter_chunks(self, key: str, chunk_size: int = STREAM_CHUNK_SIZE) -> AsyncIterator[bytes]:
+        """Прочитать объект потоком (FileNotFoundError, если его нет)"""
+
+    @abstractmethod
+    async def stat(self, key: str) -> Optional[StoredObject]:
+        """Метаданные объекта (None, если его нет)"""
+
+    async def exists(self, key: str) -> bool:
+        return await self.stat(key) is not None
+
+    @abstractmethod
+    async def delete(self, key: str) -> bool:
+        """Удалить объект"""
+
+    @abstractmethod
+    async def touch(self, key: str) -> bool:
+        """
+        Обновить время изменения объекта, не меняя содержимого
+
+        Отметка использования, видимая всем задачам с общим хранилищем (LRU).
+        Returns:
+            False, если объекта нет
+        """
+
+    @abstractmethod
+    async def list(self, prefix: str) -> List[StoredObject]:
+        """Объекты с ключами, начинающимися с prefix/"""
+
+    @abstractmethod
+    async def list_dirs(self, prefix: str = "", name_prefix: str = "",
+                        start_after: str = "", limit: Optional[int] = None) -> List[str]:
+        """
+        Имена "подкаталогов" непосредственно под prefix/ (без рекурсии)
+
+        Только имена, начинающиеся с name_prefix и идущие после start_after,
+        не больше limit - чтобы обход продолжался с курсора, а не перечислял
+        все хранилище. Порядок - порядок ключей ("<имя>/"), как в S3.
+        """
+
+    async def delete_prefix(self, prefix: str) -> int:
+        """Удалить все объекты под prefix/, возвращает их число"""
+        objects = await self.list(prefix)
+        for stored in objects:
+            await self.delete(stored.key)
+        return len(objects)
+
+    @abstractmethod
+    async def local_path(self, key: str) -> Optional[Path]:
+        """
+        Локальный файл с содержимым объекта (для отдачи через FileResponse)
+
+        Для удаленных хранилищ объект загружается в локальный кэш.
+        """
+
+    async def close(self):
+        pass
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {"backend": self.name}
+
+
+class LocalStorageBackend(StorageBackend):
+    """Хранилище в локальном каталоге"""
+
+    name = "local"
+
+    def __init__(self, base_path: str = None):
+        self.base_path = Path(base_path or settings.STORAGE_LOCAL_PATH)
+
+    def _path(self, key: str) -> Path:
+        return self.base_path.joinpath(*_split_key(key))
+
+    def _key(self, path: Path) -> str:
+        return path.relative_to(self.base_path).as_posix()
+
+    async def put(self, key: str, data: bytes):
+        await async_fs.write_bytes_atomic(self._path(key), data)
+
+    async def put_stream(self, key: str, chunks: AsyncIterator[bytes]) -> int:
+        path = self._path(key)
+        await async_fs.makedirs(path.parent)
+        tmp_path = path.with_name(f".{path.name}.{uuid.uuid4().hex}.tmp")
+        size = 0
+        try:
+            async with aiofiles.open(tmp_path, "wb") as f:
+                async for chunk in chunks:
+                    await f.write(chunk)
+                    size += len(chunk)
+            await asyncio.to_thread(os.replace, tmp_path, path)
+        except BaseException:
+            await async_fs.remove(tmp_path)
+            raise
+        return size
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return await async_fs.read_bytes(self._path(key))
+
+    async def iter_chunks(self, key: str, chunk_size: int = STREAM_CHUNK_SIZE) -> AsyncIterator[bytes]:
+        async with aiofiles.open(self._path(key), "rb") as f:
+            while True:
+                chunk = await f.read(chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+
+    async def stat(self, key: str) -> Optional[StoredObject]:
+        stat_result = await async_fs.stat(self._path(key))
+        if stat_result is None:
+            return None
+        return StoredObject(key, stat_result.st_size, stat_result.st_mtime)
+
+    async def delete(self, key: str) -> bool:
+        return await async_fs.remove(self._path(key))
+
+    async def touch(self, key: str) -> bool:
+        try:
+            await asyncio.to_thread(os.utime, self._path(key))
+        except FileNotFoundError:
+            return False
+        return True
+
+    def _walk(self, root: Path) -> List[StoredObject]:
+        objects = []
+        for dirpath, _, filenames in os.walk(root):
+            for filename in filenames:
+                if filename.startswith("."):
+                    continue  # незавершенные записи
+                path = Path(dirpath) / filename
+                try:
+                    stat_result = path.stat()
+                except FileNotFoundError:
+                    continue
+                objects.append(StoredObject(self._key(path), stat_result.st_size, stat_result.st_mtime))
+        return objects
+
+    async def list(self, prefix: str) -> List[StoredObject]:
+        return await asyncio.to_thread(self._walk, self._path(prefix))
+
+    @staticmethod
+    def _subdirs(root: Path, name_prefix: str, start_after: str, limit: Optional[int]) -> List[str]:
+        after = start_after + "/"
+        try:
+            with os.scandir(root) as entries:
+                # Список имен не собирается целиком: держим только limit первых
+                names = (
+                    entry.name for entry in entries
+                    if entry.name.startswith(name_prefix) and not entry.name.startswith(".")
+                    and entry.name + "/" > after and entry.is_dir()
+                )
+                if limit is None:
+                    return sorted(names, key=_dir_key)
+                return heapq.nsmallest(limit, names, key=_dir_key)
+        except FileNotFoundError:
+            return []
+
+    async def list_dirs(self, prefix: str = "", name_prefix: str = "",
+                        start_after: str = "", limit: Optional[int] = None) -> List[str]:
+        root = self._path(prefix) if prefix else self.base_path
+        return await asyncio.to_thread(self._subdirs, root, name_prefix, start_after, limit)
+
+    async def delete_prefix(self, prefix: str) -> int:
+        root = self._path(prefix)
+        count = len(await asyncio.to_thread(self._walk, root))
+        await async_fs.rmtree(root)
+        return count
+
+    async def local_path(self, key: str) -> Optional[Path]:
+        path = self._path(key)
+        return path if await async_fs.exists(path) else None
+
+
+class ReadThroughCache:
+    """
+    Локальный дисковый кэш объектов удаленного хранилища с ограничением размера (LRU)
+
+    Ключи файлов презентаций не перезаписываются другим содержимым (uuid
+    презентации), поэтому закэшированный файл не требует проверки актуальности.
+    """
+
+    def __init__(self, cache_dir: str, max_bytes: int):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, int]" = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def path(self, key: str) -> Path:
+        return self.cache_dir.joinpath(*_split_key(key))
+
+    def _register(self, key: str, size: int):
+        self._bytes -= self._entries.pop(key, 0)
+        self._entries[key] = size
+        self._bytes += size
+
+    async def lookup(self, key: str) -> Optional[Path]:
+        path = self.path(key)
+        if key in self._entries:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return path
+        # Файл мог остаться с прошлого запуска процесса
+        stat_result = await async_fs.stat(path)
+        if stat_result is not None:
+            self._register(key, stat_result.st_size)
+            await self._trim()
+            self.hits += 1
+            return path
+        self.misses += 1
+        return None
+
+    async def store(self, key: str, data: bytes) -> Optional[Path]:
+        if len(data) > self.max_bytes:
+            return None
+        path = self.path(key)
+        await async_fs.write_bytes_atomic(path, data)
+        self._register(key, len(data))
+        await self._trim()
+        return path
+
+    async def store_stream(self, key: str, chunks: AsyncIterator[bytes]) -> Path:
+        path = self.path(key)
+        await async_fs.makedirs(path.parent)
+        tmp_path = path.with_name(f".{path.name}.{uuid.uuid4().hex}.tmp")
+        size = 0
+        try:
+            async with aiofiles.open(tmp_path, "wb") as f:
+                async for chunk in chunks:
+                    await f.write(chunk)
+                    size += len(chunk)
+            await asyncio.to_thread(os.replace, tmp_path, path)
+        except BaseException:
+            await async_fs.remove(tmp_path)
+            raise
+        self._register(key, size)
+        await self._trim()
+        return path
+
+    async def evict(self, key: str):
+        self._bytes -= self._entries.pop(key, 0)
+        await async_fs.remove(self.path(key))
+
+    async def _trim(self):
+        # Последний добавленный файл не вытесняется, даже если он один больше лимита
+        while self._bytes > self.max_bytes and len(self._entries) > 1:
+            key, size = self._entries.popitem(last=False)
+            self._bytes -= size
+            await async_fs.remove(self.path(key))
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "files": len(self._entries),
+            "bytes": self._bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+class S3StorageBackend(StorageBackend):
+    """
+    S3-совместимое хранилище (AWS S3, MinIO)
+
+    Большие объекты загружаются multipart-загрузкой частями по part_size,
+    чтение идет потоком. Для отдачи файлов объекты загружаются в локальный
+    кэш (read-through), записанные объекты сразу кладутся в него же.
+    """
+
+    name = "s3"
+
+    def __init__(
+        self,
+        bucket: str = None,
+        prefix: str = None,
+        endpoint_url: Optional[str] = None,
+        region: Optional[str] = None,
+        access_key_id: Optional[str] = None,
+        secret_access_key: Optional[str] = None,
+        cache_dir: str = None,
+        cache_max_bytes: int = None,
+        multipart_threshold: int = None,
+        part_size: int = None,
+    ):
+        if get_aiobotocore_session is None:
+            raise StorageError("STORAGE_BACKEND=s3 requires the aiobotocore package")
+
+        self.bucket = bucket or settings.S3_BUCKET
+        if not self.bucket:
+            raise StorageError("S3_BUCKET is not configured")
+        self.prefix = (prefix if prefix is not None else settings.S3_PREFIX).strip("/")
+        self.endpoint_url = endpoint_url or settings.S3_ENDPOINT_URL or None
+        self.region = region or settings.S3_REGION
+        # Пустые ключи - учетные данные из окружения (роль задачи ECS)
+        self.access_key_id = access_key_id or settings.S3_ACCESS_KEY_ID or None
+        self.secret_access_key = secret_access_key or settings.S3_SECRET_ACCESS_KEY or None
+        self.multipart_threshold = multipart_threshold or settings.S3_MULTIPART_THRESHOLD
+        self.part_size = max(part_size or settings.S3_PART_SIZE, S3_MIN_PART_SIZE)
+        self.cache = ReadThroughCache(
+            cache_dir or settings.STORAGE_CACHE_DIR,
+            cache_max_bytes or settings.STORAGE_CACHE_MAX_BYTES
+        )
+
+        self._client = None
+        self._client_context = None
+        self._client_lock = asyncio.Lock()
+        self._downloads = SingleFlight()
+
+        # Метрики
+        self.uploads = 0
+        self.multipart_uploads = 0
+        self.downloads = 0
+
+    async def _get_client(self):
+        if self._client is None:
+            async with self._client_lock:
+                if self._client is None:
+                    self._client_context = get_aiobotocore_session().create_client(
+                        "s3",
+                        region_name=self.region,
+                        endpoint_url=self.endpoint_url,
+                        aws_access_key_id=self.access_key_id,
+                        aws_secret_access_key=self.secret_access_key,
+                        config=AioConfig(max_pool_connections=settings.S3_MAX_CONNECTIONS),
+                    )
+                    self._client = await self._client_context.__aenter__()
+        return self._client
+
+    async def close(self):
+        if self._client_context is not None:
+            await self._client_context.__aexit__(None, None, None)
+        self._client = None
+        self._client_context = None
+
+    def _object_key(self, key: str) -> str:
+        key = "/".join(_split_key(key))
+        return f"{self.prefix}/{key}" if self.prefix else key
+
+    def _strip_prefix(self, object_key: str) -> str:
+        return object_key[len(self.prefix) + 1:] if self.prefix else object_key
+
+    @staticmethod
+    def _is_not_found(error: Exception) -> bool:
+        code = getattr(error, "response", {}).get("Error", {}).get("Code")
+        return code in ("404", "NoSuchKey", "NotFound")
+
+    async def put(self, key: str, data: bytes):
+        if len(data) >= self.multipart_threshold:
+            await self.put_stream(key, _iter_bytes(data, self.part_size))
+            return
+        client = await self._get_client()
+        await client.put_object(Bucket=self.bucket, Key=self._object_key(key), Body=data)
+        self.uploads += 1
+        await self.cache.store(key, data)
+
+    async def put_stream(self, key: str, chunks: AsyncIterator[bytes]) -> int:
+        """
+        Потоковая запись: пока данных меньше порога - один put_object,
+        иначе multipart-загрузка частями по part_size
+        """
+        client = await self._get_client()
+        object_key = self._object_key(key)
+        buffer = bytearray()
+        upload_id = None
+        parts = []
+        size = 0
+
+        try:
+            async for chunk in chunks:
+                buffer += chunk
+                size += len(chunk)
+                if upload_id is None and len(buffer) >= self.multipart_threshold:
+                    response = await client.create_multipart_upload(Bucket=self.bucket, Key=object_key)
+                    upload_id = response["UploadId"]
+                while upload_id is not None and len(buffer) >= self.part_size:
+                    await self._upload_part(client, object_key, upload_id, parts, bytes(buffer[:self.part_size]))
+                    del buffer[:self.part_size]
+
+            if upload_id is None:
+                data = bytes(buffer)
+                await client.put_object(Bucket=self.bucket, Key=object_key, Body=data)
+                self.uploads += 1
+                await self.cache.store(key, data)
+                return size
+
+            if buffer or not parts:
+                await self._upload_part(client, object_key, upload_id, parts, bytes(buffer))
+            await client.complete_multipart_upload(
+                Bucket=self.bucket, Key=object_key, UploadId=upload_id,
+                MultipartUpload={"Parts": parts}
+            )
+            self.multipart_uploads += 1
+        except BaseException:
+            if upload_id is not None:
+                try:
+                    await client.abort_multipart_upload(Bucket=self.bucket, Key=object_key, UploadId=upload_id)
+                except Exception as e:
+                    print(f"⚠️ Не удалось отменить multipart-загрузку {object_key}: {e}")
+            raise
+
+        await self.cache.evict(key)
+        return size
+
+    async def _upload_part(self, client, object_key: str, upload_id: str, parts: List[dict], data: bytes):
+        part_number = len(parts) + 1
+        response = await client.upload_part(
+            Bucket=self.bucket, Key=object_key, UploadId=upload_id,
+            PartNumber=part_number, Body=data
+        )
+        parts.append({"PartNumber": part_number, "ETag": response["ETag"]})
+
+    async def get(self, key: str) -> Optional[bytes]:
+        try:
+            chunks = [chunk async for chunk in self.iter_chunks(key)]
+        except FileNotFoundError:
+            return None
+        return b"".join(chunks)
+
+    async def iter_chunks(self, key: str, chunk_size: int = STREAM_CHUNK_SIZE) -> AsyncIterator[bytes]:
+        client = await self._get_client()
+        try:
+            response = await client.get_object(Bucket=self.bucket, Key=self._object_key(key))
+        except ClientError as e:
+            if self._is_not_found(e):
+                raise FileNotFoundError(key) from e
+            raise
+        self.downloads += 1
+        body = response["Body"]
+        try:
+            while True:
+                chunk = await body.read(chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+        finally:
+            body.close()
+
+    async def stat(self, key: str) -> Optional[StoredObject]:
+        client = await self._get_client()
+        try:
+            response = await client.head_object(Bucket=self.bucket, Key=self._object_key(key))
+        except ClientError as e:
+            if self._is_not_found(e):
+                return None
+            raise
+        return StoredObject(
+            key=key,
+            size=response["ContentLength"],
+            modified=response["LastModified"].timestamp(),
+            etag=response.get("ETag"),
+        )
+
+    async def delete(self, key: str) -> bool:
+        client = await self._get_client()
+        await client.delete_object(Bucket=self.bucket, Key=self._object_key(key))
+        await self.cache.evict(key)
+        return True
+
+    async def touch(self, key: str) -> bool:
+        """Копирование объекта в себя (серверное, без передачи данных) обновляет LastModified"""
+        client = await self._get_client()
+        object_key = self._object_key(key)
+        try:
+            await client.copy_object(
+                Bucket=self.bucket, Key=object_key,
+                CopySource={"Bucket": self.bucket, "Key": object_key},
+                MetadataDirective="REPLACE",
+            )
+        except ClientError as e:
+            if self._is_not_found(e):
+                return False
+            raise
+        return True
+
+    async def list(self, prefix: str) -> List[StoredObject]:
+        client = await self._get_client()
+        paginator = client.get_paginator("list_objects_v2")
+        objects = []
+        async for page in paginator.paginate(Bucket=self.bucket, Prefix=self._object_key(prefix) + "/"):
+            for item in page.get("Contents", []):
+                objects.append(StoredObject(
+                    key=self._strip_prefix(item["Key"]),
+                    size=item["Size"],
+                    modified=item["LastModified"].timestamp(),
+                    etag=item.get("ETag"),
+                ))
+        return objects
+
+    async def list_dirs(self, prefix: str = "", name_prefix: str = "",
+                        start_after: str = "", limit: Optional[int] = None) -> List[str]:
+        client = await self._get_client()
+        paginator = client.get_paginator("list_objects_v2")
+        base = self._object_key(prefix) + "/" if prefix else (f"{self.prefix}/" if self.prefix else "")
+        params = {"Bucket": self.bucket, "Prefix": base + name_prefix, "Delimiter": "/"}
+        if start_after:
+            # "0" - следующий символ после "/": все ключи start_after/... остаются позади
+            params["StartAfter"] = base + start_after + "0"
+        if limit is not None:
+            params["PaginationConfig"] = {"PageSize": min(limit, 1000)}
+        names = []
+        async for page in paginator.paginate(**params):
+            for item in page.get("CommonPrefixes", []):
+                names.append(item["Prefix"][len(base):].rstrip("/"))
+            if limit is not None and len(names) >= limit:
+                return names[:limit]
+        return names
+
+    async def delete_prefix(self, prefix: str) -> int:
+        objects = await self.list(prefix)
+        client = await self._get_client()
+        # delete_objects принимает не более 1000 ключей
+        for offset in range(0, len(objects), 1000):
+            batch = objects[offset:offset + 1000]
+            await client.delete_objects(
+                Bucket=self.bucket,
+                Delete={"Objects": [{"Key": self._object_key(stored.key)} for stored in batch], "Quiet": True}
+            )
+            for stored in batch:
+                await self.cache.evict(stored.key)
+        return len(objects)
+
+    async def local_path(self, key: str) -> Optional[Path]:
+        """Файл из локального кэша; при промахе объект загружается потоком (один раз на ключ)"""
+        path = await self.cache.lookup(key)
+        if path is not None:
+            return path
+
+        return await self._downloads.run(key, lambda: self._download(key))
+
+    async def _download(self, key: str) -> Optional[Path]:
+        try:
+            return await self.cache.store_stream(key, self.iter_chunks(key))
+        except FileNotFoundError:
+            return None
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "backend": self.name,
+            "bucket": self.bucket,
+            "uploads": self.uploads,
+            "multipart_uploads": self.multipart_uploads,
+            "downloads": self.downloads,
+            "cache": self.cache.get_stats(),
+        }
+
+
+def create_storage_backend(backend: str = None) -> StorageBackend:
+    """Хранилище по настройке STORAGE_BACKEND: local | s3"""
+    backend = (backend or settings.STORAGE_BACKEND).lower()
+    if backend == "local":
+        return LocalStorageBackend()
+    if backend == "s3":
+        return S3StorageBackend()
+    raise StorageError(f"Unknown storage backend: {backend}")
@@ -0,0 +1,288 @@
+"""
+Storage Sweeper - фоновая очистка хранилища презентаций
+
+За один запуск обрабатывается небольшая пачка шардов (см. async_fs), курсор
+хранится в Redis, поэтому обход продолжается после рестарта и не
+дублируется в нескольких задачах ECS (проход выполняет тот, кто взял
+блокировку). Удаляются:
+    - гостевые презентации старше GUEST_PRESENTATION_TTL_DAYS;
+    - файлы владельцев, которых больше нет в БД (удаленный пользователь,
+      удаленная или неактивная гостевая сессия); файлы из /generate-presentation
+      не связаны со строками presentations, поэтому проверяется только владелец;
+    - самые старые презентации пользователя сверх USER_STORAGE_QUOTA_BYTES;
+    - HTML превью старше PREVIEW_TTL_DAYS.
+"""
+import asyncio
+import time
+import uuid
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+import redis.asyncio as redis
+from sqlalchemy import select
+
+from config.settings import get_settings
+from models.base import async_session
+from models.guest_session import GuestSession
+from models.user import User
+from services import async_fs
+from services.presentation_files import PresentationFilesService, StoredPresentation, presentation_files_service
+from services.preview_store import PreviewStore, preview_store
+
+settings = get_settings()
+
+SWEEPER_LOCK_KEY = "storage_sweeper:lock"
+SWEEPER_CURSOR_KEY = "storage_sweeper:cursor"
+SWEEPER_LEGACY_KEY = "storage_sweeper:legacy_after"
+
+
+class StorageSweeper:
+    """Инкрементальная очистка хранилища с ограничением скорости"""
+
+    def __init__(self, files_service: PresentationFilesService = None, previews: PreviewStore = None):
+        self.files = files_service or presentation_files_service
+        self.previews = previews or preview_store
+        self.interval = settings.STORAGE_SWEEP_INTERVAL
+        self.shards_per_run = settings.STORAGE_SWEEP_SHARDS_PER_RUN
+        self.max_ops_per_second = settings.STORAGE_SWEEP_MAX_OPS_PER_SECOND
+        self.guest_ttl = settings.GUEST_PRESENTATION_TTL_DAYS * 24 * 3600
+        self.user_quota = settings.USER_STORAGE_QUOTA_BYTES
+        self.preview_ttl = settings.PREVIEW_TTL_DAYS * 24 * 3600
+
+        self._task: Optional[asyncio.Task] = None
+        self._redis: Optional[redis.Redis] = None
+        # Позиции обхода, если Redis недоступен
+        self._cursor = 0
+        self._legacy_after = ""
+        self._last_op = 0.0
+        self._worker_id = uuid.uuid4().hex
+
+        # Метрики
+        self.runs = 0
+        self.passes_completed = 0
+        self.shards_scanned = 0
+        self.expired_deleted = 0
+        self.orphans_deleted = 0
+        self.over_quota_deleted = 0
+        self.previews_bytes_deleted = 0
+        self.bytes_reclaimed = 0
+        self.errors = 0
+        self.last_run_at: Optional[float] = None
+        self.last_run_duration = 0.0
+
+    def _get_redis(self) -> redis.Redis:
+        if self._redis is None:
+            self._redis = redis.from_url(settings.REDIS_URL)
+        return self._redis
+
+    async def _throttle(self):
+        """Не больше max_ops_per_second операций удаления/подсчета в секунду"""
+        delay = 1.0 / self.max_ops_per_second - (time.monotonic() - self._last_op)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        self._last_op = time.monotonic()
+
+    async def _acquire_lock(self) -> bool:
+        try:
+            return bool(await self._get_redis().set(
+                SWEEPER_LOCK_KEY, self._worker_id, nx=True, ex=max(int(self.interval) * 2, 300)
+            ))
+        except Exception as e:
+            print(f"⚠️ Redis недоступен, очистка хранилища без блокировки: {e}")
+            return True
+
+    async def _release_lock(self):
+        try:
+            client = self._get_redis()
+            if await client.get(SWEEPER_LOCK_KEY) == self._worker_id.encode():
+                await client.delete(SWEEPER_LOCK_KEY)
+        except Exception:
+            pass
+
+    async def _load_position(self):
+        try:
+            cursor, legacy_after = await self._get_redis().mget(SWEEPER_CURSOR_KEY, SWEEPER_LEGACY_KEY)
+            self._cursor = int(cursor) if cursor is not None else 0
+            self._legacy_after = legacy_after.decode() if legacy_after is not None else ""
+        except Exception:
+            pass
+
+    async def _save_position(self):
+        try:
+            await self._get_redis().mset({
+                SWEEPER_CURSOR_KEY: self._cursor,
+                SWEEPER_LEGACY_KEY: self._legacy_after,
+            })
+        except Exception:
+            pass
+
+    @staticmethod
+    async def _existing_owners(owners: Iterable[str]) -> Set[str]:
+        """Владельцы, которые еще есть в БД (пользователи и активные гостевые сессии)"""
+        user_ids = {}
+        guest_ids = {}
+        existing = set()
+        for owner in owners:
+            kind, _, owner_id = owner.partition("_")
+            if kind == "user" and owner_id.isdigit():
+                user_ids[int(owner_id)] = owner
+            elif kind == "guest" and owner_id:
+                guest_ids[owner_id] = owner
+            else:
+                # Неизвестный формат владельца - не считаем файлы осиротевшими
+                existing.add(owner)
+
+        async with async_session() as session:
+            if user_ids:
+                result = await session.execute(select(User.id).where(User.id.in_(list(user_ids))))
+                existing.update(user_ids[user_id] for user_id in result.scalars())
+            if guest_ids:
+                result = await session.execute(
+                    select(GuestSession.session_id).where(
+                        GuestSession.session_id.in_(list(guest_ids)),
+                        GuestSession.is_active.is_(True)
+                    )
+                )
+                existing.update(guest_ids[session_id] for session_id in result.scalars())
+        return existing
+
+    async def _purge(self, presentation: StoredPresentation) -> int:
+        await self._throttle()
+        freed = await self.files.purge_presentation(presentation.user_or_guest_id, presentation.presentation_id)
+        self.bytes_reclaimed += freed
+        return freed
+
+    async def _sweep_presentations(self, presentations: List[StoredPresentation]):
+        """Применить правила хранения к презентациям одного шарда"""
+        if not presentations:
+            return
+        by_owner: Dict[str, List[StoredPresentation]] = defaultdict(list)
+        for presentation in presentations:
+            by_owner[presentation.user_or_guest_id].append(presentation)
+        existing = await self._existing_owners(by_owner)
+        now = time.time()
+
+        for owner, owned in by_owner.items():
+            if owner not in existing:
+                for presentation in owned:
+                    await self._purge(presentation)
+                    self.orphans_deleted += 1
+                continue
+
+            if owner.startswith("guest_"):
+                for presentation in owned:
+                    if now - presentation.modified > self.guest_ttl:
+                        await self._purge(presentation)
+                        self.expired_deleted += 1
+                continue
+
+            if self.user_quota > 0:
+                await self._enforce_quota(owned)
+
+    async def _enforce_quota(self, owned: List[StoredPresentation]):
+        """Удалить самые старые презентации пользователя сверх квоты"""
+        usage = {}
+        for presentation in owned:
+            await self._throttle()
+            usage[presentation.presentation_id] = await self.files.get_presentation_usage(presentation)
+        total = sum(usage.values())
+        for presentation in sorted(owned, key=lambda item: item.modified):
+            if total <= self.user_quota:
+                break
+            await self._purge(presentation)
+            total -= usage[presentation.presentation_id]
+            self.over_quota_deleted += 1
+
+    async def _sweep_previews(self, shard: str):
+        await self._throttle()
+        freed = await self.previews.purge_expired(shard, self.preview_ttl)
+        self.previews_bytes_deleted += freed
+        self.bytes_reclaimed += freed
+
+    async def run_once(self) -> Dict[str, Any]:
+        """Обработать следующую пачку шардов и пачку каталогов старой структуры"""
+        if not await self._acquire_lock():
+            return {"skipped": True}
+        started = time.monotonic()
+        reclaimed_before = self.bytes_reclaimed
+        try:
+            await self._load_position()
+
+            # Владельцы, чьи каталоги остались в плоской структуре (до шардирования)
+            await self._throttle()
+            legacy_owners = await self.files.list_legacy_owners(after=self._legacy_after, limit=self.shards_per_run)
+            for owner in legacy_owners:
+                await self._throttle()
+                await self._sweep_presentations(await self.files.list_legacy_owner(owner))
+            self._legacy_after = legacy_owners[-1] if len(legacy_owners) == self.shards_per_run else ""
+
+            end = min(self._cursor + self.shards_per_run, async_fs.SHARD_COUNT)
+            for index in range(self._cursor, end):
+                await self._throttle()
+                shard = async_fs.shard_by_index(index)
+                await self._sweep_presentations(await self.files.list_shard(shard))
+                self.shards_scanned += 1
+                if index % (async_fs.SHARD_COUNT // 256) == 0:
+                    # Превью шардированы только по первому уровню - по разу на каждый
+                    await self._sweep_previews(shard.split("/")[0])
+
+            if end >= async_fs.SHARD_COUNT:
+                self.passes_completed += 1
+                end = 0
+            self._cursor = end
+            await self._save_position()
+        except Exception as e:
+            self.errors += 1
+            print(f"❌ Ошибка очистки хранилища: {e}")
+        finally:
+            await self._release_lock()
+
+        self.runs += 1
+        self.last_run_at = time.time()
+        self.last_run_duration = time.monotonic() - started
+        reclaimed = self.bytes_reclaimed - reclaimed_before
+        if reclaimed:
+            print(f"🧹 Очистка хранилища: освобождено {reclaimed} байт")
+        return {"skipped": False, "bytes_reclaimed": reclaimed, "cursor": self._cursor}
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            await self.run_once()
+
+    async def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._task = None
+        if self._redis is not None:
+            await self._redis.close()
+            self._redis = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "runs": self.runs,
+            "passes_completed": self.passes_completed,
+            "cursor": self._cursor,
+            "shards_total": async_fs.SHARD_COUNT,
+            "shards_scanned": self.shards_scanned,
+            "expired_deleted": self.expired_deleted,
+            "orphans_deleted": self.orphans_deleted,
+            "over_quota_deleted": self.over_quota_deleted,
+            "previews_bytes_deleted": self.previews_bytes_deleted,
+            "bytes_reclaimed": self.bytes_reclaimed,
+            "errors": self.errors,
+            "last_run_at": self.last_run_at,
+            "last_run_duration": round(self.last_run_duration, 3),
+        }
+
+
+# Глобальный экземпляр
+storage_sweeper = StorageSweeper()
@@ -0,0 +1,133 @@
+"""
+Template Cache - кэш разобранных шаблонов презентаций
+"""
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config.settings import get_settings
+from services.invalidation_bus import invalidation_bus
+from services.template_service import TemplateService
+from utils.html_renderer import CompiledTemplate, compile_template
+
+settings = get_settings()
+
+TEMPLATE_CHANNEL = "saydeck:templates:invalidate"
+
+
+@dataclass
+class CachedTemplate:
+    """Разобранный шаблон и версия, из которой он получен"""
+    public_id: str
+    version: Optional[str]
+    template: CompiledTemplate
+    loaded_at: float
+
+
+class TemplateCache:
+    """
+    In-process кэш шаблонов в разобранном виде (статические сегменты и слоты)
+
+    Запись привязана к (public_id, updated_at): при изменении или удалении
+    шаблона воркер сбрасывает запись и рассылает инвалидацию остальным
+    воркерам через Redis, поэтому повторный рендер не ходит в БД. TTL -
+    страховка на случай потерянного сообщения.
+    """
+
+    def __init__(self, ttl: int = None, max_entries: int = None):
+        self.ttl = ttl if ttl is not None else settings.TEMPLATE_CACHE_TTL
+        self.max_entries = max_entries or settings.TEMPLATE_CACHE_MAX_ENTRIES
+        self._entries: "OrderedDict[str, CachedTemplate]" = OrderedDict()
+
+        # Метрики
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+        invalidation_bus.subscribe(TEMPLATE_CHANNEL, self._on_invalidation)
+
+    def _get_fresh(self, public_id: str) -> Optional[CachedTemplate]:
+        entry = self._entries.get(public_id)
+        if entry is None:
+            return None
+        if self.ttl and time.monotonic() - entry.loaded_at > self.ttl:
+            del self._entries[public_id]
+            return None
+        self._entries.move_to_end(public_id)
+        return entry
+
+    def _store(self, entry: CachedTemplate):
+        self._entries[entry.public_id] = entry
+        self._entries.move_to_end(entry.public_id)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def get(self, template_id: str, session: AsyncSession) -> Optional[CompiledTemplate]:
+        """
+        Разобранный шаблон по ID
+
+        Встроенные шаблоны разбираются один раз и в БД не запрашиваются.
+        """
+        builtin = TemplateService.get_builtin_template(template_id)
+        if builtin:
+            return compile_template(builtin["html_content"])
+
+        entry = self._get_fresh(template_id)
+        if entry is not None:
+            self.hits += 1
+            return entry.template
+
+        self.misses += 1
+        source = await TemplateService.get_template_source(template_id, session)
+        if source is None:
+            return None
+        html_content, version = source
+        template = CompiledTemplate(html_content)
+        self._store(CachedTemplate(
+            public_id=template_id,
+            version=version,
+            template=template,
+            loaded_at=time.monotonic()
+        ))
+        return template
+
+    def invalidate_local(self, public_id: Optional[str] = None):
+        """Сбросить запись (или весь кэш) только в текущем воркере"""
+        if public_id is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(public_id, None)
+        self.invalidations += 1
+
+    async def invalidate(self, public_id: str, version: Optional[str] = None):
+        """Сбросить шаблон во всех воркерах"""
+        self.invalidate_local(public_id)
+        await invalidation_bus.publish(TEMPLATE_CHANNEL, public_id=public_id, version=version)
+
+    def _on_invalidation(self, payload: Dict[str, Any]):
+        if payload.get("reset"):
+            self.invalidate_local()
+            return
+        public_id = payload.get("public_id")
+        entry = self._entries.get(public_id)
+        # Запись уже загружена из новой версии - сбрасывать ее не нужно
+        if entry is not None and payload.get("version") and entry.version == payload["version"]:
+            return
+        self.invalidate_local(public_id)
+
+    def get_stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0,
+            "invalidations": self.invalidations,
+        }
+
+
+# Глобальный экземпляр кэша
+template_cache = TemplateCache()
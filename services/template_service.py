@@ -2,7 +2,7 @@
 Template Service - сервис для работы с шаблонами презентаций
 """
 import uuid
-from typing import List, Optional
+from typing import List, Optional, Tuple
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, delete
 from models.template import Template
@@ -15,6 +15,7 @@ from schemas.template import TemplateResponse, TemplateDetail, TemplateCreateRes
 BUILTIN_TEMPLATES = {
     "minimalism": {
         "id": "minimalism",
+        "stylesheet": "template-minimalism",
         "title": "Минимализм",
         "html_content": """
         <!DOCTYPE html>
@@ -22,12 +23,7 @@ BUILTIN_TEMPLATES = {
         <head>
             <meta charset=\"UTF-8\">
             <title>{{title}}</title>
-            <style>
-                body { background: #fff; color: #222; font-family: 'Segoe UI', Arial, sans-serif; margin: 0; padding: 40px; }
-                .slide { margin: 40px auto; max-width: 700px; background: #f9f9f9; border-radius: 12px; box-shadow: 0 2px 8px #eee; padding: 40px; }
-                h2 { border-bottom: 1px solid #eee; margin-bottom: 20px; }
-                .content { font-size: 1.2em; }
-            </style>
+            {{styles}}
         </head>
         <body>
             <h1 style=\"text-align:center;\">{{title}}</h1>
@@ -38,6 +34,7 @@ BUILTIN_TEMPLATES = {
     },
     "nature": {
         "id": "nature",
+        "stylesheet": "template-nature",
         "title": "Природа",
         "html_content": """
         <!DOCTYPE html>
@@ -45,12 +42,7 @@ BUILTIN_TEMPLATES = {
         <head>
             <meta charset=\"UTF-8\">
             <title>{{title}}</title>
-            <style>
-                body { background: linear-gradient(120deg, #a8e063 0%, #56ab2f 100%); color: #234; font-family: 'Segoe UI', Arial, sans-serif; margin: 0; padding: 40px; }
-                .slide { margin: 40px auto; max-width: 700px; background: rgba(255,255,255,0.85); border-radius: 16px; box-shadow: 0 4px 16px #b2f7ef; padding: 40px; }
-                h2 { color: #388e3c; border-bottom: 1px solid #b2f7ef; margin-bottom: 20px; }
-                .content { font-size: 1.2em; }
-            </style>
+            {{styles}}
         </head>
         <body>
             <h1 style=\"text-align:center; color:#388e3c;\">{{title}}</h1>
@@ -61,6 +53,7 @@ BUILTIN_TEMPLATES = {
     },
     "transport": {
         "id": "transport",
+        "stylesheet": "template-transport",
         "title": "Транспорт",
         "html_content": """
         <!DOCTYPE html>
@@ -68,12 +61,7 @@ BUILTIN_TEMPLATES = {
         <head>
             <meta charset=\"UTF-8\">
             <title>{{title}}</title>
-            <style>
-                body { background: #e0eafc; background: linear-gradient(120deg, #e0eafc 0%, #cfdef3 100%); color: #222; font-family: 'Segoe UI', Arial, sans-serif; margin: 0; padding: 40px; }
-                .slide { margin: 40px auto; max-width: 700px; background: #fff; border-radius: 16px; box-shadow: 0 4px 16px #b2b2b2; padding: 40px; border-left: 8px solid #1976d2; }
-                h2 { color: #1976d2; border-bottom: 1px solid #b2b2b2; margin-bottom: 20px; }
-                .content { font-size: 1.2em; }
-            </style>
+            {{styles}}
         </head>
         <body>
             <h1 style=\"text-align:center; color:#1976d2;\">{{title}}</h1>
@@ -84,6 +72,7 @@ BUILTIN_TEMPLATES = {
     },
     "it": {
         "id": "it",
+        "stylesheet": "template-it",
         "title": "IT Технологии",
         "html_content": """
         <!DOCTYPE html>
@@ -91,12 +80,7 @@ BUILTIN_TEMPLATES = {
         <head>
             <meta charset=\"UTF-8\">
             <title>{{title}}</title>
-            <style>
-                body { background: #232526; background: linear-gradient(120deg, #232526 0%, #414345 100%); color: #fff; font-family: 'Fira Mono', 'Consolas', monospace; margin: 0; padding: 40px; }
-                .slide { margin: 40px auto; max-width: 700px; background: #2c3e50; border-radius: 16px; box-shadow: 0 4px 16px #111; padding: 40px; border-left: 8px solid #00c3ff; }
-                h2 { color: #00c3ff; border-bottom: 1px solid #00c3ff; margin-bottom: 20px; }
-                .content { font-size: 1.2em; }
-            </style>
+            {{styles}}
         </head>
         <body>
             <h1 style=\"text-align:center; color:#00c3ff;\">{{title}}</h1>
@@ -107,6 +91,7 @@ BUILTIN_TEMPLATES = {
     },
     "abstract": {
         "id": "abstract",
+        "stylesheet": "template-abstract",
         "title": "Абстракция",
         "html_content": """
         <!DOCTYPE html>
@@ -114,12 +99,7 @@ BUILTIN_TEMPLATES = {
         <head>
             <meta charset=\"UTF-8\">
             <title>{{title}}</title>
-            <style>
-                body { background: linear-gradient(135deg, #f7971e 0%, #ffd200 100%); color: #333; font-family: 'Segoe UI', Arial, sans-serif; margin: 0; padding: 40px; }
-                .slide { margin: 40px auto; max-width: 700px; background: rgba(255,255,255,0.95); border-radius: 20px; box-shadow: 0 4px 24px #f7971e44; padding: 40px; border-left: 8px solid #ffd200; }
-                h2 { color: #f7971e; border-bottom: 1px solid #ffd200; margin-bottom: 20px; }
-                .content { font-size: 1.2em; }
-            </style>
+            {{styles}}
         </head>
         <body>
             <h1 style=\"text-align:center; color:#f7971e;\">{{title}}</h1>
@@ -244,6 +224,30 @@ class TemplateService:
         
         return template.html_content if template else None
     
+    @staticmethod
+    async def get_template_source(
+        public_id: str,
+        session: AsyncSession
+    ) -> Optional[Tuple[str, Optional[str]]]:
+        """
+        HTML шаблона и его версия для кэша разобранных шаблонов
+        
+        Версия - updated_at (или created_at, если шаблон не менялся)
+        """
+        
+        result = await session.execute(
+            select(Template.html_content, Template.updated_at, Template.created_at).where(
+                Template.public_id == public_id,
+                Template.is_public == True
+            )
+        )
+        row = result.first()
+        if not row or row.html_content is None:
+            return None
+        
+        changed_at = row.updated_at or row.created_at
+        return row.html_content, changed_at.isoformat() if changed_at else None
+    
     @staticmethod
     async def delete_template(
         public_id: str,
@@ -268,6 +272,10 @@ class TemplateService:
         )
         await session.commit()
         
+        # Сбрасываем разобранный шаблон во всех воркерах
+        from services.template_cache import template_cache
+        await template_cache.invalidate(public_id)
+        
         return TemplateDeleteResponse()
     
     @staticmethod
@@ -0,0 +1,364 @@
+"""
+Viewer Cache - кэш отрендеренных страниц публичного просмотра и буфер счетчика просмотров
+"""
+import asyncio
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional
+
+import redis.asyncio as redis
+from sqlalchemy import func, update
+
+from config.settings import get_settings
+from models.base import async_session
+from models.presentation import Presentation
+from services.invalidation_bus import invalidation_bus
+from utils.compression import compress_variants
+from utils.file_responses import etag_matches
+from utils.static_assets import ASSETS_VERSION
+
+settings = get_settings()
+
+VIEWER_CHANNEL = "saydeck:viewer:invalidate"
+VIEWER_KEY_PREFIX = "viewer:"
+
+# Меняется при изменении шаблона просмотра, чтобы сбросить ETag у клиентов
+VIEWER_RENDER_VERSION = "v2"
+
+# Сколько счетчиков сброса хранить в памяти; при переполнении сбрасываются все
+MAX_TRACKED_GENERATIONS = 10000
+
+# Поля записи в Redis: сама страница и ее сжатые варианты (body:br, body:gzip)
+BODY_FIELD = "body"
+PAGE_FIELDS = ("presentation_id", "etag", BODY_FIELD, f"{BODY_FIELD}:br", f"{BODY_FIELD}:gzip")
+
+# Запись страницы, только если с начала рендера ее не сбрасывали (поле gen не изменилось).
+# ARGV: gen, ttl, затем пары поле-значение
+SET_IF_CURRENT_SCRIPT = """
+if (redis.call('HGET', KEYS[1], 'gen') or '0') ~= ARGV[1] then
+    return 0
+end
+redis.call('HDEL', KEYS[1], %s)
+redis.call('HSET', KEYS[1], unpack(ARGV, 3))
+redis.call('EXPIRE', KEYS[1], ARGV[2])
+return 1
+""" % ", ".join(f"'{name}'" for name in PAGE_FIELDS)
+
+
+def content_version(title: Any, content: Any) -> str:
+    """Версия содержимого презентации для ключа кэша и ETag"""
+    payload = json.dumps({"title": title, "content": content}, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:32]
+
+
+def make_etag(version: str) -> str:
+    """
+    ETag страницы: рендер детерминирован по версии содержимого, шаблона и стилей
+
+    Слабый, потому что один и тот же ETag отдается для несжатой страницы
+    и ее сжатых вариантов (и в ответах 200, и в 304).
+    """
+    return f'W/"{VIEWER_RENDER_VERSION}-{ASSETS_VERSION}-{version}"'
+
+
+@dataclass
+class ViewerPage:
+    """Отрендеренная страница просмотра"""
+    public_id: str
+    presentation_id: int
+    etag: str
+    body: bytes
+    stored_at: float
+    # Сжатые при сохранении варианты: кодировка -> байты
+    variants: Dict[str, bytes] = field(default_factory=dict)
+
+    @property
+    def size(self) -> int:
+        return len(self.body) + sum(len(data) for data in self.variants.values())
+
+
+@dataclass(frozen=True)
+class RenderToken:
+    """
+    Версия записи кэша на момент начала рендера
+
+    Если страницу сбросили, пока она рендерилась (редактирование, снятие
+    публикации), версия меняется, и устаревший рендер в кэш не попадает.
+    """
+    public_id: str
+    epoch: int
+    local: int
+    shared: Optional[str]  # поле gen записи в Redis; None - Redis был недоступен
+
+
+class ViewerCache:
+    """
+    Двухуровневый кэш страниц просмотра: in-process LRU и общий Redis
+
+    Ключ - public_id, в записи хранится ETag (версия содержимого). При
+    редактировании, удалении или снятии публикации запись сбрасывается во
+    всех воркерах, поэтому попадание в кэш не требует запроса к БД.
+    Каждый сброс увеличивает счетчик записи (локально и поле gen в Redis);
+    страница сохраняется, только если счетчик не изменился с начала рендера.
+    Сжатые варианты готовятся один раз при сохранении, а не на каждый ответ.
+    """
+
+    def __init__(self):
+        self.ttl = settings.VIEWER_CACHE_TTL
+        self.max_bytes = settings.VIEWER_CACHE_MAX_BYTES
+        self.max_page_bytes = settings.VIEWER_CACHE_MAX_PAGE_BYTES
+        self._pages: "OrderedDict[str, ViewerPage]" = OrderedDict()
+        self._bytes = 0
+        self._redis: Optional[redis.Redis] = None
+        self._generations: Dict[str, int] = {}
+        self._epoch = 0
+
+        # Метрики
+        self.local_hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.stale_renders = 0
+
+        invalidation_bus.subscribe(VIEWER_CHANNEL, self._on_invalidation)
+
+    def _get_redis(self) -> redis.Redis:
+        if self._redis is None:
+            self._redis = redis.from_url(settings.REDIS_URL)
+        return self._redis
+
+    def _store_local(self, page: ViewerPage):
+        self._drop_local(page.public_id)
+        self._pages[page.public_id] = page
+        self._bytes += page.size
+        while self._bytes > self.max_bytes and self._pages:
+            _, evicted = self._pages.popitem(last=False)
+            self._bytes -= evicted.size
+
+    def _drop_local(self, public_id: str):
+        page = self._pages.pop(public_id, None)
+        if page is not None:
+            self._bytes -= page.size
+
+    async def get(self, public_id: str) -> Optional[ViewerPage]:
+        """Страница из кэша: сначала in-process, затем Redis"""
+        page = self._pages.get(public_id)
+        if page is not None:
+            if time.monotonic() - page.stored_at <= self.ttl:
+                self._pages.move_to_end(public_id)
+                self.local_hits += 1
+                return page
+            self._drop_local(public_id)
+
+        try:
+            data = await self._get_redis().hgetall(f"{VIEWER_KEY_PREFIX}{public_id}")
+        except Exception as e:
+            print(f"⚠️ Кэш просмотра в Redis недоступен: {e}")
+            data = None
+
+        if data and BODY_FIELD.encode() in data:
+            prefix = f"{BODY_FIELD}:".encode()
+            page = ViewerPage(
+                public_id=public_id,
+                presentation_id=int(data[b"presentation_id"]),
+                etag=data[b"etag"].decode(),
+                body=data[BODY_FIELD.encode()],
+                stored_at=time.monotonic(),
+                variants={
+                    name[len(prefix):].decode(): value
+                    for name, value in data.items() if name.startswith(prefix)
+                }
+            )
+            self._store_local(page)
+            self.shared_hits += 1
+            return page
+
+        self.misses += 1
+        return None
+
+    async def render_token(self, public_id: str) -> RenderToken:
+        """Версия записи перед рендером (брать до чтения презентации из БД)"""
+        try:
+            shared = await self._get_redis().hget(f"{VIEWER_KEY_PREFIX}{public_id}", "gen")
+            shared = shared.decode() if shared is not None else "0"
+        except Exception as e:
+            print(f"⚠️ Кэш просмотра в Redis недоступен: {e}")
+            shared = None
+        return RenderToken(public_id, self._epoch, self._generations.get(public_id, 0), shared)
+
+    def _is_current(self, token: RenderToken) -> bool:
+        return token.epoch == self._epoch and token.local == self._generations.get(token.public_id, 0)
+
+    async def set(self, token: RenderToken, presentation_id: int, etag: str, body: bytes):
+        """Сохранить отрендеренную страницу в оба уровня кэша, если ее не сбросили во время рендера"""
+        if len(body) > self.max_page_bytes:
+            return
+        variants = {}
+        if len(body) >= settings.COMPRESSION_MIN_SIZE:
+            variants = await asyncio.to_thread(
+                compress_variants, body, settings.PRECOMPRESS_GZIP_LEVEL, settings.PRECOMPRESS_BROTLI_QUALITY
+            )
+        if not self._is_current(token):
+            self.stale_renders += 1
+            return
+        public_id = token.public_id
+        self._store_local(ViewerPage(public_id, presentation_id, etag, body, time.monotonic(), variants))
+        if token.shared is None:
+            return
+        fields = ["presentation_id", presentation_id, "etag", etag, BODY_FIELD, body]
+        for encoding, data in variants.items():
+            fields += [f"{BODY_FIELD}:{encoding}", data]
+        try:
+            stored = await self._get_redis().eval(
+                SET_IF_CURRENT_SCRIPT, 1, f"{VIEWER_KEY_PREFIX}{public_id}",
+                token.shared, self.ttl, *fields
+            )
+        except Exception as e:
+            print(f"⚠️ Не удалось сохранить страницу просмотра в Redis: {e}")
+            return
+        if not stored:
+            # Сброс пришел из другого воркера раньше, чем сообщение в шине
+            self._drop_local(public_id)
+            self.stale_renders += 1
+
+    async def cache_stream(self, token: RenderToken, presentation_id: int, etag: str,
+                           chunks: Iterable[str]) -> AsyncIterator[bytes]:
+        """
+        Отдает страницу потоком и сохраняет ее в кэш после последней порции
+
+        Первый просмотр сохраняет потоковую отдачу, последующие берут готовые байты.
+        """
+        parts: List[bytes] = []
+        size = 0
+        for chunk in chunks:
+            data = chunk.encode("utf-8")
+            if size <= self.max_page_bytes:
+                parts.append(data)
+                size += len(data)
+            yield data
+        if size <= self.max_page_bytes:
+            await self.set(token, presentation_id, etag, b"".join(parts))
+
+    def invalidate_local(self, public_id: Optional[str] = None):
+        """Сбросить страницу (или весь кэш) в текущем воркере"""
+        if public_id is None or len(self._generations) >= MAX_TRACKED_GENERATIONS:
+            # Новая эпоха делает устаревшими все начатые рендеры
+            self._epoch += 1
+            self._generations.clear()
+        if public_id is None:
+            self._pages.clear()
+            self._bytes = 0
+        else:
+            self._generations[public_id] = self._generations.get(public_id, 0) + 1
+            self._drop_local(public_id)
+        self.invalidations += 1
+
+    async def invalidate(self, public_id: Optional[str]):
+        """Сбросить страницу во всех воркерах и в Redis"""
+        if not public_id:
+            return
+        self.invalidate_local(public_id)
+        key = f"{VIEWER_KEY_PREFIX}{public_id}"
+        try:
+            # Страница удаляется, а счетчик gen остается - по нему set отбросит начатые рендеры
+            async with self._get_redis().pipeline(transaction=True) as pipe:
+                pipe.hincrby(key, "gen", 1)
+                pipe.hdel(key, *PAGE_FIELDS)
+                pipe.expire(key, self.ttl)
+                await pipe.execute()
+        except Exception as e:
+            print(f"⚠️ Не удалось удалить страницу просмотра из Redis: {e}")
+        await invalidation_bus.publish(VIEWER_CHANNEL, public_id=public_id)
+
+    def _on_invalidation(self, payload: Dict[str, Any]):
+        self.invalidate_local(None if payload.get("reset") else payload.get("public_id"))
+
+    async def close(self):
+        if self._redis is not None:
+            await self._redis.close()
+            self._redis = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        total = self.local_hits + self.shared_hits + self.misses
+        return {
+            "pages": len(self._pages),
+            "bytes": self._bytes,
+            "local_hits": self.local_hits,
+            "shared_hits": self.shared_hits,
+            "misses": self.misses,
+            "hit_rate": round((self.local_hits + self.shared_hits) / total, 3) if total else 0.0,
+            "invalidations": self.invalidations,
+            "stale_renders": self.stale_renders,
+        }
+
+
+class ViewCounter:
+    """
+    Буфер счетчика просмотров
+
+    Просмотры копятся в памяти и периодически записываются одним UPDATE
+    на презентацию, вместо записи в БД на каждый просмотр.
+    """
+
+    def __init__(self, flush_interval: float = None):
+        self.flush_interval = flush_interval or settings.VIEWS_FLUSH_INTERVAL
+        self._pending: Dict[int, int] = {}
+        self._task: Optional[asyncio.Task] = None
+        self.flushed = 0
+
+    def record(self, presentation_id: int):
+        self._pending[presentation_id] = self._pending.get(presentation_id, 0) + 1
+
+    async def flush(self):
+        """Записать накопленные просмотры в БД"""
+        if not self._pending:
+            return
+        pending, self._pending = self._pending, {}
+        try:
+            async with async_session() as session:
+                for presentation_id, count in pending.items():
+                    await session.execute(
+                        update(Presentation)
+                        .where(Presentation.id == presentation_id)
+                        .values(views_count=func.coalesce(Presentation.views_count, 0) + count)
+                    )
+                await session.commit()
+            self.flushed += sum(pending.values())
+        except Exception as e:
+            print(f"❌ Ошибка записи счетчика просмотров: {e}")
+            # Возвращаем просмотры в буфер, чтобы не потерять их
+            for presentation_id, count in pending.items():
+                self._pending[presentation_id] = self._pending.get(presentation_id, 0) + count
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    async def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._task = None
+        await self.flush()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "pending": sum(self._pending.values()),
+            "flushed": self.flushed,
+        }
+
+
+# Глобальные экземпляры
+viewer_cache = ViewerCache()
+view_counter = ViewCounter()
@@ -0,0 +1,167 @@
+"""
+Тесты подсчета ссылок и удаления блобов при гонке задач с общим хранилищем
+"""
+import asyncio
+
+import pytest
+
+from services import blob_store
+from services.blob_store import BlobStore, content_digest
+from services.presentation_files import FINAL, RAW, PresentationFilesService
+from services.storage_backends import LocalStorageBackend
+
+DATA = b"<html><body>slide</body></html>"
+
+
+class PausingBackend(LocalStorageBackend):
+    """Локальное хранилище, которое один раз останавливается после выбранной операции"""
+
+    def __init__(self, base_path):
+        super().__init__(base_path)
+        self.pause_after = None
+        self.paused = asyncio.Event()
+        self.resume = asyncio.Event()
+
+    async def _checkpoint(self, operation: str, key: str):
+        if self.pause_after is not None and self.pause_after(operation, key):
+            self.pause_after = None
+            self.paused.set()
+            await self.resume.wait()
+
+    async def put(self, key, data):
+        await super().put(key, data)
+        await self._checkpoint("put", key)
+
+    async def delete(self, key):
+        result = await super().delete(key)
+        await self._checkpoint("delete", key)
+        return result
+
+    async def list(self, prefix):
+        objects = await super().list(prefix)
+        await self._checkpoint("list", prefix)
+        return objects
+
+
+@pytest.fixture(autouse=True)
+def fast_delete_poll(monkeypatch):
+    monkeypatch.setattr(blob_store, "DELETE_MARKER_POLL", 0.01)
+
+
+def _is_refs_list(operation, key):
+    return operation == "list" and key.startswith(blob_store.REFS_PREFIX)
+
+
+def _is_delete_marker(operation, key):
+    return operation == "put" and key.endswith(".deleting")
+
+
+def _is_second_refs_list():
+    """Повторная проверка ссылок после маркера: дальше блоб удаляется"""
+    lists = []
+
+    def predicate(operation, key):
+        if _is_refs_list(operation, key):
+            lists.append(key)
+        return len(lists) == 2
+    return predicate
+
+
+async def _race(tmp_path, pause_after):
+    """
+    Задача A освобождает последнюю ссылку на блоб и останавливается в pause_after,
+    задача B с тем же хранилищем в это время сохраняет тот же документ
+    """
+    releasing_backend = PausingBackend(tmp_path)
+    releasing, saving = BlobStore(releasing_backend), BlobStore(LocalStorageBackend(tmp_path))
+    digest = await releasing.put(DATA, "owner.first")
+
+    releasing_backend.pause_after = pause_after
+    release = asyncio.create_task(releasing.release(digest, "owner.first"))
+    await asyncio.wait_for(releasing_backend.paused.wait(), timeout=5)
+
+    put = asyncio.create_task(saving.put(DATA, "owner.second"))
+    await asyncio.sleep(0.05)
+    releasing_backend.resume.set()
+    assert await asyncio.wait_for(put, timeout=5) == digest
+    await asyncio.wait_for(release, timeout=5)
+
+    assert await saving.get(digest) == DATA
+    assert await saving.ref_count(digest) == 1
+    assert not await saving.backend.exists(saving._delete_marker_key(digest))
+
+
+@pytest.mark.parametrize("pause_after", [
+    lambda: _is_refs_list,
+    lambda: _is_delete_marker,
+    _is_second_refs_list,
+])
+def test_put_racing_release_keeps_blob(tmp_path, pause_after):
+    asyncio.run(_race(tmp_path, pause_after()))
+
+
+def test_release_frees_blob_without_refs(tmp_path):
+    async def scenario():
+        blobs = BlobStore(LocalStorageBackend(tmp_path))
+        digest = await blobs.put(DATA, "owner.first", compress=True)
+        await blobs.put(DATA, "owner.second")
+
+        assert await blobs.release(digest, "owner.first") == 0
+        assert await blobs.get(digest) == DATA
+
+        assert await blobs.release(digest, "owner.second") > len(DATA)
+        assert await blobs.get(digest) is None
+        assert await blobs.size(digest, "gzip") is None
+
+    asyncio.run(scenario())
+
+
+def test_raw_equal_to_final_shares_one_ref(tmp_path):
+    async def scenario():
+        service = PresentationFilesService(LocalStorageBackend(tmp_path))
+        html = DATA.decode("utf-8")
+        digest = content_digest(DATA)
+
+        await service.save_raw_html("user", "pres", html)
+        await service.save_final_html("user", "pres", html)
+        assert await service.blobs.ref_count(digest) == 1
+
+        # Новый raw не освобождает блоб, на который еще ссылается final
+        await service.save_raw_html("user", "pres", "<html>draft</html>")
+        manifest = await service._read_manifest("user", "pres")
+        assert manifest[FINAL] == digest and manifest[RAW] != digest
+        assert await service.blobs.get(digest) == DATA
+
+        # Замена final освобождает его
+        await service.save_final_html("user", "pres", "<html>draft</html>")
+        assert await service.blobs.get(digest) is None
+
+        await service.purge_presentation("user", "pres")
+        assert await service.blobs.ref_count(manifest[RAW]) == 0
+        assert await service.blobs.get(manifest[RAW]) is None
+
+    asyncio.run(scenario())
+
+
+def test_documents_served_precompressed(tmp_path):
+    async def scenario():
+        service = PresentationFilesService(LocalStorageBackend(tmp_path))
+        await service.save_raw_html("user", "pres", DATA.decode("utf-8"))
+        raw = await service.get_document_file("user", "pres", RAW, accept_encoding="gzip")
+        assert raw.encoding == "gzip"
+        assert service.documents_precompressed == 0
+
+        # Старый файл без вариантов сжимается один раз, при первом запросе
+        legacy = tmp_path / "owner" / "old" / "final.html"
+        legacy.parent.mkdir(parents=True)
+        legacy.write_bytes(DATA)
+        first = await service.get_document_file("owner", "old", FINAL, accept_encoding="gzip")
+        second = await service.get_document_file("owner", "old", FINAL, accept_encoding="gzip")
+        assert first.encoding == second.encoding == "gzip"
+        assert first.etag == second.etag
+        assert service.documents_precompressed == 1
+
+        identity = await service.get_document_file("owner", "old", FINAL)
+        assert identity.encoding is None and identity.path == legacy
+
+    asyncio.run(scenario())
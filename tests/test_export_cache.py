@@ -0,0 +1,47 @@
+"""
+Тесты LRU кэша экспорта, общего для нескольких задач
+"""
+import asyncio
+import os
+import time
+
+from services.export_cache import ExportCache
+from services.storage_backends import LocalStorageBackend
+
+DATA = b"x" * 100
+
+
+def test_trim_uses_shared_recency(tmp_path):
+    async def scenario():
+        backend = LocalStorageBackend(tmp_path)
+        # Две задачи ECS с общим хранилищем
+        first = ExportCache(backend, max_bytes=250, touch_interval=0)
+        second = ExportCache(backend, max_bytes=250, touch_interval=0)
+
+        await first.put("pptx", {"slides": 1}, DATA)
+        await first.put("pptx", {"slides": 2}, DATA)
+        old = time.time() - 60
+        for path in tmp_path.rglob("*.pptx"):
+            os.utime(path, (old, old))
+
+        # Попадание во второй задаче делает файл самым свежим для всех
+        assert await second.get("pptx", {"slides": 1}) is not None
+
+        # Запись в первой задаче вытесняет давно не использовавшийся файл,
+        # хотя первая задача о попадании ничего не знает
+        await first.put("pptx", {"slides": 3}, DATA)
+        assert await first.get("pptx", {"slides": 2}) is None
+        assert await first.get("pptx", {"slides": 1}) is not None
+        assert await first.get("pptx", {"slides": 3}) is not None
+        assert first.get_stats()["bytes"] == 200 and first.evictions == 1
+
+    asyncio.run(scenario())
+
+
+def test_oversized_file_is_kept(tmp_path):
+    async def scenario():
+        cache = ExportCache(LocalStorageBackend(tmp_path), max_bytes=50)
+        artifact = await cache.put("pptx", {"slides": 1}, DATA)
+        assert artifact is not None and artifact.stat.st_size == len(DATA)
+
+    asyncio.run(scenario())
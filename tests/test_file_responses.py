@@ -0,0 +1,122 @@
+"""
+Тесты условных запросов и Range при отдаче сохраненных файлов
+"""
+import asyncio
+import os
+from types import SimpleNamespace
+
+import pytest
+from fastapi import Request
+
+from utils.file_responses import conditional_file_response, etag_matches, parse_range
+
+BODY = b"0123456789" * 10
+ETAG = '"v1"'
+
+
+def _send_request(path, headers):
+    """Ответ conditional_file_response на GET с заголовками headers, прогнанный через ASGI"""
+    scope = {
+        "type": "http",
+        "method": "GET",
+        "path": "/file",
+        "headers": [(name.lower().encode(), value.encode()) for name, value in headers.items()],
+    }
+    response = conditional_file_response(Request(scope), path, os.stat(path), ETAG)
+    messages = []
+
+    async def receive():
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        messages.append(message)
+
+    asyncio.run(response(scope, receive, send))
+    start = messages[0]
+    return SimpleNamespace(
+        status_code=start["status"],
+        headers={name.decode(): value.decode() for name, value in start["headers"]},
+        content=b"".join(message.get("body", b"") for message in messages[1:]),
+    )
+
+
+@pytest.fixture
+def client(tmp_path):
+    path = tmp_path / "final.html"
+    path.write_bytes(BODY)
+    return SimpleNamespace(get=lambda url, headers=None: _send_request(path, headers or {}))
+
+
+@pytest.mark.parametrize("header, expected", [
+    (None, None),
+    ("bytes=0-9", (0, 9)),
+    ("bytes=90-", (90, 99)),
+    ("bytes=-5", (95, 99)),
+    ("bytes=-500", (0, 99)),
+    ("bytes=95-500", (95, 99)),
+    ("bytes=0-1,5-6", None),
+    ("items=0-9", None),
+])
+def test_parse_range(header, expected):
+    assert parse_range(header, len(BODY)) == expected
+
+
+@pytest.mark.parametrize("header", ["bytes=100-", "bytes=10-5", "bytes=-0"])
+def test_parse_range_unsatisfiable(header):
+    with pytest.raises(ValueError):
+        parse_range(header, len(BODY))
+
+
+def test_etag_matches_weak_and_lists():
+    assert etag_matches('"v0", W/"v1"', ETAG)
+    assert etag_matches("*", ETAG)
+    assert not etag_matches('"v2"', ETAG)
+    assert not etag_matches(None, ETAG)
+
+
+def test_full_response(client):
+    response = client.get("/file")
+    assert response.status_code == 200
+    assert response.content == BODY
+    assert response.headers["etag"] == ETAG
+    assert response.headers["accept-ranges"] == "bytes"
+
+
+def test_not_modified_by_etag(client):
+    response = client.get("/file", headers={"If-None-Match": ETAG})
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["etag"] == ETAG
+
+
+def test_not_modified_by_date(client):
+    last_modified = client.get("/file").headers["last-modified"]
+    response = client.get("/file", headers={"If-Modified-Since": last_modified})
+    assert response.status_code == 304
+
+    # If-None-Match важнее даты
+    response = client.get("/file", headers={"If-Modified-Since": last_modified, "If-None-Match": '"v0"'})
+    assert response.status_code == 200
+
+
+def test_partial_content(client):
+    response = client.get("/file", headers={"Range": "bytes=10-19"})
+    assert response.status_code == 206
+    assert response.content == BODY[10:20]
+    assert response.headers["content-range"] == f"bytes 10-19/{len(BODY)}"
+    assert response.headers["content-length"] == "10"
+
+
+def test_if_range_mismatch_returns_full_file(client):
+    response = client.get("/file", headers={"Range": "bytes=10-19", "If-Range": '"v0"'})
+    assert response.status_code == 200
+    assert response.content == BODY
+
+    response = client.get("/file", headers={"Range": "bytes=10-19", "If-Range": ETAG})
+    assert response.status_code == 206
+
+
+def test_range_not_satisfiable(client):
+    response = client.get("/file", headers={"Range": f"bytes={len(BODY)}-"})
+    assert response.status_code == 416
+    assert response.headers["content-range"] == f"bytes */{len(BODY)}"
@@ -0,0 +1,55 @@
+"""
+Тесты подстановки заголовков слайдов в HTML шаблоны
+"""
+from types import SimpleNamespace
+
+from utils.html_templates import (
+    render_enhanced_preview,
+    render_modern_presentation,
+    render_public_viewer,
+    render_with_template,
+)
+
+# Заголовки от модели приходят в разметке
+SLIDES = [{"title": "<h1>Введение &amp; цели</h1>", "content": "<p>Текст</p>"}]
+
+
+def _assert_clean_title(page: str):
+    assert "&lt;h1&gt;" not in page
+    assert "Введение &amp; цели" in page
+
+
+def test_modern_presentation_strips_title_tags():
+    page = render_modern_presentation({"title": "<h1>Тема</h1>", "slides": SLIDES})
+    _assert_clean_title(page)
+    assert "<h2>Введение &amp; цели</h2>" in page
+    assert "<p>Текст</p>" in page
+
+
+def test_public_viewer_strips_title_tags():
+    page = render_public_viewer("<h1>Тема</h1>", SLIDES, "public-id")
+    _assert_clean_title(page)
+    assert "🎤 Тема</h1>" in page
+
+
+def test_template_slides_strip_title_tags():
+    page = render_with_template("<title>{{title}}</title>{{slides}}", "Тема", SLIDES)
+    _assert_clean_title(page)
+
+
+def test_template_page_title_strips_tags():
+    page = render_with_template("<title>{{title}}</title><h1>{{title}}</h1>", "<h1>Тема &amp; цели</h1>", [])
+    assert page.startswith("<title>Тема &amp; цели</title><h1>Тема &amp; цели</h1>")
+
+
+def test_enhanced_preview_strips_title_tags():
+    slide = SimpleNamespace(title=SLIDES[0]["title"], content="Текст", image=None, image_alt="")
+    page = render_enhanced_preview("Тема", [slide])
+    _assert_clean_title(page)
+
+
+def test_title_text_is_still_escaped():
+    slides = [{"title": "<h1>&lt;img src=x onerror=alert(1)&gt;</h1>", "content": ""}]
+    page = render_modern_presentation({"title": "Тема", "slides": slides})
+    assert "<img src=x" not in page
+    assert "&lt;img src=x onerror=alert(1)&gt;" in page
@@ -0,0 +1,89 @@
+"""
+Тесты объединения одновременных вызовов (SingleFlight)
+"""
+import asyncio
+
+import pytest
+
+from utils.single_flight import SingleFlight
+
+
+def test_waiters_share_leader_result():
+    async def scenario():
+        flight = SingleFlight()
+        calls = 0
+
+        async def work():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            return calls
+
+        results = await asyncio.gather(*(flight.run("key", work) for _ in range(5)))
+        assert results == [1] * 5
+        assert len(flight) == 0
+
+    asyncio.run(scenario())
+
+
+def test_leader_error_reaches_waiters():
+    async def scenario():
+        flight = SingleFlight()
+
+        async def work():
+            await asyncio.sleep(0.01)
+            raise RuntimeError("render failed")
+
+        results = await asyncio.gather(*(flight.run("key", work) for _ in range(3)), return_exceptions=True)
+        assert all(isinstance(result, RuntimeError) for result in results)
+        assert len(flight) == 0
+
+    asyncio.run(scenario())
+
+
+def test_cancelled_leader_hands_off_to_waiter():
+    async def scenario():
+        flight = SingleFlight()
+        started = []
+
+        async def work():
+            started.append(asyncio.current_task())
+            await asyncio.sleep(0.05)
+            return len(started)
+
+        leader = asyncio.create_task(flight.run("key", work))
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(flight.run("key", work))
+        await asyncio.sleep(0)
+
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+
+        # Ожидающий повторил работу сам, а не получил отмену ведущего
+        assert await asyncio.wait_for(waiter, timeout=1) == 2
+        assert started[1] is waiter
+        assert len(flight) == 0
+
+    asyncio.run(scenario())
+
+
+def test_cancelled_waiter_does_not_affect_leader():
+    async def scenario():
+        flight = SingleFlight()
+
+        async def work():
+            await asyncio.sleep(0.05)
+            return "page"
+
+        leader = asyncio.create_task(flight.run("key", work))
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(flight.run("key", work))
+        await asyncio.sleep(0)
+
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        assert await leader == "page"
+
+    asyncio.run(scenario())
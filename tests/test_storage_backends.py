@@ -0,0 +1,30 @@
+"""
+Тесты постраничного обхода каталогов старой плоской структуры
+"""
+import asyncio
+
+from services.presentation_files import PresentationFilesService
+from services.storage_backends import LocalStorageBackend
+
+OWNERS = ["guest_a", "guest_b", "user_1", "user_1-x", "user_10", "user_2"]
+
+
+def test_legacy_owners_paged_from_cursor(tmp_path):
+    for name in [*OWNERS, "ab", "blobs", "refs"]:
+        (tmp_path / name / "pres").mkdir(parents=True)
+    (tmp_path / "user_3").write_bytes(b"")  # файл, а не каталог владельца
+
+    async def scenario():
+        service = PresentationFilesService(LocalStorageBackend(tmp_path))
+        assert await service.list_legacy_owners() == ["guest_a", "guest_b", "user_1-x", "user_1", "user_10", "user_2"]
+
+        pages, after = [], ""
+        while True:
+            page = await service.list_legacy_owners(after=after, limit=4)
+            pages.append(page)
+            if len(page) < 4:
+                break
+            after = page[-1]
+        assert pages == [["guest_a", "guest_b", "user_1-x", "user_1"], ["user_10", "user_2"]]
+
+    asyncio.run(scenario())
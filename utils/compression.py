@@ -0,0 +1,241 @@
+"""
+Compression - сжатие HTML/JSON ответов (gzip/brotli) и предварительно сжатые варианты файлов
+"""
+import gzip
+import zlib
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+from fastapi.responses import FileResponse
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:  # brotli - необязательная зависимость
+    brotli = None
+
+# Типы содержимого, которые имеет смысл сжимать
+COMPRESSIBLE_TYPES = (
+    "text/html",
+    "text/css",
+    "text/plain",
+    "text/javascript",
+    "application/json",
+    "application/javascript",
+    "image/svg+xml",
+)
+
+# Расширения файлов предварительно сжатых вариантов
+ENCODING_SUFFIXES: Dict[str, str] = {
+    "br": ".br",
+    "gzip": ".gz",
+}
+
+
+def available_encodings() -> List[str]:
+    """Поддерживаемые кодировки в порядке предпочтения"""
+    return ["br", "gzip"] if brotli is not None else ["gzip"]
+
+
+def choose_encoding(accept_encoding: Optional[str], available: Sequence[str]) -> Optional[str]:
+    """
+    Выбор кодировки по заголовку Accept-Encoding
+
+    Учитываются q-значения; при равном q предпочтение по порядку available.
+    Returns:
+        Кодировка или None, если подходит только identity
+    """
+    if not accept_encoding:
+        return None
+
+    weights: Dict[str, float] = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        weights[name] = q
+
+    best, best_q = None, 0.0
+    for encoding in available:
+        q = weights.get(encoding, weights.get("*", 0.0))
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+def compress_bytes(data: bytes, encoding: str, gzip_level: int = 9, brotli_quality: int = 11) -> bytes:
+    """Сжатие блока данных целиком"""
+    if encoding == "br":
+        return brotli.compress(data, quality=brotli_quality)
+    if encoding == "gzip":
+        return gzip.compress(data, compresslevel=gzip_level, mtime=0)
+    raise ValueError(f"Unsupported encoding: {encoding}")
+
+
+def compress_variants(data: bytes, gzip_level: int = 9, brotli_quality: int = 11) -> Dict[str, bytes]:
+    """Все предварительно сжатые варианты данных"""
+    return {
+        encoding: compress_bytes(data, encoding, gzip_level, brotli_quality)
+        for encoding in available_encodings()
+    }
+
+
+def precompressed_file_response(path: Path, encoding: Optional[str],
+                                media_type: str = "text/html; charset=utf-8",
+                                headers: Optional[Dict[str, str]] = None) -> FileResponse:
+    """Ответ с файлом (или его сжатым вариантом) и нужными заголовками"""
+    response_headers = {"Vary": "Accept-Encoding", **(headers or {})}
+    if encoding:
+        response_headers["Content-Encoding"] = encoding
+    return FileResponse(path, media_type=media_type, headers=response_headers)
+
+
+class _StreamCompressor:
+    """Потоковый компрессор: каждая порция сбрасывается сразу (не ломает стриминг)"""
+
+    def __init__(self, encoding: str, gzip_level: int, brotli_quality: int):
+        self.encoding = encoding
+        if encoding == "br":
+            self._compressor = brotli.Compressor(quality=brotli_quality)
+        else:
+            self._compressor = zlib.compressobj(gzip_level, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes) -> bytes:
+        if self.encoding == "br":
+            return self._compressor.process(data) + self._compressor.flush()
+        return self._compressor.compress(data) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        if self.encoding == "br":
+            return self._compressor.finish()
+        return self._compressor.flush()
+
+
+class CompressionMiddleware:
+    """
+    Сжатие динамических ответов (HTML/JSON и т.п.) gzip или brotli
+
+    Ответы, у которых уже есть Content-Encoding (предварительно сжатые
+    файлы), несжимаемые типы и ответы меньше minimum_size отдаются как есть.
+    Потоковые ответы сжимаются порциями без буферизации всего тела.
+    """
+
+    def __init__(self, app: ASGIApp, minimum_size: int = 1024,
+                 gzip_level: int = 6, brotli_quality: int = 5):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = choose_encoding(Headers(scope=scope).get("accept-encoding"), available_encodings())
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        responder = _CompressionResponder(self, encoding, send)
+        await self.app(scope, receive, responder.send)
+
+
+class _CompressionResponder:
+    """Перехватывает сообщения ответа одного запроса и сжимает тело"""
+
+    def __init__(self, middleware: CompressionMiddleware, encoding: str, send: Send):
+        self.middleware = middleware
+        self.encoding = encoding
+        self._send = send
+        self._start: Optional[Message] = None
+        self._compressor: Optional[_StreamCompressor] = None
+        self._passthrough = False
+
+    @staticmethod
+    def _weaken_etag(headers: MutableHeaders):
+        """
+        Сильный ETag -> слабый
+
+        Клиенту, принимающему сжатие, такой ресурс отдается сжатым на лету,
+        а сжатое представление побайтно отличается от исходного. Слабый ETag
+        ставится и в 200, и в 304, чтобы у ресурса был один валидатор.
+        """
+        etag = headers.get("etag")
+        if etag and not etag.startswith("W/"):
+            headers["ETag"] = f"W/{etag}"
+
+    @staticmethod
+    def _varies_by_encoding(headers: MutableHeaders) -> bool:
+        vary = [value.strip().lower() for value in headers.get("vary", "").split(",")]
+        return "accept-encoding" in vary and "content-encoding" not in headers
+
+    def _is_compressible(self, headers: MutableHeaders) -> bool:
+        # Уже сжатые ответы и части файлов (206) отдаются как есть
+        if "content-encoding" in headers or "content-range" in headers:
+            return False
+        content_type = headers.get("content-type", "").split(";")[0].strip().lower()
+        return content_type in COMPRESSIBLE_TYPES
+
+    async def send(self, message: Message):
+        if message["type"] == "http.response.start":
+            self._start = message
+            status = message.get("status", 200)
+            headers = MutableHeaders(raw=message["headers"])
+            if status == 304 and self._varies_by_encoding(headers):
+                # 200 этого ресурса этому клиенту был бы сжат на лету
+                self._weaken_etag(headers)
+            if status < 200 or status in (204, 206, 304) or not self._is_compressible(headers):
+                self._passthrough = True
+                await self._send(message)
+            return
+
+        if message["type"] != "http.response.body" or self._passthrough:
+            await self._send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if self._compressor is None:
+            headers = MutableHeaders(raw=self._start["headers"])
+            if not more_body and len(body) < self.middleware.minimum_size:
+                # Маленький ответ целиком - сжатие не окупается
+                self._passthrough = True
+                if self._varies_by_encoding(headers):
+                    self._weaken_etag(headers)
+                await self._send(self._start)
+                await self._send(message)
+                return
+
+            self._compressor = _StreamCompressor(
+                self.encoding, self.middleware.gzip_level, self.middleware.brotli_quality
+            )
+            headers["Content-Encoding"] = self.encoding
+            headers.add_vary_header("Accept-Encoding")
+            self._weaken_etag(headers)
+            if not more_body:
+                compressed = self._compressor.compress(body) + self._compressor.finish()
+                headers["Content-Length"] = str(len(compressed))
+                await self._send(self._start)
+                await self._send({"type": "http.response.body", "body": compressed})
+                return
+
+            # Потоковый ответ: длина заранее неизвестна
+            if "content-length" in headers:
+                del headers["content-length"]
+            await self._send(self._start)
+
+        chunk = self._compressor.compress(body)
+        if not more_body:
+            chunk += self._compressor.finish()
+        await self._send({"type": "http.response.body", "body": chunk, "more_body": more_body})
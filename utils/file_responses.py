@@ -0,0 +1,168 @@
+"""
+File Responses - отдача сохраненных файлов с условными запросами и Range
+"""
+import os
+import re
+from email.utils import formatdate, parsedate_to_datetime
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+import aiofiles
+from fastapi import Request
+from fastapi.responses import FileResponse, Response
+from starlette.types import Receive, Scope, Send
+
+RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+RANGE_CHUNK_SIZE = 64 * 1024
+
+
+def _opaque_tag(etag: str) -> str:
+    return etag[2:] if etag.startswith("W/") else etag
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Проверка заголовка If-None-Match (список ETag или *, слабое сравнение)"""
+    if not if_none_match:
+        return False
+    candidates = {_opaque_tag(candidate.strip()) for candidate in if_none_match.split(",")}
+    return "*" in candidates or _opaque_tag(etag) in candidates
+
+
+def _not_modified_since(if_modified_since: Optional[str], modified: float) -> bool:
+    if not if_modified_since:
+        return False
+    try:
+        return int(modified) <= parsedate_to_datetime(if_modified_since).timestamp()
+    except (TypeError, ValueError):
+        return False
+
+
+def parse_range(range_header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """
+    Один диапазон из заголовка Range: (start, end) включительно
+
+    Несколько диапазонов и некорректные значения игнорируются (None -
+    отдать файл целиком). Неудовлетворимый диапазон - ValueError.
+    """
+    if not range_header:
+        return None
+    match = RANGE_RE.match(range_header.strip())
+    if not match:
+        return None
+    start, end = match.groups()
+    if not start and not end:
+        return None
+    if not start:
+        # bytes=-N - последние N байт
+        length = int(end)
+        if length == 0:
+            raise ValueError("Unsatisfiable range")
+        return max(size - length, 0), size - 1
+    start = int(start)
+    end = min(int(end), size - 1) if end else size - 1
+    if start >= size or start > end:
+        raise ValueError("Unsatisfiable range")
+    return start, end
+
+
+class FileRangeResponse(Response):
+    """
+    Часть файла (206 Partial Content)
+
+    Если сервер поддерживает расширение zerocopysend, данные передаются
+    через sendfile без копирования в Python; иначе читаются порциями.
+    """
+
+    def __init__(self, path: Path, start: int, end: int, size: int,
+                 media_type: str, headers: Optional[Dict[str, str]] = None, method: str = "GET"):
+        super().__init__(status_code=206, headers=headers, media_type=media_type)
+        self.path = path
+        self.start = start
+        self.end = end
+        self.send_header_only = method.upper() == "HEAD"
+        self.headers["content-range"] = f"bytes {start}-{end}/{size}"
+        self.headers["content-length"] = str(end - start + 1)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        if self.send_header_only:
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        count = self.end - self.start + 1
+        if "http.response.zerocopysend" in scope.get("extensions", {}):
+            fd = os.open(self.path, os.O_RDONLY)
+            try:
+                await send({"type": "http.response.zerocopysend", "file": fd, "offset": self.start, "count": count})
+            finally:
+                os.close(fd)
+            return
+
+        async with aiofiles.open(self.path, "rb") as f:
+            await f.seek(self.start)
+            remaining = count
+            while remaining > 0:
+                chunk = await f.read(min(RANGE_CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                await send({"type": "http.response.body", "body": chunk, "more_body": remaining > 0})
+            if remaining > 0:
+                await send({"type": "http.response.body", "body": b""})
+
+
+def conditional_file_response(
+    request: Request,
+    path: Path,
+    stat_result: os.stat_result,
+    etag: str,
+    media_type: str = "text/html; charset=utf-8",
+    encoding: Optional[str] = None,
+    headers: Optional[Dict[str, str]] = None,
+) -> Response:
+    """
+    Ответ с файлом: 304 по If-None-Match/If-Modified-Since, 206 по Range
+    (с учетом If-Range), иначе FileResponse целиком
+
+    Файл передается сервером потоком, без чтения в строку Python.
+    """
+    response_headers = {
+        "ETag": etag,
+        "Last-Modified": formatdate(stat_result.st_mtime, usegmt=True),
+        "Accept-Ranges": "bytes",
+        "Vary": "Accept-Encoding",
+        **(headers or {}),
+    }
+
+    if encoding:
+        # И в 304: по нему видно, что ETag относится к сжатому варианту
+        response_headers["Content-Encoding"] = encoding
+
+    if_none_match = request.headers.get("if-none-match")
+    if etag_matches(if_none_match, etag) or (
+        if_none_match is None and _not_modified_since(request.headers.get("if-modified-since"), stat_result.st_mtime)
+    ):
+        return Response(status_code=304, headers=response_headers)
+
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    if range_header and (not if_range or if_range == etag):
+        try:
+            byte_range = parse_range(range_header, stat_result.st_size)
+        except ValueError:
+            response_headers["Content-Range"] = f"bytes */{stat_result.st_size}"
+            return Response(status_code=416, headers=response_headers)
+        if byte_range is not None:
+            start, end = byte_range
+            return FileRangeResponse(
+                path, start, end, stat_result.st_size, media_type,
+                headers=response_headers, method=request.method
+            )
+
+    return FileResponse(
+        path,
+        media_type=media_type,
+        headers=response_headers,
+        stat_result=stat_result,
+        method=request.method,
+    )
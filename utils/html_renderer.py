@@ -0,0 +1,209 @@
+"""
+HTML Renderer - предкомпилированные шаблоны с автоэкранированием
+
+Шаблон с плейсхолдерами вида {{name}} один раз разбирается на статические
+сегменты и именованные слоты. Рендер складывает сегменты и значения слотов
+в один список частей, который склеивается одним "".join() в самом конце,
+без повторного разбора и конкатенации строк в цикле.
+"""
+import html
+import re
+from functools import lru_cache
+from typing import Any, Iterator, List, Mapping, Optional, Tuple
+
+# Плейсхолдер слота: {{name}} или {{ name }}
+SLOT_RE = re.compile(r"\{\{\s*([A-Za-z_][A-Za-z0-9_]*)\s*\}\}")
+TAG_RE = re.compile(r"<[^>]+>")
+WHITESPACE_RE = re.compile(r"\s+")
+
+TEMPLATE_CACHE_SIZE = 256
+
+# Минимальный размер порции при потоковом рендере (символов)
+STREAM_CHUNK_SIZE = 16 * 1024
+
+_MISSING = object()
+
+
+class Markup(str):
+    """Строка, которая уже безопасна для вставки в HTML и не экранируется"""
+    __slots__ = ()
+
+
+class Fragment(list):
+    """
+    Отрендеренный, но еще не склеенный фрагмент (список безопасных частей)
+
+    Фрагменты вставляются в слоты других шаблонов без промежуточного join,
+    поэтому документ любой вложенности склеивается ровно один раз.
+    """
+    __slots__ = ()
+
+    def __str__(self) -> str:
+        return "".join(self)
+
+
+def escape(value: Any) -> Markup:
+    """Экранирует значение для вставки в HTML (Markup остается как есть)"""
+    if isinstance(value, Markup):
+        return value
+    if value is None:
+        return Markup("")
+    return Markup(html.escape(str(value), quote=True))
+
+
+def clean_html_tags(text: str) -> str:
+    """Удаляет HTML теги из текста (заголовки слайдов, PPTX и PDF)"""
+    if not text:
+        return ""
+    
+    # Заменяем основные HTML теги на текстовые эквиваленты
+    text = text.replace('<br>', '\n')
+    text = text.replace('<br/>', '\n')
+    text = text.replace('<br />', '\n')
+    
+    # Удаляем все остальные HTML теги
+    clean_text = TAG_RE.sub('', text)
+    
+    # Убираем лишние пробелы и переносы
+    clean_text = WHITESPACE_RE.sub(' ', clean_text).strip()
+    
+    return clean_text
+
+
+def _append_value(parts: List[str], value: Any):
+    """Добавляет значение слота в части документа"""
+    value_type = type(value)
+    if value_type is Markup:
+        parts.append(value)
+    elif value_type is Fragment:
+        parts.extend(value)
+    elif value_type is str:
+        parts.append(html.escape(value, quote=True))
+    elif value_type is int:
+        # Номера слайдов и счетчики экранировать не нужно
+        parts.append(str(value))
+    elif value is None:
+        return
+    elif isinstance(value, Markup):
+        parts.append(value)
+    elif isinstance(value, (list, tuple)) or hasattr(value, "__next__"):
+        for item in value:
+            _append_value(parts, item)
+    else:
+        parts.append(html.escape(str(value), quote=True))
+
+
+class CompiledTemplate:
+    """
+    Разобранный шаблон: статические сегменты и слоты между ними
+
+    segments всегда на один элемент длиннее slots:
+    segments[0] + slot[0] + segments[1] + ... + segments[-1]
+    """
+    __slots__ = ("segments", "slots", "placeholders", "_steps")
+
+    def __init__(self, source: str):
+        segments: List[str] = []
+        slots: List[str] = []
+        placeholders: List[str] = []
+        position = 0
+        for match in SLOT_RE.finditer(source):
+            segments.append(source[position:match.start()])
+            slots.append(match.group(1))
+            placeholders.append(match.group(0))
+            position = match.end()
+        segments.append(source[position:])
+
+        self.segments: Tuple[str, ...] = tuple(segments)
+        self.slots: Tuple[str, ...] = tuple(slots)
+        # Исходный текст слотов нужен, чтобы оставить неизвестные слоты нетронутыми
+        self.placeholders: Tuple[str, ...] = tuple(placeholders)
+        # (слот, исходный текст слота, следующий статический сегмент)
+        self._steps = tuple(zip(self.slots, self.placeholders, self.segments[1:]))
+
+    def render_into(self, parts: List[str], context: Mapping[str, Any]) -> List[str]:
+        """
+        Добавляет части документа в parts в порядке вывода
+
+        Слоты без значения в context остаются в выводе как есть (так же,
+        как раньше при подстановке через str.replace).
+        """
+        append = parts.append
+        get = context.get
+        html_escape = html.escape
+        append(self.segments[0])
+        for name, placeholder, segment in self._steps:
+            value = get(name, _MISSING)
+            value_type = type(value)
+            # Частые случаи - без вызова _append_value
+            if value_type is Markup:
+                append(value)
+            elif value_type is str:
+                append(html_escape(value))
+            elif value is _MISSING:
+                append(placeholder)
+            else:
+                _append_value(parts, value)
+            append(segment)
+        return parts
+
+    def fragment(self, context: Optional[Mapping[str, Any]] = None, **values: Any) -> Fragment:
+        """Рендер во фрагмент для вставки в слот другого шаблона"""
+        return self.render_into(Fragment(), _merge(context, values))
+
+    def render(self, context: Optional[Mapping[str, Any]] = None, **values: Any) -> str:
+        """Рендер шаблона в готовую строку"""
+        return "".join(self.render_into([], _merge(context, values)))
+
+    def stream(self, context: Optional[Mapping[str, Any]] = None,
+               chunk_size: int = STREAM_CHUNK_SIZE, **values: Any) -> Iterator[str]:
+        """
+        Потоковый рендер шаблона
+
+        Все до первого ленивого слота (итератора) отдается сразу одной порцией,
+        элементы итератора рендерятся по одному и отдаются порциями не меньше
+        chunk_size символов. Документ целиком в памяти не собирается.
+        """
+        context = _merge(context, values)
+        buffer: List[str] = [self.segments[0]]
+        for name, placeholder, segment in self._steps:
+            value = context.get(name, _MISSING)
+            if value is _MISSING:
+                buffer.append(placeholder)
+            elif hasattr(value, "__next__"):
+                # Статическая часть перед ленивым слотом (например <head> с CSS)
+                yield "".join(buffer)
+                buffer = []
+                buffered = 0
+                for item in value:
+                    start = len(buffer)
+                    _append_value(buffer, item)
+                    buffered += sum(len(part) for part in buffer[start:])
+                    if buffered >= chunk_size:
+                        yield "".join(buffer)
+                        buffer = []
+                        buffered = 0
+            else:
+                _append_value(buffer, value)
+            buffer.append(segment)
+        yield "".join(buffer)
+
+
+def _merge(context: Optional[Mapping[str, Any]], values: Mapping[str, Any]) -> Mapping[str, Any]:
+    """Объединяет словарь контекста и именованные значения"""
+    if context is None:
+        return values
+    if values:
+        return {**context, **values}
+    return context
+
+
+@lru_cache(maxsize=TEMPLATE_CACHE_SIZE)
+def compile_template(source: str) -> CompiledTemplate:
+    """Разбирает шаблон (результат кэшируется по тексту шаблона)"""
+    return CompiledTemplate(source)
+
+
+def render_template(source: str, context: Optional[Mapping[str, Any]] = None, **values: Any) -> str:
+    """Рендер шаблона по тексту с использованием кэша разобранных шаблонов"""
+    return compile_template(source).render(context, **values)
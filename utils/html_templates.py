@@ -0,0 +1,436 @@
+"""
+HTML Templates - шаблоны страниц презентаций для всех рендереров
+
+Шаблоны и CSS разбираются один раз при импорте модуля, при рендере
+выполняется только подстановка значений в слоты.
+"""
+import html
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, Optional, Union
+
+from utils.html_renderer import CompiledTemplate, Fragment, Markup, clean_html_tags, compile_template
+from utils.responsive_images import render_img
+from utils.static_assets import stylesheet
+
+
+def _content_markup(content: Any, line_breaks: bool = False) -> Markup:
+    """
+    Контент слайда как HTML
+
+    Контент генерируется моделью и может содержать разметку (<p>, <ul>, <h3>),
+    поэтому он не экранируется. Заголовки и прочие поля экранируются.
+    """
+    text = str(content or "")
+    if line_breaks:
+        text = text.replace("\n", "<br>")
+    return Markup(text)
+
+
+def _title_text(title: Any) -> str:
+    """
+    Заголовок как обычный текст
+
+    Модель возвращает заголовки в разметке ("<h1>Введение</h1>"), а шаблон
+    уже оборачивает их в свой тег, поэтому теги снимаются, а сущности
+    раскодируются - экранирование при подстановке вернет их обратно.
+    Обычный текст без разметки возвращается без разбора.
+    """
+    text = str(title or "")
+    if "<" in text:
+        text = clean_html_tags(text)
+    if "&" in text:
+        text = html.unescape(text)
+    return text
+
+
+# ---------------------------------------------------------------------------
+# Современная двухколоночная презентация (routers/html_generator.py)
+# ---------------------------------------------------------------------------
+
+MODERN_PAGE = compile_template("""<!DOCTYPE html>
+<html lang="ru">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>{{title}}</title>
+    {{styles}}
+</head>
+<body>
+{{slides}}
+</body>
+</html>
+""")
+
+MODERN_SLIDE_WITH_IMAGE = compile_template("""
+    <div class="{{slide_class}}" data-slide="{{index}}">
+        <div class="slide-content">
+            <div class="text-column">
+                <h2>{{title}}</h2>
+                <div class="content">{{content}}</div>
+            </div>
+            <div class="image-column">
+                {{image}}
+            </div>
+        </div>
+    </div>
+""")
+
+MODERN_SLIDE = compile_template("""
+    <div class="{{slide_class}}" data-slide="{{index}}">
+        <div class="slide-content">
+            <div class="text-column full-width">
+                <h2>{{title}}</h2>
+                <div class="content">{{content}}</div>
+            </div>
+        </div>
+    </div>
+""")
+
+
+def render_modern_slide(index: int, slide: Mapping[str, Any]) -> Fragment:
+    """Один слайд современной презентации"""
+    slide_class = f"slide slide-{slide.get('type', 'content')}"
+    if index == 0:
+        slide_class += " active"
+
+    context = {
+        "slide_class": slide_class,
+        "index": index,
+        "title": _title_text(slide.get("title", "")),
+        "content": _content_markup(slide.get("content", "")),
+    }
+    image = slide.get("image")
+    if image:
+        context["image"] = Markup(render_img(image, layout="column", alt="Slide image"))
+        return MODERN_SLIDE_WITH_IMAGE.fragment(context)
+    return MODERN_SLIDE.fragment(context)
+
+
+def render_modern_presentation(presentation_data: Mapping[str, Any]) -> str:
+    """Полная HTML страница с двухколоночным layout"""
+    slides = presentation_data.get("slides", [])
+    return MODERN_PAGE.render(
+        title=_title_text(presentation_data.get("title", "Презентация")),
+        styles=stylesheet("modern"),
+        slides=[render_modern_slide(index, slide) for index, slide in enumerate(slides)],
+    )
+
+
+def stream_modern_presentation(presentation_data: Mapping[str, Any]) -> Iterator[str]:
+    """Та же страница порциями: <head> с CSS сразу, затем слайды по одному"""
+    slides = presentation_data.get("slides", [])
+    return MODERN_PAGE.stream(
+        title=_title_text(presentation_data.get("title", "Презентация")),
+        styles=stylesheet("modern"),
+        slides=(render_modern_slide(index, slide) for index, slide in enumerate(slides)),
+    )
+
+
+# ---------------------------------------------------------------------------
+# HTML превью расширенной презентации (routers/enhanced_generator.py)
+# ---------------------------------------------------------------------------
+
+PREVIEW_PAGE = compile_template("""<!DOCTYPE html>
+<html lang="ru">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>{{title}}</title>
+    {{styles}}
+</head>
+<body>
+    <div class="presentation">
+        <div class="header">
+            <h1>{{title}}</h1>
+            <p>Сгенерировано с помощью SayDeck AI</p>
+        </div>
+{{slides}}
+    </div>
+</body>
+</html>
+""")
+
+PREVIEW_SLIDE = compile_template("""
+        <div class="slide">
+            <div class="slide-title">{{number}}. {{title}}</div>
+            <div class="slide-content">{{content}}</div>{{image}}
+        </div>
+""")
+
+PREVIEW_IMAGE = compile_template("""
+            <div class="slide-image">
+                {{img}}
+                <div class="image-credit">
+                    Фото: {{photographer}} | Источник: Pexels
+                </div>
+            </div>""")
+
+
+def render_preview_slide(number: int, title: str, content: str,
+                         image: Optional[Dict[str, Any]] = None, image_alt: str = "") -> Fragment:
+    """Один слайд HTML превью"""
+    image_html = None
+    if image:
+        image_html = PREVIEW_IMAGE.fragment(
+            img=Markup(render_img(image, layout="slide", alt=image_alt)),
+            photographer=image.get("photographer", ""),
+        )
+    return PREVIEW_SLIDE.fragment(
+        number=number,
+        title=_title_text(title),
+        content=_content_markup(content, line_breaks=True),
+        image=image_html,
+    )
+
+
+def render_enhanced_preview(title: str, slides: Iterable[Any]) -> str:
+    """
+    HTML превью расширенной презентации
+
+    Args:
+        slides: объекты с атрибутами title, content, image, image_alt
+    """
+    return PREVIEW_PAGE.render(
+        title=_title_text(title),
+        styles=stylesheet("preview"),
+        slides=[
+            render_preview_slide(number, slide.title, slide.content, slide.image, slide.image_alt)
+            for number, slide in enumerate(slides, 1)
+        ],
+    )
+
+
+# ---------------------------------------------------------------------------
+# Просмотр публичной презентации (routers/public.py)
+# ---------------------------------------------------------------------------
+
+PUBLIC_SCRIPT = Markup("""
+        let currentSlide = 0;
+        const totalSlides = document.querySelectorAll('.slide').length;
+
+        function showSlide(n) {
+            const slides = document.querySelectorAll('.slide');
+            slides.forEach(slide => slide.style.display = 'none');
+
+            if (n >= totalSlides) currentSlide = 0;
+            if (n < 0) currentSlide = totalSlides - 1;
+
+            slides[currentSlide].style.display = 'block';
+            document.getElementById('current-slide').textContent = currentSlide + 1;
+
+            // Обновляем кнопки
+            document.getElementById('prev-btn').disabled = currentSlide === 0;
+            document.getElementById('next-btn').disabled = currentSlide === totalSlides - 1;
+        }
+
+        function nextSlide() {
+            if (currentSlide < totalSlides - 1) {
+                currentSlide++;
+                showSlide(currentSlide);
+            }
+        }
+
+        function prevSlide() {
+            if (currentSlide > 0) {
+                currentSlide--;
+                showSlide(currentSlide);
+            }
+        }
+
+        // Управление клавиатурой
+        document.addEventListener('keydown', function(e) {
+            if (e.key === 'ArrowRight' || e.key === ' ') nextSlide();
+            if (e.key === 'ArrowLeft') prevSlide();
+        });
+
+        // Инициализация
+        showSlide(0);
+""")
+
+PUBLIC_PAGE = compile_template("""<!DOCTYPE html>
+<html lang="ru">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>{{title}} - SayDeck</title>
+    {{styles}}
+</head>
+<body>
+    <div class="presentation-container">
+        <div class="header">
+            <h1>🎤 {{title}}</h1>
+            <p>Публичная презентация из SayDeck</p>
+            <div class="slide-counter">
+                <span id="current-slide">1</span> / <span id="total-slides">{{total_slides}}</span>
+            </div>
+        </div>
+
+        <div class="slides-container">
+{{slides}}
+        </div>
+
+        <div class="controls">
+            <button id="prev-btn" onclick="prevSlide()">← Предыдущий</button>
+            <button id="next-btn" onclick="nextSlide()">Следующий →</button>
+        </div>
+
+        <div class="share-info">
+            <p>💡 Создано в <strong>SayDeck</strong> - генерация презентаций с помощью AI</p>
+            <p>🔗 Поделиться: <code>{{public_id}}</code></p>
+        </div>
+    </div>
+
+    <script>{{script}}</script>
+</body>
+</html>
+""")
+
+PUBLIC_SLIDE = compile_template("""
+            <div class="slide" id="slide-{{index}}" style="display: {{display}}">
+                <h2>{{title}}</h2>
+                <div class="content">{{content}}</div>
+            </div>
+""")
+
+PUBLIC_NOT_FOUND_HTML = """<html>
+    <head><title>Презентация не найдена</title></head>
+    <body>
+        <h1>❌ Презентация не найдена</h1>
+        <p>Публичная презентация не существует или была удалена.</p>
+    </body>
+</html>
+"""
+
+
+def render_public_slide(index: int, slide: Mapping[str, Any]) -> Fragment:
+    """Один слайд публичного просмотра"""
+    return PUBLIC_SLIDE.fragment(
+        index=index,
+        display="block" if index == 0 else "none",
+        title=_title_text(slide.get("title", "")),
+        content=_content_markup(slide.get("content", ""), line_breaks=True),
+    )
+
+
+def render_public_viewer(title: str, slides: List[Mapping[str, Any]], public_id: str) -> str:
+    """HTML страница для просмотра публичной презентации"""
+    return PUBLIC_PAGE.render(
+        title=_title_text(title),
+        styles=stylesheet("public"),
+        script=PUBLIC_SCRIPT,
+        total_slides=len(slides),
+        public_id=public_id,
+        slides=[render_public_slide(index, slide) for index, slide in enumerate(slides)],
+    )
+
+
+def stream_public_viewer(title: str, slides: List[Mapping[str, Any]], public_id: str) -> Iterator[str]:
+    """Страница публичного просмотра порциями: <head> с CSS сразу, затем слайды"""
+    return PUBLIC_PAGE.stream(
+        title=_title_text(title),
+        styles=stylesheet("public"),
+        script=PUBLIC_SCRIPT,
+        total_slides=len(slides),
+        public_id=public_id,
+        slides=(render_public_slide(index, slide) for index, slide in enumerate(slides)),
+    )
+
+
+# ---------------------------------------------------------------------------
+# Простая презентация при отказе AI сервиса (routers/main_generation.py)
+# ---------------------------------------------------------------------------
+
+FALLBACK_PAGE = compile_template("""<!DOCTYPE html>
+<html lang="{{language}}">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>{{title}}</title>
+    {{styles}}
+</head>
+<body>
+    <h1>{{title}}</h1>
+{{slides}}
+</body>
+</html>
+""")
+
+FALLBACK_SLIDE = compile_template("""
+    <div class="slide">
+        <h2>{{title}}</h2>
+        <div class="content">
+            <p>Содержимое слайда {{number}}</p>{{extra}}
+        </div>
+    </div>
+""")
+
+FALLBACK_EXTRA = compile_template("""
+            <p>{{content}}</p>""")
+
+
+def render_fallback_presentation(topic: str, language: str, slides_count: int,
+                                 content: Optional[str] = None) -> str:
+    """Простой HTML в случае отказа AI сервиса"""
+    extra = FALLBACK_EXTRA.fragment(content=content) if content else None
+    slides = [
+        FALLBACK_SLIDE.fragment(
+            title=topic if index == 0 else f"Слайд {index + 1}",
+            number=index + 1,
+            extra=extra if index == 1 else None,
+        )
+        for index in range(slides_count)
+    ]
+    return FALLBACK_PAGE.render(language=language, title=topic, styles=stylesheet("fallback"), slides=slides)
+
+
+# ---------------------------------------------------------------------------
+# Слайды для пользовательских и встроенных шаблонов ({{slides}})
+# ---------------------------------------------------------------------------
+
+TEMPLATE_SLIDE = compile_template(
+    "<div class='slide'><h2>{{title}}</h2><div class='content'>{{content}}</div>{{image}}</div>"
+)
+
+TEMPLATE_IMAGE = compile_template(
+    "<div class='slide-image'>{{img}}<div class='image-credit'>Фото: {{photographer}} | Pexels</div></div>"
+)
+
+TEMPLATE_EMPTY_SLIDES = Markup("<div class='slide'><h2>Нет слайдов</h2></div>")
+
+
+def render_template_slide(slide: Mapping[str, Any]) -> Fragment:
+    """Один слайд для подстановки в слот {{slides}} шаблона"""
+    image = slide.get("image")
+    image_html = None
+    if image and image.get("url"):
+        image_html = TEMPLATE_IMAGE.fragment(
+            img=Markup(render_img(image, layout="slide")),
+            photographer=image.get("photographer", ""),
+        )
+    return TEMPLATE_SLIDE.fragment(
+        title=_title_text(slide.get("title", "")),
+        content=_content_markup(slide.get("content", "")),
+        image=image_html,
+    )
+
+
+def render_template_slides(slides: Optional[List[Mapping[str, Any]]]) -> Fragment:
+    """Содержимое слота {{slides}} для шаблона"""
+    if not slides:
+        return Fragment([TEMPLATE_EMPTY_SLIDES])
+    fragment = Fragment()
+    for slide in slides:
+        fragment.extend(render_template_slide(slide))
+    return fragment
+
+
+def render_with_template(template: Union[str, CompiledTemplate], title: str,
+                         slides: Optional[List[Mapping[str, Any]]],
+                         stylesheet_name: Optional[str] = None) -> str:
+    """Подставляет заголовок, слайды и стили в разобранный шаблон (или HTML шаблона)"""
+    if isinstance(template, str):
+        template = compile_template(template)
+    return template.render(
+        title=_title_text(title),
+        slides=render_template_slides(slides),
+        styles=stylesheet(stylesheet_name),
+    )
@@ -0,0 +1,183 @@
+"""
+PDF Generator - создание презентаций в формате PDF (reportlab)
+
+build_presentation_pdf - синхронная функция без состояния: она
+выполняется в пуле процессов экспорта (services/export_service.py).
+Изображения слайдов скачиваются заранее, в основном процессе, и
+передаются байтами; здесь они только уменьшаются до DPI страницы.
+"""
+import io
+import os
+from typing import Any, Dict, Optional, Tuple
+
+from reportlab.lib.utils import ImageReader, simpleSplit
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.pdfgen import canvas
+
+from utils.pptx_generator import clean_html_tags
+
+try:
+    from PIL import Image
+except ImportError:  # Pillow ставится вместе с python-pptx, но может отсутствовать
+    Image = None
+
+PDF_MEDIA_TYPE = "application/pdf"
+
+# Страница 16:9 в пунктах (13.33 x 7.5 дюйма, как слайд PowerPoint)
+PAGE_WIDTH = 960
+PAGE_HEIGHT = 540
+MARGIN = 48
+
+TITLE_FONT_SIZE = 30
+BODY_FONT_SIZE = 18
+BODY_LEADING = 24
+CREDIT_FONT_SIZE = 9
+
+# Колонка изображения справа: ширина и высота области в пунктах
+IMAGE_BOX_WIDTH = 384
+IMAGE_BOX_HEIGHT = 340
+# Место под подпись автора фото
+CREDIT_SPACE = 14
+JPEG_QUALITY = 80
+
+# Стандартный шрифт reportlab без кириллицы - только запасной вариант
+FALLBACK_FONTS = ("Helvetica", "Helvetica-Bold")
+
+
+def slide_image_url(slide: Dict[str, Any]) -> str:
+    """URL изображения слайда (large2x у Pexels - его хватает для любой страницы)"""
+    image = slide.get("image")
+    if isinstance(image, dict):
+        return (image.get("src") or {}).get("large2x") or image.get("url") or ""
+    return image or ""
+
+
+def image_pixel_width(dpi: int) -> int:
+    """Ширина изображения в пикселях, достаточная для колонки при данном DPI"""
+    return round(IMAGE_BOX_WIDTH / 72 * dpi)
+
+
+def _register_fonts(font_path: Optional[str]) -> Tuple[str, str]:
+    """Регистрирует TTF-шрифт с кириллицей (и его жирное начертание, если есть)"""
+    if not font_path or not os.path.exists(font_path):
+        return FALLBACK_FONTS
+    try:
+        pdfmetrics.registerFont(TTFont("SlideFont", font_path))
+        bold_path = font_path.replace(".ttf", "-Bold.ttf")
+        if os.path.exists(bold_path):
+            pdfmetrics.registerFont(TTFont("SlideFont-Bold", bold_path))
+            return "SlideFont", "SlideFont-Bold"
+        return "SlideFont", "SlideFont"
+    except Exception as e:
+        print(f"⚠️ Не удалось загрузить шрифт {font_path}: {e}")
+        return FALLBACK_FONTS
+
+
+def _fit(width: float, height: float, box_width: float, box_height: float) -> Tuple[float, float]:
+    scale = min(box_width / width, box_height / height)
+    return width * scale, height * scale
+
+
+def _prepare_image(data: bytes, dpi: int) -> Optional[Tuple[ImageReader, float, float]]:
+    """
+    Уменьшает изображение до DPI страницы и перекодирует в JPEG
+
+    Returns:
+        (изображение, ширина и высота на странице в пунктах) или None
+    """
+    if Image is None:
+        reader = ImageReader(io.BytesIO(data))
+        width, height = reader.getSize()
+        return (reader, *_fit(width, height, IMAGE_BOX_WIDTH, IMAGE_BOX_HEIGHT))
+
+    with Image.open(io.BytesIO(data)) as image:
+        image.load()
+        draw_width, draw_height = _fit(image.width, image.height, IMAGE_BOX_WIDTH, IMAGE_BOX_HEIGHT)
+        target = (max(1, round(draw_width / 72 * dpi)), max(1, round(draw_height / 72 * dpi)))
+        if image.width > target[0]:
+            image = image.resize(target, Image.LANCZOS)
+        if image.mode in ("RGBA", "LA", "P"):
+            # JPEG без прозрачности - подкладываем белый фон
+            rgba = image.convert("RGBA")
+            image = Image.new("RGB", rgba.size, (255, 255, 255))
+            image.paste(rgba, mask=rgba.split()[3])
+        buffer = io.BytesIO()
+        image.convert("RGB").save(buffer, format="JPEG", quality=JPEG_QUALITY, optimize=True)
+    buffer.seek(0)
+    return ImageReader(buffer), draw_width, draw_height
+
+
+def _draw_lines(pdf: canvas.Canvas, lines, font: str, size: int, leading: int,
+                x: float, y: float, min_y: float) -> float:
+    """Выводит строки сверху вниз, обрезая то, что не помещается на страницу"""
+    pdf.setFont(font, size)
+    for index, line in enumerate(lines):
+        if y - leading < min_y and index < len(lines) - 1:
+            pdf.drawString(x, y, line.rstrip() + "…")
+            return y - leading
+        pdf.drawString(x, y, line)
+        y -= leading
+    return y
+
+
+def build_presentation_pdf(payload: Dict[str, Any]) -> bytes:
+    """
+    Создает PDF из структуры презентации и возвращает содержимое файла
+
+    Args:
+        payload: {"content": структура презентации, "images": {url: байты},
+                  "image_dpi": DPI изображений, "font_path": путь к TTF-шрифту}
+    """
+    content = payload.get("content") or {}
+    images = payload.get("images") or {}
+    dpi = payload.get("image_dpi") or 150
+    font, bold_font = _register_fonts(payload.get("font_path"))
+
+    buffer = io.BytesIO()
+    pdf = canvas.Canvas(buffer, pagesize=(PAGE_WIDTH, PAGE_HEIGHT), pageCompression=1)
+    pdf.setTitle(clean_html_tags(content.get("title", "")) or "Presentation")
+
+    # Одно изображение на нескольких слайдах встраивается один раз
+    prepared: Dict[str, Optional[Tuple[ImageReader, float, float]]] = {}
+
+    for slide_data in content.get("slides", []):
+        # Очищаем HTML теги из заголовка и контента, как и для PPTX
+        title = clean_html_tags(slide_data.get("title", ""))
+        content_text = clean_html_tags(slide_data.get("content", ""))
+
+        url = slide_image_url(slide_data)
+        if url in images and url not in prepared:
+            try:
+                prepared[url] = _prepare_image(images[url], dpi)
+            except Exception as e:
+                print(f"⚠️ Не удалось обработать изображение {url}: {e}")
+                prepared[url] = None
+        image = prepared.get(url) if url else None
+
+        text_width = PAGE_WIDTH - 2 * MARGIN - (IMAGE_BOX_WIDTH + MARGIN if image else 0)
+        top = PAGE_HEIGHT - MARGIN - TITLE_FONT_SIZE
+
+        title_lines = simpleSplit(title, bold_font, TITLE_FONT_SIZE, PAGE_WIDTH - 2 * MARGIN)[:2]
+        y = _draw_lines(pdf, title_lines, bold_font, TITLE_FONT_SIZE, TITLE_FONT_SIZE + 6, MARGIN, top, MARGIN)
+        body_top = y - 18
+
+        body_lines = simpleSplit(content_text, font, BODY_FONT_SIZE, text_width)
+        _draw_lines(pdf, body_lines, font, BODY_FONT_SIZE, BODY_LEADING, MARGIN, body_top, MARGIN)
+
+        if image:
+            reader, width, height = image
+            x = PAGE_WIDTH - MARGIN - IMAGE_BOX_WIDTH + (IMAGE_BOX_WIDTH - width) / 2
+            image_bottom = MARGIN + CREDIT_SPACE + IMAGE_BOX_HEIGHT - height
+            pdf.drawImage(reader, x, image_bottom, width, height)
+
+            image_data = slide_data.get("image")
+            photographer = image_data.get("photographer") if isinstance(image_data, dict) else None
+            if photographer:
+                pdf.setFont(font, CREDIT_FONT_SIZE)
+                pdf.drawRightString(x + width, image_bottom - CREDIT_SPACE + 3, f"Photo: {photographer}")
+
+        pdf.showPage()
+
+    pdf.save()
+    return buffer.getvalue()
@@ -1,13 +1,20 @@
 """
 PPTX Generator - создание презентаций в формате PowerPoint
+
+build_presentation_pptx - синхронная функция без состояния: она
+выполняется в пуле процессов экспорта (services/export_service.py)
+и собирает файл в памяти, без временных файлов на диске.
 """
 from pptx import Presentation as PPTXPresentation
-import tempfile
-import re
+import io
 from typing import Dict, Any
 
-async def generate_presentation_pptx(content: Dict[str, Any]) -> str:
-    """Создает PPTX файл из структуры презентации"""
+from utils.html_renderer import clean_html_tags
+
+PPTX_MEDIA_TYPE = "application/vnd.openxmlformats-officedocument.presentationml.presentation"
+
+def build_presentation_pptx(content: Dict[str, Any]) -> bytes:
+    """Создает PPTX из структуры презентации и возвращает содержимое файла"""
     prs = PPTXPresentation()
     
     for slide_data in content.get("slides", []):
@@ -22,25 +29,7 @@ async def generate_presentation_pptx(content: Dict[str, Any]) -> str:
         if len(pptx_slide.placeholders) > 1:
             pptx_slide.placeholders[1].text = content_text
     
-    # Сохраняем во временный файл
-    tmp = tempfile.NamedTemporaryFile(delete=False, suffix=".pptx")
-    prs.save(tmp.name)
-    return tmp.name 
-
-def clean_html_tags(text: str) -> str:
-    """Удаляет HTML теги из текста для использования в PPTX"""
-    if not text:
-        return ""
-    
-    # Заменяем основные HTML теги на текстовые эквиваленты
-    text = text.replace('<br>', '\n')
-    text = text.replace('<br/>', '\n')
-    text = text.replace('<br />', '\n')
-    
-    # Удаляем все остальные HTML теги
-    clean_text = re.sub(r'<[^>]+>', '', text)
-    
-    # Убираем лишние пробелы и переносы
-    clean_text = re.sub(r'\s+', ' ', clean_text).strip()
-    
-    return clean_text
+    # Сохраняем в буфер в памяти
+    buffer = io.BytesIO()
+    prs.save(buffer)
+    return buffer.getvalue()
@@ -0,0 +1,118 @@
+"""
+Responsive Images - теги <img> с srcset/sizes, размерами и ленивой загрузкой
+"""
+import html
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from services.image_proxy import VARIANT_WIDTHS, build_proxy_url, is_proxyable
+from config.settings import get_settings
+
+settings = get_settings()
+
+# Макеты слайдов: (ширина отображения в px, атрибут sizes)
+LAYOUTS: Dict[str, Tuple[int, str]] = {
+    "column": (VARIANT_WIDTHS["column"], "(max-width: 768px) 100vw, 480px"),
+    "slide": (VARIANT_WIDTHS["slide"], "(max-width: 1200px) 100vw, 1140px"),
+    "thumb": (VARIANT_WIDTHS["thumb"], "320px"),
+}
+
+# Ширина размеров Pexels с фиксированной шириной
+PEXELS_FIXED_WIDTHS: Dict[str, int] = {
+    "large2x": 1880,
+    "large": 940,
+}
+# Размеры Pexels с фиксированной высотой
+PEXELS_FIXED_HEIGHTS: Dict[str, int] = {
+    "medium": 350,
+    "small": 130,
+}
+
+ImageInput = Union[str, Dict[str, Any], None]
+
+
+def _pexels_candidates(image: Dict[str, Any]) -> List[Tuple[str, int]]:
+    """Варианты Pexels с известной шириной (url, ширина)"""
+    src = image.get("src") or {}
+    width = image.get("width") or 0
+    height = image.get("height") or 0
+    candidates = []
+    for name, variant_width in PEXELS_FIXED_WIDTHS.items():
+        if src.get(name):
+            candidates.append((src[name], min(variant_width, width) if width else variant_width))
+    if width and height:
+        for name, variant_height in PEXELS_FIXED_HEIGHTS.items():
+            if src.get(name):
+                candidates.append((src[name], max(1, round(width * variant_height / height))))
+    return candidates
+
+
+def _proxy_source(image: ImageInput) -> str:
+    """
+    URL, с которого прокси делает уменьшенные варианты
+
+    large2x (1880px) покрывает все варианты прокси и заметно легче оригинала
+    """
+    if isinstance(image, dict):
+        return (image.get("src") or {}).get("large2x") or image.get("url") or ""
+    return image or ""
+
+
+def build_srcset(image: ImageInput) -> Optional[str]:
+    """srcset для изображения: варианты прокси или размеры Pexels"""
+    if not image:
+        return None
+    url = _proxy_source(image)
+    if not url or url.startswith("data:"):
+        return None
+
+    if settings.IMAGE_PROXY_ENABLED and is_proxyable(url):
+        candidates = [(build_proxy_url(url, width), width) for width in sorted(VARIANT_WIDTHS.values())]
+    elif isinstance(image, dict):
+        candidates = _pexels_candidates(image)
+    else:
+        candidates = []
+
+    if len(candidates) < 2:
+        return None
+    unique: Dict[int, str] = {}
+    for candidate_url, width in candidates:
+        unique.setdefault(width, candidate_url)
+    return ", ".join(f"{candidate_url} {width}w" for width, candidate_url in sorted(unique.items()))
+
+
+def image_attrs(image: ImageInput, layout: str = "slide", alt: Optional[str] = None) -> Dict[str, str]:
+    """
+    Атрибуты тега <img> для макета слайда
+
+    Returns:
+        Словарь атрибутов (значения не экранированы)
+    """
+    display_width, sizes = LAYOUTS.get(layout, LAYOUTS["slide"])
+    data = image if isinstance(image, dict) else {"url": image}
+    url = data.get("url") or ""
+
+    source = _proxy_source(image)
+    proxied = settings.IMAGE_PROXY_ENABLED and is_proxyable(source)
+    attrs = {"src": build_proxy_url(source, display_width) if proxied else url}
+    srcset = build_srcset(image)
+    if srcset:
+        attrs["srcset"] = srcset
+        attrs["sizes"] = sizes
+
+    width, height = data.get("width"), data.get("height")
+    if width and height:
+        # Явные размеры резервируют место под изображение до загрузки
+        attrs["width"] = str(display_width)
+        attrs["height"] = str(max(1, round(display_width * height / width)))
+
+    attrs["alt"] = alt if alt is not None else (data.get("alt") or "")
+    attrs["loading"] = "lazy"
+    attrs["decoding"] = "async"
+    return attrs
+
+
+def render_img(image: ImageInput, layout: str = "slide", alt: Optional[str] = None) -> str:
+    """Готовый тег <img> с srcset/sizes, размерами и lazy loading"""
+    attrs = image_attrs(image, layout, alt)
+    rendered = " ".join(f'{name}="{html.escape(value, quote=True)}"' for name, value in attrs.items())
+    return f"<img {rendered} />"
@@ -0,0 +1,57 @@
+"""
+Single Flight - объединение одновременных вызовов с одним ключом
+
+Первый вызов (ведущий) выполняет работу, остальные ждут его результат.
+Если ведущий отменен (отключился клиент, сработал wait_for), ожидающие не
+зависают: один из них повторяет работу сам.
+"""
+import asyncio
+from typing import Awaitable, Callable, Dict, Hashable, TypeVar
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """Не больше одной выполняющейся операции на ключ"""
+
+    def __init__(self):
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+
+    def __len__(self) -> int:
+        return len(self._inflight)
+
+    async def run(self, key: Hashable, work: Callable[[], Awaitable[T]]) -> T:
+        """Выполнить work() или дождаться уже выполняющегося вызова с тем же ключом"""
+        while True:
+            future = self._inflight.get(key)
+            if future is None:
+                break
+            try:
+                return await asyncio.shield(future)
+            except asyncio.CancelledError:
+                task = asyncio.current_task()
+                if not future.cancelled() or (task is not None and task.cancelling()):
+                    # Отменили сам ожидающий вызов
+                    raise
+                # Отменен ведущий - пробуем снова (возможно, уже сами)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            result = await work()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            # Исключение уже передано ожидающим; помечаем как полученное
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            if not future.done():
+                future.cancel()
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
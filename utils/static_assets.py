@@ -0,0 +1,106 @@
+"""
+Static Assets - версионированные по содержимому таблицы стилей презентаций
+
+CSS тем лежит в static/css/*.css и один раз читается при импорте. Имя файла
+в URL содержит хэш содержимого, поэтому ответ можно кэшировать навсегда
+(immutable), а изменение CSS автоматически меняет URL.
+"""
+import hashlib
+import html
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Optional
+
+from config.settings import get_settings
+from utils.html_renderer import Markup
+
+settings = get_settings()
+
+STATIC_DIR = Path(__file__).resolve().parent.parent / "static"
+CSS_DIR = STATIC_DIR / "css"
+CSS_PATH = "/static/css"
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+# <link>, который генерирует stylesheet() в режиме link
+LINK_RE = re.compile(
+    r'<link rel="stylesheet" href="[^"]*' + re.escape(CSS_PATH) + r'/([A-Za-z0-9_-]+)\.[0-9a-f]+\.css">'
+)
+
+
+@dataclass(frozen=True)
+class StaticAsset:
+    """Таблица стилей и ее версия"""
+    name: str
+    content: bytes
+    digest: str
+
+    @property
+    def filename(self) -> str:
+        return f"{self.name}.{self.digest}.css"
+
+    @property
+    def etag(self) -> str:
+        return f'"{self.digest}"'
+
+    @property
+    def url(self) -> str:
+        return f"{settings.STATIC_URL_BASE}{CSS_PATH}/{self.filename}"
+
+
+def _load_stylesheets() -> Dict[str, StaticAsset]:
+    assets = {}
+    for path in sorted(CSS_DIR.glob("*.css")):
+        content = path.read_bytes()
+        assets[path.stem] = StaticAsset(
+            name=path.stem,
+            content=content,
+            digest=hashlib.sha256(content).hexdigest()[:12]
+        )
+    return assets
+
+
+STYLESHEETS: Dict[str, StaticAsset] = _load_stylesheets()
+
+# Общая версия всех стилей (для ETag страниц, которые ссылаются на них)
+ASSETS_VERSION = hashlib.sha256(
+    "".join(asset.digest for asset in STYLESHEETS.values()).encode()
+).hexdigest()[:12]
+
+
+def get_stylesheet(name: str) -> Optional[StaticAsset]:
+    return STYLESHEETS.get(name)
+
+
+def _inline_mode(inline: Optional[bool]) -> bool:
+    return settings.CSS_DELIVERY == "inline" if inline is None else inline
+
+
+@lru_cache(maxsize=64)
+def _stylesheet_tag(name: str, inline: bool) -> Markup:
+    asset = STYLESHEETS.get(name)
+    if asset is None:
+        return Markup("")
+    if inline:
+        return Markup(f"<style>\n{asset.content.decode('utf-8')}</style>")
+    return Markup(f'<link rel="stylesheet" href="{html.escape(asset.url, quote=True)}">')
+
+
+def stylesheet(name: Optional[str], inline: Optional[bool] = None) -> Markup:
+    """
+    Тег подключения таблицы стилей
+
+    В режиме link (по умолчанию) страница ссылается на версионированный файл,
+    в режиме inline CSS встраивается в <style> (автономные страницы для
+    скачивания). Режим по умолчанию задается CSS_DELIVERY.
+    """
+    if not name:
+        return Markup("")
+    return _stylesheet_tag(name, _inline_mode(inline))
+
+
+def inline_stylesheets(document: str) -> str:
+    """Делает страницу автономной: заменяет ссылки на стили их содержимым"""
+    return LINK_RE.sub(lambda match: _stylesheet_tag(match.group(1), True) or match.group(0), document)